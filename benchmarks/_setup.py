@@ -0,0 +1,53 @@
+"""
+Shared setup of the benchmark scripts.
+
+The scripts use the settings of the test project and run against a throwaway test database (created like
+`manage.py test` does), so they never touch the development database:
+
+    python benchmarks/<script>.py [options]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    sys.path.insert(0, ROOT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_proj.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Create a test database & a temporary `MEDIA_ROOT` for the duration of the benchmark."""
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    media_root = tempfile.mkdtemp()
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            yield
+    finally:
+        shutil.rmtree(media_root)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def best_of(func, repeat=5):
+    """Returns the fastest of `repeat` runs of `func` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -0,0 +1,45 @@
+"""
+Duration of the `ion_set_file_metadata` management command.
+
+Creates documents with files of the given size, removes their file metadata and measures the time needed
+to set it again.
+"""
+import argparse
+import os
+import time
+
+from _setup import setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=1000, help='Number of documents')
+    parser.add_argument('--file-size', type=int, default=2 * 1024 * 1024, help='Size of the files in bytes')
+    parser.add_argument('--workers', type=int, default=4, help='Number of threads reading the files')
+    parser.add_argument('--batch-size', type=int, default=500, help='Number of records updated at once')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.base import ContentFile
+    from wagtail_to_ion.management.commands.ion_set_file_metadata import set_file_metadata
+    from wagtail_to_ion.models import get_ion_document_model
+
+    IonDocument = get_ion_document_model()
+
+    with test_database():
+        for index in range(args.documents):
+            IonDocument.objects.create(
+                title=f'Document {index}',
+                file=ContentFile(os.urandom(args.file_size), name=f'document-{index}.bin'),
+            )
+        IonDocument.objects.update(file_size=None, file_last_modified=None)
+
+        start = time.perf_counter()
+        set_file_metadata(workers=args.workers, batch_size=args.batch_size, log=lambda message: None)
+        duration = time.perf_counter() - start
+
+    print(f'{args.documents} documents of {args.file_size} bytes: {duration:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Throughput of hashing local files: `File.chunks()` compared with `hash_local_file()` (memory mapped).
+
+Run it twice to measure with a warm page cache.
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+from _setup import best_of, setup_django
+
+
+def hash_chunks(path):
+    from django.core.files import File
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in File(fp).chunks():
+            sha256.update(chunk)
+    return f'sha256:{sha256.hexdigest()}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1024, help='Size of the file in MiB')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs (the best is reported)')
+    args = parser.parse_args()
+
+    setup_django()
+    from wagtail_to_ion.storage import hash_local_file
+
+    with tempfile.NamedTemporaryFile() as fp:
+        for _ in range(args.size):
+            fp.write(os.urandom(1024 * 1024))
+        fp.flush()
+
+        assert hash_chunks(fp.name) == hash_local_file(fp.name, detect_mime_type=False)[0]
+        for label, func in (
+            ('File.chunks()', lambda: hash_chunks(fp.name)),
+            ('hash_local_file()', lambda: hash_local_file(fp.name)),
+        ):
+            print(f'{label}: {args.size / best_of(func, repeat=args.repeat):.0f} MiB/s')
+
+
+if __name__ == '__main__':
+    main()
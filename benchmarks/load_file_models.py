@@ -0,0 +1,46 @@
+"""
+Duration of loading image records with filled file metadata (no file is read while loading them).
+"""
+import argparse
+
+from _setup import best_of, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=100000, help='Number of image records')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs (the best is reported)')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+    from wagtail.core.models import Collection
+    from wagtail_to_ion.models import get_ion_image_model
+
+    IonImage = get_ion_image_model()
+
+    with test_database():
+        collection = Collection.get_first_root_node()
+        now = timezone.now()
+        IonImage.objects.bulk_create([
+            IonImage(
+                title=f'Image {index}',
+                file=f'original_images/image-{index}.png',
+                width=10,
+                height=10,
+                collection=collection,
+                checksum='sha256:0',
+                mime_type='image/png',
+                file_size=100,
+                file_last_modified=now,
+            )
+            for index in range(args.images)
+        ], batch_size=5000)
+
+        duration = best_of(lambda: list(IonImage.objects.all()), repeat=args.repeat)
+
+    print(f'{args.images} images: {duration * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
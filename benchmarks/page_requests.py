@@ -0,0 +1,58 @@
+"""
+Duration of page detail requests with & without the page cache (`ION_PAGE_CACHE`).
+"""
+import argparse
+import json
+import time
+
+from _setup import setup_django, test_database
+
+
+def time_requests(client, path, requests):
+    """Returns the mean duration of `requests` requests of `path` in seconds."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, HTTP_API_VERSION='1')
+        assert response.status_code == 200, response.status_code
+        if response.streaming:
+            # consume the body, streamed responses are serialized while iterating
+            b''.join(response.streaming_content)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=200, help='Number of stream field blocks of the page')
+    parser.add_argument('--requests', type=int, default=100, help='Number of requests per run')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from wagtail.core.models import Page
+    from test_app.models import IonCollection, IonLanguage, StreamFieldPage
+
+    with test_database():
+        root = Page.get_first_root_node()
+        collection = root.add_child(instance=IonCollection(title='Collection', slug='collection'))
+        collection.save_revision().publish()
+        language = collection.add_child(instance=IonLanguage(title='English', slug='en', code='en', is_default=True))
+        stream = [{'type': 'paragraph', 'value': f'Paragraph {index}'} for index in range(args.blocks)]
+        page = language.add_child(instance=StreamFieldPage(title='Page', slug='page', stream=json.dumps(stream)))
+        page.save_revision().publish()
+
+        client = Client()
+        client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password'))
+        path = '/api/v1/en/collection/page'
+
+        uncached = time_requests(client, path, args.requests)
+        with override_settings(ION_PAGE_CACHE='default'):
+            cache.clear()
+            cached = time_requests(client, path, args.requests)
+
+    print(f'page with {args.blocks} blocks: {uncached * 1000:.1f} ms uncached, {cached * 1000:.1f} ms cached')
+
+
+if __name__ == '__main__':
+    main()
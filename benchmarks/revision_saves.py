@@ -0,0 +1,36 @@
+"""
+Duration of saving revisions of a stream field page (runs the signal receivers of pages & revisions).
+"""
+import argparse
+import json
+import time
+
+from _setup import setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=2000, help='Number of stream field blocks of the page')
+    parser.add_argument('--revisions', type=int, default=20, help='Number of revisions saved')
+    args = parser.parse_args()
+
+    setup_django()
+    from wagtail.core.models import Page
+    from test_app.models import StreamFieldPage
+
+    with test_database():
+        stream = [{'type': 'paragraph', 'value': f'<p>Paragraph {index}</p>'} for index in range(args.blocks)]
+        page = Page.get_first_root_node().add_child(
+            instance=StreamFieldPage(title='Page', slug='page', stream=json.dumps(stream))
+        )
+
+        start = time.perf_counter()
+        for _ in range(args.revisions):
+            page.save_revision()
+        duration = time.perf_counter() - start
+
+    print(f'{args.revisions} revisions of a page with {args.blocks} blocks: {duration:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
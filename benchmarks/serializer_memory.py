@@ -0,0 +1,76 @@
+"""
+Memory used by the tree of ION serializers of a page (see `__slots__` on the serializer classes).
+
+Builds the serializer tree of a stream field page with a large synthetic stream (headings, paragraphs,
+persons & groups of persons) like the page detail API does and reports the memory allocated while
+building it, measured with `tracemalloc`.
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from _setup import setup_django, test_database
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for child in getattr(node, 'children', ()))
+
+
+def person(index):
+    return {
+        'first_name': f'First {index}',
+        'surname': f'Surname {index}',
+        'photo': None,
+        'biography': f'<p>Biography {index}</p>',
+    }
+
+
+def synthetic_stream(blocks):
+    stream = []
+    for index in range(blocks):
+        kind = index % 4
+        if kind == 0:
+            stream.append({'type': 'heading', 'value': f'Heading {index}'})
+        elif kind == 1:
+            stream.append({'type': 'paragraph', 'value': f'<p>Paragraph <b>{index}</b></p>'})
+        elif kind == 2:
+            stream.append({'type': 'person', 'value': person(index)})
+        else:
+            stream.append({'type': 'group', 'value': [person(index), person(index + 1)]})
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=5000, help='Number of stream field blocks of the page')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from wagtail.core.models import Page
+    from test_app.models import StreamFieldPage
+    from wagtail_to_ion.serializers import DynamicPageDetailSerializer
+
+    with test_database():
+        page = Page.get_first_root_node().add_child(
+            instance=StreamFieldPage(title='Page', slug='page', stream=json.dumps(synthetic_stream(args.blocks)))
+        )
+        page = StreamFieldPage.objects.get(pk=page.pk)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        serializer = DynamicPageDetailSerializer(page, context={'request': request})
+        list(page.stream)  # decode the raw stream data before measuring
+
+        gc.collect()
+        tracemalloc.start()
+        container = serializer.build_tree(page, request)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f'{args.blocks} blocks, {count_nodes(container)} nodes: {size / 1e6:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+CPU time of transcoding the renditions of a video (`ION_VIDEO_RENDITIONS`) including their thumbnails: one ffmpeg
+run per rendition & thumbnail compared with a single ffmpeg run (`ION_TRANSCODE_SINGLE_PASS`).
+"""
+import argparse
+import resource
+import tempfile
+from pathlib import Path
+
+from _setup import setup_django
+
+
+def children_cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('input', type=Path, help='Video file to transcode')
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='Path of the ffmpeg binary')
+    parser.add_argument('--ffprobe', default='ffprobe', help='Path of the ffprobe binary')
+    parser.add_argument('--preset', help='Override the x264 preset of the renditions (e.g. veryfast)')
+    args = parser.parse_args()
+
+    setup_django()
+    from wagtail_to_ion import ffmpeg_jobs
+    from wagtail_to_ion.conf import settings
+
+    ffmpeg_jobs.ffmpeg = args.ffmpeg
+    ffmpeg_jobs.ffprobe = args.ffprobe
+    configs = settings.ION_VIDEO_RENDITIONS
+    if args.preset:
+        configs = {
+            name: {**config, 'video': {**config['video'], 'preset': args.preset}}
+            for name, config in configs.items()
+        }
+    metadata = ffmpeg_jobs.extract_video_metadata(args.input)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+
+        start = children_cpu_time()
+        ffmpeg_jobs.extract_video_thumbnail(args.input, directory / 'thumbnail.jpg', metadata.duration)
+        for name, config in configs.items():
+            rendition_path = directory / f'{name}.{config["container"]}'
+            ffmpeg_jobs.transcode_video(args.input, rendition_path, metadata, config)
+            ffmpeg_jobs.extract_video_thumbnail(rendition_path, directory / f'{name}.jpg', metadata.duration)
+        print(f'one run per rendition: {children_cpu_time() - start:.1f} s CPU')
+
+        start = children_cpu_time()
+        outputs = [
+            ffmpeg_jobs.RenditionOutput(
+                directory / f'single-{name}.{config["container"]}', config, directory / f'single-{name}.jpg'
+            )
+            for name, config in configs.items()
+        ]
+        ffmpeg_jobs.transcode_video_renditions(args.input, metadata, outputs, directory / 'single-thumbnail.jpg')
+        print(f'single run: {children_cpu_time() - start:.1f} s CPU')
+
+
+if __name__ == '__main__':
+    main()
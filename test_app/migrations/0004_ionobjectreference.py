@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('wagtailcore', '0060_fix_workflow_unique_constraint'),
+        ('test_app', '0002_auto_20210420_1901'),
+        ('test_app', '0003_recursivestreamfieldpage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IonObjectReference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(blank=True, max_length=255)),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.page')),
+            ],
+            options={
+                'abstract': False,
+                'index_together': {('content_type', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_app', '0004_ionobjectreference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IonPageChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_id', models.PositiveIntegerField(db_index=True)),
+                ('slug', models.CharField(max_length=255)),
+                ('path', models.CharField(db_index=True, max_length=255)),
+                ('action', models.CharField(choices=[('publish', 'publish'), ('unpublish', 'unpublish'), ('move', 'move'), ('delete', 'delete')], max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('id',),
+                'abstract': False,
+            },
+        ),
+    ]
@@ -14,6 +14,8 @@ from wagtail_to_ion.models.content_type_description import AbstractContentTypeDe
 from wagtail_to_ion.models.file_based_models import AbstractIonDocument, AbstractIonImage, AbstractIonMedia, \
     AbstractIonMediaRendition, AbstractIonRendition
 from wagtail_to_ion.models.page_models import AbstractIonLanguage
+from wagtail_to_ion.models.change_log import AbstractIonPageChange
+from wagtail_to_ion.models.reference_index import AbstractIonObjectReference
 
 # wagtail_to_ion models
 class ContentTypeDescription(AbstractContentTypeDescription):
@@ -48,6 +50,14 @@ class IonMediaRendition(AbstractIonMediaRendition):
     pass
 
 
+class IonObjectReference(AbstractIonObjectReference):
+    pass
+
+
+class IonPageChange(AbstractIonPageChange):
+    pass
+
+
 # project specific models
 class TestPage(AbstractIonPage):
     document_field = models.ForeignKey(IonDocument, blank=True, null=True, on_delete=models.SET_NULL)
@@ -1,3 +1,1194 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, re_path
+from django.utils import timezone
+
+from PIL import Image as PILImage
+from wagtail.core.blocks import StreamValue
+from wagtail.core.models import Collection, GroupCollectionPermission, Page, PageViewRestriction, Site
+from wagtail.core.rich_text import RichText
+
+from test_app.models import IonCollection, IonDocument, IonImage, IonLanguage, IonMedia, IonObjectReference, \
+    IonPageChange, StreamFieldPage, TestPage
+from test_proj.urls import urlpatterns as project_urlpatterns
+from wagtail_to_ion import ffmpeg_jobs
+from wagtail_to_ion.conf import settings
+from wagtail_to_ion.management.commands import ion_set_file_metadata
+from wagtail_to_ion.models.file_based_models import get_usage_for_objects
+from wagtail_to_ion.serializers import CollectionDetailSerializer, DynamicPageDetailSerializer
+from wagtail_to_ion.serializers.ion import IonContainerSerializer, IonDocumentSerializer, IonListSerializer, \
+    IonSerializer, IonTextSerializer
+from wagtail_to_ion.serializers.ion.container import IonMappingSerializer
+from wagtail_to_ion.serializers.pages import get_parent_slugs
+from wagtail_to_ion.source_cache import SourceCache
+from wagtail_to_ion.storage import IonS3StatMixin, stat_file
+from wagtail_to_ion.tasks import generate_media_renditions
+from wagtail_to_ion.uploadhandler import IonMemoryFileUploadHandler
+from wagtail_to_ion.utils import get_user_collections, get_user_documents, get_user_images, resolve_language, \
+    visible_tree_by_user
+from wagtail_to_ion.views.api.pages import DynamicPageDetailView
+
+
+# serve wagtail pages (not routed by the test project) so pages linked from rich text have URLs
+urlpatterns = project_urlpatterns + [
+    re_path(r'', include('wagtail.core.urls')),
+]
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_root_override = override_settings(MEDIA_ROOT=media_root)
+        media_root_override.enable()
+        self.addCleanup(media_root_override.disable)
+
+
+def upload_file(name, content):
+    """Receive `content` like an uploaded file of a request."""
+    handler = IonMemoryFileUploadHandler()
+    handler.handle_raw_input(None, {}, len(content), None)
+    try:
+        handler.new_file('file', name, 'application/octet-stream', len(content))
+    except StopFutureHandlers:
+        pass
+    handler.receive_data_chunk(content, 0)
+    return handler.file_complete(len(content))
+
+
+def get_content(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+class IonApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.root = Page.objects.get(depth=1)
+        self.collection = self.root.add_child(instance=IonCollection(title='Collection', slug='collection'))
+        self.collection.save_revision().publish()
+        self.language = self.collection.add_child(
+            instance=IonLanguage(title='English', slug='en', code='en', is_default=True)
+        )
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def get(self, path, **extra):
+        return self.client.get(path, HTTP_API_VERSION='1', **extra)
+
+    def get_page(self, slug):
+        response = self.get(f'/api/v1/en/collection/{slug}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(get_content(response))['page'][0]
+
+
+@override_settings(ROOT_URLCONF='test_app.tests', ION_STREAM_BLOCK_CACHE='default')
+class StreamBlockCacheTest(IonApiTestCase):
+    def get_paragraph_text(self, slug):
+        stream = self.get_page(slug)['contents'][0]['children'][1]
+        return stream['children'][0]['text']
+
+    def test_rich_text_page_link_follows_moved_page(self):
+        # serve the default site on the host of the test client (moving a page creates redirects for the site)
+        site = Site.objects.get(is_default_site=True)
+        site.hostname = 'testserver'
+        site.save()
+        home = site.root_page
+        old_parent = home.add_child(instance=Page(title='Old', slug='old'))
+        new_parent = home.add_child(instance=Page(title='New', slug='new'))
+        linked_page = old_parent.add_child(instance=Page(title='Linked', slug='linked'))
+        self.language.add_child(instance=StreamFieldPage(title='Stream', slug='stream', stream=json.dumps([
+            {'type': 'paragraph', 'value': f'<p><a linktype="page" id="{linked_page.pk}">link</a></p>'},
+        ])))
+
+        self.assertIn('/old/linked/', self.get_paragraph_text('stream'))
+
+        linked_page.move(new_parent, pos='last-child')
+
+        self.assertIn('/new/linked/', self.get_paragraph_text('stream'))
+
+    def test_only_plain_text_is_cacheable(self):
+        self.assertTrue(IonTextSerializer('text', 'plain text').cacheable)
+        self.assertFalse(IonTextSerializer('text', RichText('<p>rich text</p>')).cacheable)
+
+    def test_custom_containers_are_not_cacheable(self):
+        class UserContainerSerializer(IonContainerSerializer):
+            pass
+
+        self.assertFalse(UserContainerSerializer('user').cacheable)
+        self.assertTrue(IonListSerializer('list', ['text']).cacheable)
+        self.assertTrue(IonMappingSerializer('mapping', {'key': 'text'}).cacheable)
+
+
+@override_settings(ION_PAGE_CHANGE_WINDOW=0)
+class CollectionChangesTest(IonApiTestCase):
+    def get_changes(self, cursor):
+        response = self.get(f'/api/v1/en/collection/changes/?cursor={cursor}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def add_page(self, slug, parent=None):
+        page = (parent or self.language).add_child(instance=TestPage(title=slug, slug=slug))
+        page.save_revision().publish()
+        return page
+
+    def test_changes_since_cursor(self):
+        unpublished_page = self.add_page('unpublished')
+        deleted_page = self.add_page('deleted')
+        moved_page = self.add_page('moved')
+        cursor = self.get_changes(0)['cursor']
+
+        published_page = self.add_page('published')
+        unpublished_page.unpublish()
+        deleted_page.delete()
+        moved_page.move(published_page, pos='last-child')
+        changes = self.get_changes(cursor)
+
+        self.assertEqual([page['identifier'] for page in changes['upserts']], ['published', 'moved'])
+        self.assertEqual(changes['upserts'][1]['parent'], 'published')
+        self.assertEqual(changes['tombstones'], [{'identifier': 'deleted'}, {'identifier': 'unpublished'}])
+
+        # nothing changed since the returned cursor
+        self.assertEqual(self.get_changes(changes['cursor']), {
+            'cursor': changes['cursor'],
+            'upserts': [],
+            'tombstones': [],
+        })
+
+    def test_changes_of_other_collections_are_ignored(self):
+        cursor = self.get_changes(0)['cursor']
+        other_collection = self.root.add_child(instance=IonCollection(title='Other', slug='other'))
+        other_language = other_collection.add_child(instance=IonLanguage(title='English', slug='en', code='en'))
+        self.add_page('other', parent=other_language)
+
+        changes = self.get_changes(cursor)
+
+        self.assertEqual((changes['upserts'], changes['tombstones']), ([], []))
+        self.assertGreater(changes['cursor'], cursor)
+
+    @override_settings(ION_PAGE_CHANGE_WINDOW=60)
+    def test_late_commits_are_not_skipped(self):
+        self.add_page('early')
+        self.add_page('late')
+        # the change of `early` has the lower ID but its transaction commits after `late` has been sent
+        early_change = IonPageChange.objects.get(slug='early')
+        early_change.delete()
+
+        changes = self.get_changes(0)
+        self.assertEqual([page['identifier'] for page in changes['upserts']], ['late'])
+        self.assertEqual(changes['cursor'], 0)  # no change left the safety window yet
+
+        early_change.save()
+        changes = self.get_changes(changes['cursor'])
+        self.assertEqual([page['identifier'] for page in changes['upserts']], ['early', 'late'])
+
+        IonPageChange.objects.update(created_at=timezone.now() - datetime.timedelta(minutes=5))
+        changes = self.get_changes(changes['cursor'])
+        self.assertEqual([page['identifier'] for page in changes['upserts']], ['early', 'late'])
+        self.assertEqual(changes['cursor'], IonPageChange.objects.latest('id').pk)
+
+        self.assertEqual(self.get_changes(changes['cursor'])['upserts'], [])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get('/api/v1/en/collection/changes/?cursor=abc').status_code, 400)
+        self.assertEqual(self.get('/api/v1/en/collection/changes/?cursor=-1').status_code, 400)
+
+
+class KnownChecksumsTest(MediaRootMixin, IonApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.document = IonDocument.objects.create(title='Document', file=ContentFile(b'content', name='document.txt'))
+        self.language.add_child(instance=TestPage(title='Page', slug='page', document_field=self.document))
+
+    def get_archive(self, path, checksums=None):
+        if checksums is None:
+            response = self.get(path)
+        else:
+            response = self.client.post(
+                path, json.dumps({'checksums': checksums}), content_type='application/json', HTTP_API_VERSION='1'
+            )
+        self.assertEqual(response.status_code, 200)
+        archive = tarfile.open(fileobj=io.BytesIO(get_content(response)))
+        index = json.loads(archive.extractfile('index.json').read())
+        return archive.getnames(), index
+
+    def assert_known_files_skipped(self, path):
+        names, index = self.get_archive(path)
+        document_entry = next(entry for entry in index if entry.get('checksum') == self.document.checksum)
+        self.assertIn(document_entry['name'], names)
+
+        names, known_index = self.get_archive(path, checksums=[self.document.checksum, 'sha256:unknown'])
+        self.assertNotIn(document_entry['name'], names)
+        self.assertEqual(known_index, index)  # the index still lists the skipped file
+
+    def test_page_archive(self):
+        self.assert_known_files_skipped('/api/v1/en/collection/page.tar')
+
+    def test_collection_archive(self):
+        self.assert_known_files_skipped('/api/v1/en/collection.tar')
+
+    def test_invalid_manifest(self):
+        response = self.client.post(
+            '/api/v1/en/collection/page.tar', json.dumps({'checksums': 'sha256:unknown'}),
+            content_type='application/json', HTTP_API_VERSION='1',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalResponseTest(IonApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = self.language.add_child(instance=TestPage(title='Page', slug='page'))
+        self.page.save_revision().publish()
+
+    def test_page_detail_not_modified(self):
+        response = self.get('/api/v1/en/collection/page')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with mock.patch.object(DynamicPageDetailSerializer, 'build_tree') as build_tree:
+            response = self.get('/api/v1/en/collection/page', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        build_tree.assert_not_called()
+
+        response = self.get('/api/v1/en/collection/page', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_page_detail_modified(self):
+        etag = self.get('/api/v1/en/collection/page')['ETag']
+
+        self.page.title = 'Changed'
+        self.page.save_revision().publish()
+
+        response = self.get('/api/v1/en/collection/page', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_collection_detail_modified_by_new_page(self):
+        response = self.get('/api/v1/en/collection')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/v1/en/collection', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.language.add_child(instance=TestPage(title='New', slug='new')).save_revision().publish()
+
+        self.assertEqual(self.get('/api/v1/en/collection', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(GET_PAGES_BY_USER=True)
+    def test_etag_depends_on_user_groups(self):
+        etag = self.get('/api/v1/en/collection/page')['ETag']
+
+        self.user.groups.add(Group.objects.create(name='Group'))
+
+        self.assertNotEqual(self.get('/api/v1/en/collection/page')['ETag'], etag)
+
+
+@override_settings(GET_PAGES_BY_USER=True, ION_VISIBILITY_CACHE='default')
+class VisibilityCacheTest(IonApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = Group.objects.create(name='Members')
+        self.user.groups.add(self.group)
+        for slug in ('public', 'members', 'others'):
+            self.language.add_child(instance=TestPage(title=slug, slug=slug)).save_revision().publish()
+
+    def restrict(self, slug, group):
+        restriction = PageViewRestriction.objects.create(
+            page=Page.objects.get(slug=slug), restriction_type=PageViewRestriction.GROUPS
+        )
+        restriction.groups.add(group)
+
+    def get_visible_slugs(self):
+        pages = visible_tree_by_user(self.language, self.user)
+        return pages, sorted(pages.values_list('slug', flat=True))
+
+    def test_hidden_pages_are_filtered_with_a_subquery(self):
+        self.restrict('members', self.group)
+        self.restrict('others', Group.objects.create(name='Others'))
+
+        with override_settings(ION_VISIBILITY_CACHE=None):
+            _, expected = self.get_visible_slugs()
+        self.get_visible_slugs()  # fill the cache
+        pages, slugs = self.get_visible_slugs()
+
+        self.assertEqual(slugs, expected)
+        self.assertEqual(slugs, ['members', 'public'])
+        self.assertIn('EXISTS', str(pages.query))
+        self.assertNotIn('"wagtailcore_page"."id" IN', str(pages.query))
+
+    def test_tree_without_hidden_pages_is_not_filtered(self):
+        self.restrict('members', self.group)
+
+        self.get_visible_slugs()  # fill the cache
+        pages, slugs = self.get_visible_slugs()
+
+        self.assertEqual(slugs, ['members', 'others', 'public'])
+        self.assertNotIn('EXISTS', str(pages.query))
+
+
+@override_settings(ION_STREAM_COLLECTION_PAGES=False)
+class PageListQueriesTest(IonApiTestCase):
+    def add_pages(self, start, count):
+        for index in range(start, start + count):
+            parent = self.language.add_child(instance=TestPage(title=f'Page {index}', slug=f'page-{index}'))
+            parent.save_revision().publish()
+            child = parent.add_child(instance=StreamFieldPage(title=f'Child {index}', slug=f'child-{index}'))
+            child.save_revision().publish()
+
+    def get_collection(self):
+        response = self.get('/api/v1/en/collection')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(get_content(response))['collection'][0]['pages']
+
+    def test_parent_slugs_in_one_query(self):
+        self.add_pages(0, 3)
+        pages = list(Page.objects.descendant_of(self.language))
+
+        with self.assertNumQueries(1):
+            parent_slugs = get_parent_slugs(pages)
+
+        self.assertEqual(parent_slugs[self.language.path], 'en')
+        self.assertEqual(set(parent_slugs.values()), {'en', 'page-0', 'page-1', 'page-2'})
+
+    def test_queries_independent_of_page_count(self):
+        self.add_pages(0, 1)
+        self.get_collection()  # fill the content type cache
+        with CaptureQueriesContext(connection) as queries:
+            self.get_collection()
+
+        self.add_pages(1, 5)
+        with self.assertNumQueries(len(queries)):
+            pages = self.get_collection()
+
+        self.assertEqual(len(pages), 12)
+        self.assertEqual(
+            {page['identifier']: page['parent'] for page in pages if page['identifier'].startswith('child-')},
+            {f'child-{index}': f'page-{index}' for index in range(6)},
+        )
+
+
+@override_settings(ION_COLLECTION_PAGES_CHUNK_SIZE=2)
+class StreamedCollectionTest(IonApiTestCase):
+    def get_collection(self, stream):
+        with override_settings(ION_STREAM_COLLECTION_PAGES=stream):
+            response = self.get('/api/v1/en/collection')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.streaming, stream)
+        return get_content(response)
+
+    def test_empty_collection(self):
+        streamed = self.get_collection(stream=True)
+
+        self.assertEqual(streamed, self.get_collection(stream=False))
+        self.assertEqual(json.loads(streamed)['collection'][0]['pages'], [])
+
+    def test_pages_in_multiple_chunks(self):
+        for slug in ('a', 'b', 'c', 'd', 'e'):
+            self.language.add_child(instance=TestPage(title=slug.upper(), slug=slug)).save_revision().publish()
+
+        content_serializer = mock.Mock(wraps=CollectionDetailSerializer.content_serializer_class)
+        with mock.patch.object(CollectionDetailSerializer, 'content_serializer_class', content_serializer):
+            streamed = self.get_collection(stream=True)
+        self.assertEqual(content_serializer.call_count, 3)  # chunks of 2 pages
+
+        self.assertEqual(streamed, self.get_collection(stream=False))
+        self.assertEqual(len(json.loads(streamed)['collection'][0]['pages']), 5)
+
+
+@override_settings(ION_PAGE_CACHE='default')
+class PageCacheTest(MediaRootMixin, IonApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page = self.language.add_child(instance=TestPage(title='Page', slug='page'))
+        self.page.save_revision().publish()
+
+    def get_title(self):
+        return self.get_page('page')['contents'][0]['children'][0]['text']
+
+    def test_cached_until_published(self):
+        self.assertEqual(self.get_title(), 'Page')
+        Page.objects.filter(pk=self.page.pk).update(title='Not published')
+        self.assertEqual(self.get_title(), 'Page')  # served from the cache
+
+        self.page.refresh_from_db()
+        self.page.title = 'Published'
+        self.page.save_revision().publish()
+
+        self.assertEqual(self.get_title(), 'Published')
+
+    def test_invalidated_by_child_publish(self):
+        self.assertEqual(self.get_page('page')['children'], [])
+
+        self.page.add_child(instance=TestPage(title='Child', slug='child')).save_revision().publish()
+
+        self.assertEqual(self.get_page('page')['children'], ['child'])
+
+    def test_invalidated_by_unpublish(self):
+        self.get_page('page')
+
+        self.page.unpublish()
+
+        self.assertEqual(self.get('/api/v1/en/collection/page').status_code, 404)
+
+    def test_invalidated_by_file_change(self):
+        document = IonDocument.objects.create(title='Document', file=ContentFile(b'old', name='document.txt'))
+        self.page.document_field = document
+        self.page.save_revision().publish()
+        old_contents = self.get_page('page')['contents']
+
+        document.file = ContentFile(b'new', name='document.txt')
+        document.save()
+
+        self.assertNotEqual(self.get_page('page')['contents'], old_contents)
+
+    def test_batch_view_uses_the_page_cache(self):
+        self.get_page('page')
+        Page.objects.filter(pk=self.page.pk).update(title='Not published')
+
+        response = self.get('/api/v1/en/collection/pages/?slugs=page')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"Page"', get_content(response))
+
+
+@override_settings(ION_PROFILE_SERIALIZATION=True, ION_PAGE_CACHE='default')
+class ProfileSerializationTest(IonApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.language.add_child(instance=StreamFieldPage(title='Stream', slug='stream', stream=json.dumps([
+            {'type': 'heading', 'value': 'First'},
+            {'type': 'heading', 'value': 'Second'},
+            {'type': 'heading', 'value': 'Third'},
+        ]))).save_revision().publish()
+
+    def get_serializer_calls(self):
+        """Returns the call count per serializer method from the `Server-Timing` header of the page."""
+        response = self.get('/api/v1/en/collection/stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^ion;desc="ION serialization \(\d+ queries\)";dur=[\d.]+, ')
+        return {
+            key: int(calls)
+            for key, calls in re.findall(r'desc="([\w.]+) \((\d+) calls, \d+ queries\)"', response['Server-Timing'])
+        }
+
+    def test_server_timing_per_serializer_class(self):
+        calls = self.get_serializer_calls()
+
+        self.assertEqual(calls['IonContainerSerializer.serialize'], 1)
+        self.assertEqual(calls['IonStreamValueSerializer.build'], 1)
+        self.assertEqual(calls['IonTextSerializer.build'], 4)  # title & headings
+        self.assertEqual(calls['IonTextSerializer.serialize'], 4)
+
+    def test_profiled_requests_bypass_page_cache(self):
+        calls = self.get_serializer_calls()
+        self.assertEqual(self.get_serializer_calls(), calls)
+
+        # the profiled response has been cached for requests without profiling
+        with override_settings(ION_PROFILE_SERIALIZATION=False), \
+                mock.patch.object(DynamicPageDetailSerializer, 'build_tree') as build_tree:
+            response = self.get('/api/v1/en/collection/stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        build_tree.assert_not_called()
+
+
+class PageBatchTest(IonApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for slug in ('a', 'b', 'c', 'd'):
+            self.language.add_child(instance=TestPage(title=slug.upper(), slug=slug)).save_revision().publish()
+
+    def get_batch(self, slugs):
+        response = self.get(f'/api/v1/en/collection/pages/?slugs={",".join(slugs)}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(get_content(response))['page']
+
+    def count_batch_queries(self, slugs):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_batch(slugs)
+        return len(queries)
+
+    def test_same_details_as_page_detail(self):
+        self.assertEqual(self.get_batch(['b', 'unknown', 'a']), [self.get_page('a'), self.get_page('b')])
+
+    def test_post_slugs(self):
+        response = self.client.post(
+            '/api/v1/en/collection/pages/', json.dumps({'slugs': ['c']}), content_type='application/json',
+            HTTP_API_VERSION='1',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(get_content(response))['page'], [self.get_page('c')])
+
+    def test_queries_independent_of_batch_size(self):
+        self.get_batch(['a'])  # fill the content type cache
+
+        self.assertEqual(self.count_batch_queries(['a', 'b']), self.count_batch_queries(['a', 'b', 'c', 'd']))
+
+
+class UserCollectionsTest(TestCase):
+    def setUp(self):
+        root_collection = Collection.get_first_root_node()
+        self.collection = root_collection.add_child(name='Editors')
+        self.other_collection = root_collection.add_child(name='Others')
+        self.group = Group.objects.create(name='Image editors')
+        self.permission = Permission.objects.get(content_type__app_label='wagtailimages', codename='add_image')
+        GroupCollectionPermission.objects.create(
+            group=self.group, collection=self.collection, permission=self.permission
+        )
+        self.user = get_user_model().objects.create_user('editor', 'editor@example.com', 'password')
+        self.user.groups.add(self.group)
+
+    def get_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_collections_are_queried_once_per_request(self):
+        request = self.get_request(self.user)
+        with self.assertNumQueries(3):  # collection IDs, images, documents
+            list(get_user_images(self.user, request=request))
+            list(get_user_documents(self.user, request=request))
+        with self.assertNumQueries(1):
+            self.assertEqual(list(get_user_collections(self.user, request=request)), [self.collection])
+        with self.assertNumQueries(1):
+            self.assertFalse(get_user_collections(self.user, request=request).exclude(pk=self.collection.pk).exists())
+
+    def test_memo_is_scoped_to_request_and_user(self):
+        request = self.get_request(self.user)
+        self.assertEqual(list(get_user_collections(self.user, request=request)), [self.collection])
+
+        GroupCollectionPermission.objects.create(
+            group=self.group, collection=self.other_collection, permission=self.permission
+        )
+        self.assertEqual(list(get_user_collections(self.user, request=request)), [self.collection])
+        self.assertEqual(
+            set(get_user_collections(self.user, request=self.get_request(self.user))),
+            {self.collection, self.other_collection},
+        )
+
+        other_user = get_user_model().objects.create_user('other', 'other@example.com', 'password')
+        self.assertEqual(list(get_user_collections(other_user, request=request)), [])
+
+
+@override_settings(ION_LANGUAGE_CACHE='default')
+class LanguageCacheTest(IonApiTestCase):
+    def test_languages_are_cached(self):
+        self.assertEqual(resolve_language(self.collection, 'en'), self.language)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_language(self.collection, 'en'), self.language)
+
+    def test_invalidated_by_new_language(self):
+        self.assertEqual(resolve_language(self.collection, 'de'), self.language)  # default language
+
+        german = self.collection.add_child(instance=IonLanguage(title='Deutsch', slug='de', code='de'))
+
+        self.assertEqual(resolve_language(self.collection, 'de'), german)
+
+    def test_invalidated_by_unpublish_and_delete(self):
+        german = self.collection.add_child(instance=IonLanguage(title='Deutsch', slug='de', code='de'))
+        self.assertEqual(resolve_language(self.collection, 'de'), german)
+
+        german.unpublish()
+        self.assertEqual(resolve_language(self.collection, 'de'), self.language)
+
+        german.save_revision().publish()
+        self.assertEqual(resolve_language(self.collection, 'de'), german)
+
+        german.delete()
+        self.assertEqual(resolve_language(self.collection, 'de'), self.language)
+
+    def test_invalidated_by_move(self):
+        other_collection = self.root.add_child(instance=IonCollection(title='Other', slug='other'))
+        self.assertEqual(resolve_language(other_collection, 'en'), None)
+
+        self.language.move(other_collection, pos='last-child')
+
+        self.assertEqual(resolve_language(other_collection, 'en'), self.language)
+        self.assertEqual(resolve_language(self.collection, 'en'), None)
+
+
+class SerializerSlotsTest(SimpleTestCase):
+    def test_registered_serializers_have_no_instance_dict(self):
+        for serializer_class in IonSerializer.registry:
+            if serializer_class.__module__.startswith('wagtail_to_ion.'):
+                self.assertEqual(serializer_class.__dictoffset__, 0, serializer_class.__name__)
+
+    def test_serializer_tree_nodes_have_no_instance_dict(self):
+        container = IonContainerSerializer('container_0', context={})
+        container.add_child('data', [{'number': 1, 'text': 'text', 'flag': True, 'empty': None}])
+
+        stack = [container]
+        while stack:
+            node = stack.pop()
+            self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+            stack.extend(getattr(node, 'children', ()))
+
+
+class PrefixedOutletSerializer(DynamicPageDetailSerializer):
+    def remap_outlet_names_recursive(self, struct, path):
+        struct['outlet'] = f'ion_{struct["outlet"]}'
+        for item in struct.get('children', ()):
+            self.remap_outlet_names_recursive(item, path + [struct['outlet']])
+
+
+class OutletRemappingTest(IonApiTestCase):
+    def get_outlets(self, struct):
+        outlets = [struct['outlet']]
+        for child in struct.get('children', ()):
+            outlets += self.get_outlets(child)
+        return outlets
+
+    def test_remap_outlet_names_recursive_hook(self):
+        self.language.add_child(instance=StreamFieldPage(title='Stream', slug='stream', stream=json.dumps([
+            {'type': 'heading', 'value': 'Heading'},
+        ])))
+
+        with mock.patch.object(DynamicPageDetailView, 'serializer_class', PrefixedOutletSerializer):
+            contents = self.get_page('stream')['contents']
+
+        self.assertEqual(self.get_outlets(contents[0]), ['ion_container_0', 'ion_title', 'ion_stream', 'ion_heading'])
+
+    def test_remap_outlet_names_recursive_hook_on_nested_containers(self):
+        person = {'first_name': 'First', 'surname': 'Surname', 'photo': None, 'biography': '<p>Biography</p>'}
+        page = self.language.add_child(instance=StreamFieldPage(title='Stream', slug='stream', stream=json.dumps([
+            {'type': 'person', 'value': person},
+            {'type': 'group', 'value': [person, person]},
+        ])))
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        # remapping the complete serialized tree afterwards gives the same result as remapping while serializing
+        expected = DynamicPageDetailSerializer(page, context={'request': request}).get_contents(page)[0]
+        PrefixedOutletSerializer(page, context={'request': request}).remap_outlet_names_recursive(expected, [])
+        remapped = PrefixedOutletSerializer(page, context={'request': request}).get_contents(page)[0]
+
+        self.assertEqual(remapped, expected)
+        self.assertIn('ion_first_name', self.get_outlets(remapped))
+
+
+class UploadedFileMetadataTest(MediaRootMixin, TestCase):
+    def test_stored_file_is_not_read_after_upload(self):
+        document = IonDocument(title='Document')
+        document.file = upload_file('document.txt', b'document content')
+
+        with mock.patch('wagtail_to_ion.fields.files.hash_local_file') as hash_local_file, \
+                mock.patch.object(FileSystemStorage, 'open') as storage_open:
+            document.save()
+            document = IonDocument.objects.get(pk=document.pk)
+            checksum, mime_type = document.file.checksum, document.file.mime_type
+
+        hash_local_file.assert_not_called()
+        storage_open.assert_not_called()
+        self.assertEqual(
+            checksum,
+            'sha256:10afffe7accc587629a2eff8d84703a87a847b17dc931f20ea4bdf925fc31810',
+        )
+        self.assertEqual(mime_type, 'text/plain')
+        self.assertEqual(document.file_size, 16)
+        self.assertIsNotNone(document.file_last_modified)
+
+
+class MissingFileMetadataTest(MediaRootMixin, TestCase):
+    def test_serialized_from_the_file(self):
+        document = IonDocument.objects.create(title='Document', file=ContentFile(b'document content', name='doc.txt'))
+        # a record created before the file meta fields existed
+        IonDocument.objects.filter(pk=document.pk).update(
+            checksum='', mime_type='', file_size=None, file_last_modified=None
+        )
+        request = RequestFactory().get('/')
+
+        data = IonDocumentSerializer('document', IonDocument.objects.get(pk=document.pk), context={
+            'request': request,
+        }).serialize()
+
+        self.assertEqual(data['checksum'], 'sha256:10afffe7accc587629a2eff8d84703a87a847b17dc931f20ea4bdf925fc31810')
+        self.assertEqual(data['mime_type'], 'text/plain')
+        self.assertEqual(data['file_size'], 16)
+
+    def test_missing_media_file_is_no_video(self):
+        media = IonMedia(title='Media', file='media/missing.mp4', mime_type=None)
+
+        self.assertFalse(media.is_video_file)
+        self.assertFalse(media.transcode_single_pass)
+
+
+class UsageTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = Page.get_first_root_node().add_child(instance=TestPage(title='Pages', slug='pages'))
+
+    def create_documents(self, count):
+        documents = [
+            IonDocument.objects.create(title=f'Document {index}', file=ContentFile(b'content', name='document.txt'))
+            for index in range(count)
+        ]
+        pages = [
+            self.parent.add_child(instance=TestPage(title=f'Page {index}', document_field=document))
+            for index, document in enumerate(documents)
+        ]
+        return documents, pages
+
+    def count_usage_queries(self, documents):
+        with CaptureQueriesContext(connection) as queries:
+            get_usage_for_objects(documents)
+        return len(queries)
+
+    def test_bulk_usage(self):
+        documents, pages = self.create_documents(3)
+        unused = IonDocument.objects.create(title='Unused', file=ContentFile(b'content', name='document.txt'))
+
+        usage = get_usage_for_objects(documents + [unused])
+
+        for document, page in zip(documents, pages):
+            self.assertEqual([used_by.pk for used_by in usage[document]], [page.pk])
+        self.assertEqual(usage[unused], [])
+
+    def test_bulk_usage_queries_independent_of_batch_size(self):
+        documents, _ = self.create_documents(6)
+        get_usage_for_objects(documents)  # fill the content type cache
+
+        self.assertEqual(self.count_usage_queries(documents[:2]), self.count_usage_queries(documents))
+
+
+def create_image(title='Image'):
+    file = io.BytesIO()
+    PILImage.new('RGB', (1, 1)).save(file, 'PNG')
+    return IonImage.objects.create(title=title, file=ContentFile(file.getvalue(), name='image.png'))
+
+
+class ReferenceIndexTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = create_image()
+        self.page = self.add_page('page', self.image)
+
+    def add_page(self, slug, image):
+        stream = json.dumps([{'type': 'image', 'value': image.pk}])
+        return Page.get_first_root_node().add_child(instance=StreamFieldPage(title=slug, slug=slug, stream=stream))
+
+    def get_usage(self, image):
+        return [page.pk for page in get_usage_for_objects([image])[image]]
+
+    def test_usage_is_looked_up_in_the_index(self):
+        # change the content without updating the index
+        StreamFieldPage.objects.filter(pk=self.page.pk).update(stream=StreamValue(self.page.stream.stream_block, []))
+
+        self.assertEqual(self.get_usage(self.image), [self.page.pk])
+
+    def test_pages_not_indexed_are_inspected(self):
+        IonObjectReference.objects.all().delete()
+
+        self.assertEqual(self.get_usage(self.image), [self.page.pk])
+
+    def test_revisions_are_not_indexed(self):
+        draft_image = create_image('Draft')
+        self.page.stream = json.dumps([{'type': 'image', 'value': draft_image.pk}])
+        self.page.save_revision()
+
+        self.assertEqual(IonObjectReference.objects.filter(object_id=str(draft_image.pk)).count(), 0)
+        self.assertEqual(self.get_usage(draft_image), [])
+
+    def test_rebuild_indexes_every_page_once(self):
+        other_page = self.add_page('other', self.image)
+        IonObjectReference.objects.all().delete()
+
+        call_command('ion_rebuild_reference_index', stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(IonObjectReference.objects.values_list('page_id', 'object_id')),
+            sorted([(self.page.pk, ''), (self.page.pk, str(self.image.pk)), (other_page.pk, ''),
+                    (other_page.pk, str(self.image.pk))]),
+        )
+
+
+class StubS3Object:
+    def __init__(self, bucket, key):
+        self.bucket = bucket
+        self.key = key
+        self.size = self.content_length = bucket.files.get(key)
+        self.last_modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def load(self):
+        self.bucket.requests.append(('HEAD', self.key))
+        if self.key not in self.bucket.files:
+            raise FileNotFoundError(self.key)
+
+
+class StubS3Bucket:
+    """Implements the parts of a boto3 `Bucket` resource used by `IonS3StatMixin`."""
+
+    def __init__(self, files, page_size=1000):
+        self.files = files
+        self.page_size = page_size
+        self.requests = []
+        self.objects = self
+
+    def Object(self, key):
+        return StubS3Object(self, key)
+
+    def filter(self, Prefix, Delimiter, Marker):
+        self.listing = (Prefix, Delimiter, Marker)
+        return self
+
+    def pages(self):
+        prefix, delimiter, marker = self.listing
+        keys = sorted(
+            key for key in self.files
+            if key.startswith(prefix) and key > marker and delimiter not in key[len(prefix):]
+        )
+        for index in range(0, len(keys), self.page_size):
+            self.requests.append(('LIST', prefix))
+            yield [StubS3Object(self, key) for key in keys[index:index + self.page_size]]
+
+
+class StubS3Storage(IonS3StatMixin):
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def _ion_key(self, name):
+        return name  # django-storages (cleaning the names) is not installed in the test project
+
+
+class S3StatTest(SimpleTestCase):
+    def test_few_files_are_stated_by_head_requests(self):
+        bucket = StubS3Bucket({'images/a.jpg': 1, 'images/b.jpg': 2, 'images/c.jpg': 3})
+
+        stats = StubS3Storage(bucket).ion_stat_many(['images/a.jpg', 'images/b.jpg', 'images/missing.jpg'])
+
+        self.assertEqual({name: stat.size for name, stat in stats.items()}, {'images/a.jpg': 1, 'images/b.jpg': 2})
+        self.assertEqual(
+            sorted(bucket.requests),
+            [('HEAD', 'images/a.jpg'), ('HEAD', 'images/b.jpg'), ('HEAD', 'images/missing.jpg')],
+        )
+
+    def test_many_files_are_stated_by_listing_their_directory(self):
+        files = {f'images/{index:03}.jpg': index for index in range(100)}
+        files.update({f'images/thumbnails/{index:03}.jpg': index for index in range(100)})
+        bucket = StubS3Bucket(files, page_size=30)
+        names = [f'images/{index:03}.jpg' for index in range(10, 40)] + ['images/missing.jpg']
+
+        stats = StubS3Storage(bucket).ion_stat_many(names)
+
+        self.assertEqual(len(stats), 30)
+        self.assertEqual(stats['images/010.jpg'].size, 10)
+        # one page of the directory (without the subdirectory) contains all existing files, listing the remaining
+        # objects of the directory would be more expensive than a HEAD request for the last file
+        self.assertEqual(bucket.requests, [('LIST', 'images/'), ('HEAD', 'images/missing.jpg')])
+
+    def test_listing_stops_after_the_last_file(self):
+        bucket = StubS3Bucket({f'images/{index:03}.jpg': index for index in range(100)}, page_size=10)
+        names = [f'images/{index:03}.jpg' for index in range(20, 40, 2)] + ['images/025.jpg']
+
+        stats = StubS3Storage(bucket).ion_stat_many(names)
+
+        self.assertEqual(len(stats), 11)
+        self.assertEqual(bucket.requests, [('LIST', 'images/'), ('LIST', 'images/')])
+
+    def test_listing_stops_when_head_requests_are_cheaper(self):
+        bucket = StubS3Bucket({f'images/{index:04}.jpg': index for index in range(1000)}, page_size=10)
+        names = [f'images/{index:04}.jpg' for index in range(0, 1000, 100)]
+
+        stats = StubS3Storage(bucket).ion_stat_many(names)
+
+        self.assertEqual(len(stats), 10)
+        requests = [method for method, _ in bucket.requests]
+        self.assertLessEqual(len(requests), 2 * len(names))
+        self.assertIn('HEAD', requests)
+
+
+class FileSystemStatTest(MediaRootMixin, SimpleTestCase):
+    def test_stat_file(self):
+        storage = FileSystemStorage()
+        name = storage.save('file.txt', ContentFile(b'content'))
+
+        for use_tz in (True, False):
+            with self.subTest(use_tz=use_tz), override_settings(USE_TZ=use_tz):
+                self.assertEqual(stat_file(storage, name), (7, storage.get_modified_time(name)))
+
+
+class SetFileMetadataTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.documents = [
+            IonDocument.objects.create(title=f'Document {index}', file=ContentFile(b'content', name=f'{index}.txt'))
+            for index in range(5)
+        ]
+        IonDocument.objects.update(file_last_modified=None)
+        self.checkpoint_path = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.checkpoint_path))
+
+    def set_file_metadata(self):
+        ion_set_file_metadata.set_file_metadata(
+            workers=1, batch_size=2, checkpoint_path=self.checkpoint_path, log=lambda message: None
+        )
+
+    def get_updated_documents(self):
+        return list(IonDocument.objects.filter(file_last_modified__isnull=False).order_by('pk'))
+
+    def test_interrupted_run_resumes_after_checkpoint(self):
+        read_file_metadata = ion_set_file_metadata.read_file_metadata
+
+        def interrupt_at_last_batch(obj, file_fields):
+            if obj.pk == self.documents[4].pk:
+                raise KeyboardInterrupt
+            return read_file_metadata(obj, file_fields)
+
+        with mock.patch.object(ion_set_file_metadata, 'read_file_metadata', interrupt_at_last_batch):
+            with self.assertRaises(KeyboardInterrupt):
+                self.set_file_metadata()
+
+        self.assertEqual(self.get_updated_documents(), self.documents[:4])
+        self.assertEqual(ion_set_file_metadata.load_checkpoint(self.checkpoint_path), {
+            'test_app.IonDocument': self.documents[3].pk,
+        })
+
+        with mock.patch.object(ion_set_file_metadata, 'read_file_metadata', wraps=read_file_metadata) as read:
+            self.set_file_metadata()
+
+        self.assertEqual([call.args[0] for call in read.call_args_list], [self.documents[4]])
+        self.assertEqual(self.get_updated_documents(), self.documents)
+
+    def test_page_cache_is_invalidated_once_per_updated_model(self):
+        with mock.patch.object(ion_set_file_metadata, 'invalidate_page_cache') as invalidate_page_cache:
+            self.set_file_metadata()
+
+        invalidate_page_cache.assert_called_once_with()
+
+
+class SourceCacheTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = Path(directory)
+        self.files = [
+            IonDocument.objects.create(title='Document', file=ContentFile(b'%10d' % index, name='file.txt')).file
+            for index in range(3)
+        ]
+
+    def get_cache(self, max_size):
+        cache = SourceCache(self.directory, max_size)
+        download = mock.patch.object(cache, '_download', wraps=cache._download)
+        self.download = download.start()
+        self.addCleanup(download.stop)
+        return cache
+
+    def get_refs(self, cache, file):
+        return cache._read_index()[file.instance.checksum[len('sha256:'):]]['refs']
+
+    def test_files_are_downloaded_once(self):
+        cache = self.get_cache(max_size=0)
+
+        path = cache.acquire(self.files[0])
+        self.assertEqual(cache.acquire(self.files[0]), path)
+
+        self.assertEqual(path.read_bytes(), b'%10d' % 0)
+        self.assertEqual(self.download.call_count, 1)
+        self.assertEqual(self.get_refs(cache, self.files[0]), [os.getpid(), os.getpid()])
+
+    def test_referenced_files_are_not_evicted(self):
+        cache = self.get_cache(max_size=0)
+        path = cache.acquire(self.files[0])
+        cache.acquire(self.files[0])
+
+        cache.release(self.files[0])
+        self.assertTrue(path.exists())
+
+        cache.release(self.files[0])
+        self.assertFalse(path.exists())
+        self.assertEqual(cache._read_index(), {})
+
+    def test_least_recently_used_files_are_evicted(self):
+        cache = self.get_cache(max_size=20)
+        paths = []
+        for file in self.files:
+            paths.append(cache.acquire(file))
+            cache.release(file)
+
+        self.assertEqual([path.exists() for path in paths], [False, True, True])
+
+        # a cached file is used again without a download
+        cache.acquire(self.files[1])
+        cache.release(self.files[1])
+        self.assertEqual(self.download.call_count, 3)
+
+    def test_missing_files_are_evicted(self):
+        cache = self.get_cache(max_size=0)
+        path = cache.acquire(self.files[0])
+        path.unlink()  # e.g. removed by a cleanup of the temporary directory
+        (self.directory / f'{path.name}.lock').unlink()
+
+        cache.release(self.files[0])
+
+        self.assertEqual(cache._read_index(), {})
+
+    def test_references_of_dead_processes_are_dropped(self):
+        cache = self.get_cache(max_size=0)
+        path = cache.acquire(self.files[0])
+        process = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], stdout=subprocess.PIPE)
+        with cache._index() as index:
+            entry = next(iter(index.values()))
+            entry['refs'] = [int(process.stdout)]
+
+        cache.release(self.files[1])  # evicts unused files
+
+        self.assertFalse(path.exists())
+
+
+VIDEO_CONTENT = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom' + b'\x00' * 100  # detected as `video/mp4`
+
+
+class TranscodeVideoRenditionsTest(SimpleTestCase):
+    def setUp(self):
+        run = mock.patch('wagtail_to_ion.ffmpeg_jobs.subprocess.run')
+        self.run = run.start()
+        self.addCleanup(run.stop)
+        self.metadata = ffmpeg_jobs.VideoMetaData(width=1920, height=1080, duration=10)
+        self.outputs = [
+            ffmpeg_jobs.RenditionOutput(Path(f'/out/{name}.mp4'), config, Path(f'/out/{name}.jpg'))
+            for name, config in settings.ION_VIDEO_RENDITIONS.items()
+        ]
+
+    def test_single_command_line(self):
+        ffmpeg_jobs.transcode_video_renditions(
+            Path('/in/video.mp4'), self.metadata, self.outputs, thumbnail_path=Path('/out/thumb.jpg')
+        )
+
+        self.run.assert_called_once()
+        self.assertEqual(self.run.call_args[0][0], [
+            ffmpeg_jobs.ffmpeg, '-y', '-i', '/in/video.mp4', '-filter_complex', ';'.join([
+                '[0:v]split=3[s0][s1][s2]',
+                '[s0]scale=1280.0:720[v0]',
+                '[s1]scale=1920.0:1080[v1]',
+                '[s2]trim=start=2,select=eq(n\\,0),split=3[t0s][t1s][thumbs]',
+                '[t0s]scale=1280.0:720[t0]',
+                '[t1s]scale=1920.0:1080[t1]',
+                '[thumbs]null[thumb]',
+            ]),
+            '-map', '[v0]', '-map', '0:a:0?', '-vcodec', 'libx264', '-crf', '28', '-preset', 'slow',
+            '-acodec', 'aac', '-b:a', '96k', '-ac', '2', '-movflags', '+faststart', '-strict', '-2', '/out/720p.mp4',
+            '-map', '[t0]', '-frames:v', '1', '-update', '1', '/out/720p.jpg',
+            '-map', '[v1]', '-map', '0:a:0?', '-vcodec', 'libx264', '-crf', '28', '-preset', 'slow',
+            '-acodec', 'aac', '-b:a', '128k', '-ac', '2', '-movflags', '+faststart', '-strict', '-2', '/out/1080p.mp4',
+            '-map', '[t1]', '-frames:v', '1', '-update', '1', '/out/1080p.jpg',
+            '-map', '[thumb]', '-frames:v', '1', '-update', '1', '/out/thumb.jpg',
+        ])
+
+    def test_failed_run_raises_codec_error(self):
+        self.run.side_effect = subprocess.CalledProcessError(1, 'ffmpeg', stderr=b'Invalid data')
+
+        with self.assertRaises(ffmpeg_jobs.CodecProcessError) as context:
+            ffmpeg_jobs.transcode_video_renditions(Path('/in/video.mp4'), self.metadata, self.outputs)
+
+        self.assertIn('-filter_complex', str(context.exception))
+        self.assertIn('Invalid data', str(context.exception))
+
+
+@override_settings(ION_TRANSCODE_SINGLE_PASS=True)
+class GenerateMediaRenditionsTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.failing_suffix = None
+        run = mock.patch('wagtail_to_ion.ffmpeg_jobs.subprocess.run', side_effect=self.fake_run)
+        self.subprocess_run = run.start()
+        self.addCleanup(run.stop)
+
+    def fake_run(self, command, **kwargs):
+        """Fake ffprobe & ffmpeg runs: probe videos by their name, write all output files."""
+        if self.failing_suffix is not None and command[-1].endswith(self.failing_suffix):
+            raise subprocess.CalledProcessError(1, command[0], stderr=b'Invalid data')
+        if command[0] == ffmpeg_jobs.ffprobe:
+            width, height = (1280, 720) if command[-1].endswith('-720p.mp4') else (1920, 1080)
+            streams = [{'width': width, 'height': height, 'duration': '10.0'}]
+            return subprocess.CompletedProcess(command, 0, stdout=json.dumps({'streams': streams}).encode('utf-8'))
+        for index, arg in enumerate(command):
+            if arg == '-2' or (arg == '-update' and command[index + 1] == '1'):
+                Path(command[index + (1 if arg == '-2' else 2)]).write_bytes(b'output')
+        return subprocess.CompletedProcess(command, 0, stdout=b'')
+
+    def create_media(self):
+        with mock.patch('wagtail_to_ion.models.file_based_models.generate_media_renditions') as task, \
+                mock.patch('wagtail_to_ion.models.file_based_models.generate_media_thumbnail') as thumbnail_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            media = IonMedia(title='Video', type='video')
+            media.file = ContentFile(VIDEO_CONTENT, name='video.mp4')  # like an upload (sets `file.has_changed`)
+            media.save()
+        task.delay.assert_called_once_with(media.pk)
+        thumbnail_task.delay.assert_not_called()
+        return media
+
+    def test_renditions_are_bulk_created(self):
+        with mock.patch('wagtail_to_ion.models.file_based_models.generate_media_rendition') as rendition_task:
+            media = self.create_media()
+
+        rendition_task.delay.assert_not_called()
+        self.assertEqual(
+            sorted(media.renditions.values_list('name', 'transcode_finished', 'transcode_errors')),
+            [('1080p', False, None), ('720p', False, None)],
+        )
+
+    def test_renditions_are_transcoded_in_one_run(self):
+        media = self.create_media()
+
+        generate_media_renditions(media.pk)
+
+        ffmpeg_runs = [call for call in self.subprocess_run.call_args_list if call[0][0][0] == ffmpeg_jobs.ffmpeg]
+        self.assertEqual(len(ffmpeg_runs), 1)
+        media.refresh_from_db()
+        self.assertEqual((media.width, media.height, media.duration), (1920, 1080, 10))
+        self.assertTrue(media.thumbnail.name.endswith('.jpg'))
+        renditions = {rendition.name: rendition for rendition in media.renditions.all()}
+        self.assertEqual(
+            {name: (r.transcode_finished, r.transcode_errors, r.width, r.height) for name, r in renditions.items()},
+            {'720p': (True, None, 1280, 720), '1080p': (True, None, 1920, 1080)},
+        )
+        self.assertEqual(renditions['720p'].file.read(), b'output')
+
+    def test_errors_are_assigned_to_unfinished_renditions(self):
+        media = self.create_media()
+        # the renditions are stored in order: probing the last one fails after the others are finished
+        *finished_names, failing_name = [rendition.name for rendition in media.renditions.all()]
+        self.failing_suffix = f'-{failing_name}.mp4'
+
+        generate_media_renditions(media.pk)
+
+        renditions = {rendition.name: rendition for rendition in media.renditions.all()}
+        for name in finished_names:
+            self.assertEqual((renditions[name].transcode_finished, renditions[name].transcode_errors), (True, None))
+        self.assertFalse(renditions[failing_name].transcode_finished)
+        self.assertIn('Invalid data', renditions[failing_name].transcode_errors)
+
+    def test_failed_transcoding_is_assigned_to_all_renditions(self):
+        media = self.create_media()
+        self.failing_suffix = '-thumb.jpg'  # the last output of the transcoding run
+
+        generate_media_renditions(media.pk)
+
+        media.refresh_from_db()
+        self.assertTrue(media.thumbnail.name.startswith(f'media_thumbnails/blank-{media.pk}'))
+        for rendition in media.renditions.all():
+            self.assertFalse(rendition.transcode_finished)
+            self.assertIn('-filter_complex', rendition.transcode_errors)
+            self.assertIn('Invalid data', rendition.transcode_errors)
@@ -178,6 +178,13 @@ ION_LANGUAGE_MODEL = 'test_app.IonLanguage'
 ION_IMAGE_RENDITION_MODEL = 'test_app.IonRendition'
 ION_MEDIA_RENDITION_MODEL = 'test_app.IonMediaRendition'
 ION_CONTENT_TYPE_DESCRIPTION_MODEL = 'test_app.ContentTypeDescription'
+ION_OBJECT_REFERENCE_MODEL = 'test_app.IonObjectReference'
+ION_PAGE_CHANGE_MODEL = 'test_app.IonPageChange'
+
+FILE_UPLOAD_HANDLERS = [
+    'wagtail_to_ion.uploadhandler.IonMemoryFileUploadHandler',
+    'wagtail_to_ion.uploadhandler.IonTemporaryFileUploadHandler',
+]
 
 # local setting overrides
 try:
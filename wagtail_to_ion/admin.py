@@ -2,6 +2,7 @@
 from django.contrib import admin
 
 from wagtail_to_ion.models import get_ion_media_rendition_model
+from wagtail_to_ion.models.file_based_models import get_usage_for_objects, prefetch_usage
 
 
 class ProtectInUseModelAdmin(admin.ModelAdmin):
@@ -9,17 +10,23 @@ class ProtectInUseModelAdmin(admin.ModelAdmin):
 
     def get_deleted_objects(self, objs, request):
         if self.protect_objects_in_use:
-            protected = []
+            protected = {}  # de-duplicated, keeps the order
 
-            for obj in objs:
-                usage = obj.get_usage()
-                if usage:
-                    protected += list(usage)
+            for usage in get_usage_for_objects(objs).values():
+                protected.update(dict.fromkeys(usage))
             if protected:
-                return [], {}, set(), protected
+                return [], {}, set(), list(protected)
 
         return super().get_deleted_objects(objs, request)
 
+    def delete_queryset(self, request, queryset):
+        if not self.protect_objects_in_use:
+            return super().delete_queryset(request, queryset)
+
+        # check the usage of all objects at once instead of once per object in `prevent_deletion_if_in_use`
+        with prefetch_usage(queryset):
+            super().delete_queryset(request, queryset)
+
 
 class AbstractIonImageAdmin(ProtectInUseModelAdmin):
     list_display = ('title', 'collection', 'include_in_archive')
@@ -4,3 +4,19 @@ from django.apps import AppConfig
 
 class WagtailToIonConfig(AppConfig):
     name = 'wagtail_to_ion'
+
+    def ready(self):
+        from django.apps import apps
+
+        from wagtail_to_ion.models.change_log import connect_change_log_receivers
+        from wagtail_to_ion.models.file_based_models import connect_file_model_receivers
+        from wagtail_to_ion.models.page_models import connect_page_receivers
+        from wagtail_to_ion.models.reference_index import connect_reference_index_receivers
+
+        # model signal receivers are only connected to the relevant (concrete) models
+        for model in apps.get_models():
+            connect_page_receivers(model)
+            connect_file_model_receivers(model)
+            connect_reference_index_receivers(model)
+
+        connect_change_log_receivers()
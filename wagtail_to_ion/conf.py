@@ -14,6 +14,24 @@ settings.ION_COLLECTION_MODEL = getattr(
     'wagtail_to_ion.Collection'
 )
 
+settings.ION_OBJECT_REFERENCE_MODEL = getattr(
+    settings,
+    'ION_OBJECT_REFERENCE_MODEL',
+    None
+)
+
+settings.ION_PAGE_CHANGE_MODEL = getattr(
+    settings,
+    'ION_PAGE_CHANGE_MODEL',
+    None
+)
+
+settings.ION_PAGE_CHANGE_WINDOW = getattr(
+    settings,
+    'ION_PAGE_CHANGE_WINDOW',
+    60
+)
+
 settings.ION_ALLOW_MISSING_FILES = getattr(
     settings,
     'ION_ALLOW_MISSING_FILES',
@@ -27,8 +45,86 @@ settings.ION_ARCHIVE_BUILD_URL_FUNCTION = getattr(
     None
 )
 
+settings.ION_STREAM_COLLECTION_PAGES = getattr(
+    settings,
+    'ION_STREAM_COLLECTION_PAGES',
+    False
+)
+
+settings.ION_COLLECTION_PAGES_CHUNK_SIZE = getattr(
+    settings,
+    'ION_COLLECTION_PAGES_CHUNK_SIZE',
+    1000
+)
+
+settings.ION_STREAM_BLOCK_CACHE = getattr(
+    settings,
+    'ION_STREAM_BLOCK_CACHE',
+    None
+)
+
+settings.ION_STREAM_BLOCK_CACHE_TIMEOUT = getattr(
+    settings,
+    'ION_STREAM_BLOCK_CACHE_TIMEOUT',
+    24 * 60 * 60
+)
+
+settings.ION_CACHE_CONTROL = getattr(
+    settings,
+    'ION_CACHE_CONTROL',
+    {}
+)
+
+settings.ION_PAGE_CACHE = getattr(
+    settings,
+    'ION_PAGE_CACHE',
+    None
+)
+
+settings.ION_PAGE_CACHE_TIMEOUT = getattr(
+    settings,
+    'ION_PAGE_CACHE_TIMEOUT',
+    24 * 60 * 60
+)
+
+settings.ION_LANGUAGE_CACHE = getattr(
+    settings,
+    'ION_LANGUAGE_CACHE',
+    None
+)
+
+settings.ION_VISIBILITY_CACHE = getattr(
+    settings,
+    'ION_VISIBILITY_CACHE',
+    None
+)
+
+settings.ION_VISIBILITY_CACHE_TIMEOUT = getattr(
+    settings,
+    'ION_VISIBILITY_CACHE_TIMEOUT',
+    24 * 60 * 60
+)
+
+settings.ION_PROFILE_SERIALIZATION = getattr(
+    settings,
+    'ION_PROFILE_SERIALIZATION',
+    False
+)
+
 settings.ION_TRANSCODE_DIR = getattr(
     settings,
     'ION_TRANSCODE_DIR',
     mkdtemp()
+)
+
+settings.ION_TRANSCODE_CACHE_SIZE = getattr(
+    settings,
+    'ION_TRANSCODE_CACHE_SIZE',
+    0
+)
+
+settings.ION_TRANSCODE_SINGLE_PASS = getattr(
+    settings,
+    'ION_TRANSCODE_SINGLE_PASS',
+    False
 )
\ No newline at end of file
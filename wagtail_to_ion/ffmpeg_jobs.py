@@ -2,7 +2,7 @@ import json
 import os
 import subprocess
 from pathlib import Path
-from typing import Optional, NamedTuple
+from typing import List, NamedTuple, Optional, Sequence, Tuple
 
 
 # Use ffmpeg from user's bin if it exists, global ffmpeg otherwise
@@ -30,6 +30,12 @@ class VideoMetaData(NamedTuple):
     duration: int
 
 
+class RenditionOutput(NamedTuple):
+    path: Path
+    config: dict  # transcode settings (see `ION_VIDEO_RENDITIONS`)
+    thumbnail_path: Optional[Path] = None
+
+
 def extract_audio_metadata(input_path: Path) -> Optional[AudioMetaData]:
     # audio media info
     probe = [
@@ -128,24 +134,8 @@ def extract_video_thumbnail(input_path: Path, output_path: Path, video_duration:
         raise CodecProcessError(errors)
 
 
-def transcode_video(input_path: Path, output_path: Path, meta_data: VideoMetaData, config: dict):
-    # Construct the several parts of the ffmpeg command line piece by piece.
-    # No shell expansion in order to avoid file name injections.
-    #
-    #   head: input file
-    # vcodec: x264, higher crf gives better compression, as does 'slower' preset
-    # compat: not used, only for reference - add to cmd when devices require it
-    # scaler: hardcoded scaling to 720p while keeping aspect ratio
-    # acodec: hardcoded 96kbps AAC
-    #   tail: reorder file header for playing while still streaming,
-    #         -strict -2 allows us to use the older LTS-16.04 ffmpeg
-    #
-
-    head = [
-        ffmpeg,
-        '-i', str(input_path),
-    ]
-    vcodec = [
+def get_video_codec_args(config: dict) -> List[str]:
+    return [
         '-vcodec',
         config['video']['codec'],
         '-' + config['video']['method'],
@@ -153,20 +143,17 @@ def transcode_video(input_path: Path, output_path: Path, meta_data: VideoMetaDat
         '-preset',
         config['video']['preset']
     ]
-    # compat = ['-profile:v', 'high', '-level', '4.0']
-    acodec = [
+
+
+def get_audio_codec_args(config: dict) -> List[str]:
+    return [
         '-acodec', config['audio']['codec'],
         '-b:a', str(config['audio']['bitrate']) + 'k',
         '-ac', '2'
     ]
-    tail = [
-        '-movflags', '+faststart',
-        '-y',
-        '-strict',
-        '-2',
-        str(output_path),
-    ]
 
+
+def get_rendition_size(meta_data: VideoMetaData, config: dict) -> Tuple[float, float]:
     w = config['video']['size'][0]
     h = config['video']['size'][1]
 
@@ -186,9 +173,40 @@ def transcode_video(input_path: Path, output_path: Path, meta_data: VideoMetaDat
         w = meta_data.width
         h = meta_data.height
 
+    return w, h
+
+
+def transcode_video(input_path: Path, output_path: Path, meta_data: VideoMetaData, config: dict):
+    # Construct the several parts of the ffmpeg command line piece by piece.
+    # No shell expansion in order to avoid file name injections.
+    #
+    #   head: input file
+    # vcodec: x264, higher crf gives better compression, as does 'slower' preset
+    # compat: not used, only for reference - add to cmd when devices require it
+    # scaler: hardcoded scaling to 720p while keeping aspect ratio
+    # acodec: hardcoded 96kbps AAC
+    #   tail: reorder file header for playing while still streaming,
+    #         -strict -2 allows us to use the older LTS-16.04 ffmpeg
+    #
+
+    head = [
+        ffmpeg,
+        '-i', str(input_path),
+    ]
+    vcodec = get_video_codec_args(config)
+    # compat = ['-profile:v', 'high', '-level', '4.0']
+    acodec = get_audio_codec_args(config)
+    tail = [
+        '-movflags', '+faststart',
+        '-y',
+        '-strict',
+        '-2',
+        str(output_path),
+    ]
+
     scaler = [
         '-filter:v',
-        'scale={}:{}'.format(w, h)
+        'scale={}:{}'.format(*get_rendition_size(meta_data, config))
     ]
 
     try:
@@ -205,3 +223,81 @@ def transcode_video(input_path: Path, output_path: Path, meta_data: VideoMetaDat
         else:
             errors += str(e)
         raise CodecProcessError(errors)
+
+
+def transcode_video_renditions(
+    input_path: Path,
+    meta_data: VideoMetaData,
+    outputs: Sequence[RenditionOutput],
+    thumbnail_path: Optional[Path] = None,
+):
+    """
+    Transcode all renditions (and extract their thumbnails) with one ffmpeg run decoding the input only once.
+
+    The decoded video is split into one scaled stream per rendition and one stream selecting the thumbnail
+    frame, which is split again & scaled for the rendition thumbnails and the thumbnail of the input video
+    (`thumbnail_path`).
+    """
+    thumbnails = [
+        (f't{i}', get_rendition_size(meta_data, output.config))
+        for i, output in enumerate(outputs)
+        if output.thumbnail_path is not None
+    ]
+    if thumbnail_path is not None:
+        thumbnails.append(('thumb', None))  # original size
+    streams = len(outputs) + (1 if thumbnails else 0)
+    if not streams:
+        return
+
+    # filter graph: [0:v] -> split -> scale -> [v<i>] (renditions)
+    #                             \-> select thumbnail frame -> split (-> scale) -> [t<i>] & [thumb] (thumbnails)
+    filters = ['[0:v]split={}{}'.format(streams, ''.join(f'[s{i}]' for i in range(streams)))]
+    for i, output in enumerate(outputs):
+        w, h = get_rendition_size(meta_data, output.config)
+        filters.append(f'[s{i}]scale={w}:{h}[v{i}]')
+    if thumbnails:
+        # same frame as `extract_video_thumbnail()`: the first frame for short videos else the one at 2 seconds;
+        # selected in the filter graph (an output `-ss` would encode all frames before the position)
+        filters.append('[s{}]trim=start={},select=eq(n\\,0),split={}{}'.format(
+            len(outputs),
+            2 if meta_data.duration > 5 else 0,
+            len(thumbnails),
+            ''.join(f'[{name}s]' for name, _ in thumbnails),
+        ))
+        for name, size in thumbnails:
+            filters.append(f'[{name}s]scale={size[0]}:{size[1]}[{name}]' if size else f'[{name}s]null[{name}]')
+
+    head = [
+        ffmpeg,
+        '-y',
+        '-i', str(input_path),
+        '-filter_complex', ';'.join(filters),
+    ]
+    thumbnail_args = ['-frames:v', '1', '-update', '1']
+    tail = []
+    for i, output in enumerate(outputs):
+        tail += (
+            ['-map', f'[v{i}]', '-map', '0:a:0?']
+            + get_video_codec_args(output.config)
+            + get_audio_codec_args(output.config)
+            + ['-movflags', '+faststart', '-strict', '-2', str(output.path)]
+        )
+        if output.thumbnail_path is not None:
+            tail += ['-map', f'[t{i}]'] + thumbnail_args + [str(output.thumbnail_path)]
+    if thumbnail_path is not None:
+        tail += ['-map', '[thumb]'] + thumbnail_args + [str(thumbnail_path)]
+
+    try:
+        subprocess.run(
+            head + tail,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True
+        )
+    except Exception as e:
+        errors = 'ERROR transcoding media:\n' + ' '.join(head + tail) + '\n'
+        if isinstance(e, subprocess.CalledProcessError):
+            errors += e.stderr.decode('utf-8')
+        else:
+            errors += str(e)
+        raise CodecProcessError(errors)
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import datetime
 import hashlib
-from typing import Optional, Tuple
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
 
 from django.core.files import File
 from django.db.models import FileField, ImageField, Model, signals
@@ -10,9 +11,27 @@ from django.db.models.fields.files import FieldFile, FileDescriptor, ImageFieldF
 
 import magic
 
+from wagtail_to_ion.storage import FileStat, get_local_path, hash_local_file, stat_file, stat_files
+
+
+def get_uploaded_file_metadata(file: File) -> Optional[Tuple[str, Optional[str]]]:
+    """Returns the checksum and mime type calculated during the upload (see `wagtail_to_ion.uploadhandler`)."""
+    if isinstance(file, FieldFile):
+        file = getattr(file, '_file', None)  # the uploaded file of an uncommitted (or just saved) field file
+    return getattr(file, 'ion_file_metadata', None)
+
 
 def get_file_metadata(file: File, detect_mime_type: bool = True) -> Tuple[str, Optional[str]]:
     """Calculate checksum and detect mime type in one go."""
+    uploaded_file_metadata = get_uploaded_file_metadata(file)
+    if uploaded_file_metadata is not None:
+        checksum, mime_type = uploaded_file_metadata
+        return checksum, mime_type if detect_mime_type else None
+
+    local_path = get_local_path(file) if isinstance(file, FieldFile) else None
+    if local_path is not None:
+        return hash_local_file(local_path, detect_mime_type=detect_mime_type)
+
     sha256 = hashlib.sha256()
     mime_type = None
     closed = file.closed
@@ -81,11 +100,34 @@ class IonFieldFile(FieldFile):
 
         The status is stored on the model instance and is available before and after a model.save().
         """
-        return self.field.attname in self.instance._ion_uploaded_file_fields
+        return self.field.attname in self.instance.__dict__.get('_ion_uploaded_file_fields', ())
+
+    def _get_model_file_meta(self) -> dict:
+        """
+        Returns the file metadata stored in the file meta fields of the model instance.
+
+        The stored values are only used if all file meta fields are filled (like the dimension fields of
+        `ImageField`), otherwise the metadata is read from the file.
+        """
+        meta_fields = {
+            'checksum': self.field.checksum_field,
+            'mime_type': self.field.mime_type_field,
+            'size': self.field.file_size_field,
+            'last_modified': self.field.last_modified_field,
+        }
+        values = {
+            meta: getattr(self.instance, field_name)
+            for meta, field_name in meta_fields.items()
+            if field_name
+        }
+        if not values or not all(values.values()):
+            return {}
+        return values
 
     def _get_file_meta(self, field):
         if not hasattr(self, '_file_meta_cache'):
-            self._file_meta_cache = {}
+            # first access: use the metadata stored on the model instance (no network calls)
+            self._file_meta_cache = self._get_model_file_meta()
         if field in ('checksum', 'mime_type') and field not in self._file_meta_cache:
             try:
                 checksum, mime_type = get_file_metadata(self)
@@ -93,23 +135,44 @@ class IonFieldFile(FieldFile):
                 self._file_meta_cache['mime_type'] = mime_type
             except Exception:  # noqa
                 pass
-        if field == 'size' and field not in self._file_meta_cache:
-            try:
-                self._file_meta_cache['size'] = self.storage.size(self.name)
-            except Exception:  # noqa
-                pass
-        if field == 'last_modified' and field not in self._file_meta_cache:
+        if field in ('size', 'last_modified') and field not in self._file_meta_cache:
             try:
-                self._file_meta_cache['last_modified'] = self.storage.get_modified_time(self.name)
+                # get size & last modification time with one request (if supported by the storage)
+                self.set_file_stat(stat_file(self.storage, self.name))
             except Exception:  # noqa
                 pass
         return self._file_meta_cache.get(field)
 
+    def set_file_stat(self, stat: FileStat) -> None:
+        """Set the size & last modification time of the file (e.g. from a batch stat of many files)."""
+        if not hasattr(self, '_file_meta_cache'):
+            self._file_meta_cache = self._get_model_file_meta()
+        self._file_meta_cache['size'] = stat.size
+        self._file_meta_cache['last_modified'] = stat.last_modified
+
+    @property
+    def has_file_stat(self) -> bool:
+        """Returns `True` if the size & last modification time of the file are known without a storage request."""
+        if not hasattr(self, '_file_meta_cache'):
+            self._file_meta_cache = self._get_model_file_meta()
+        return 'size' in self._file_meta_cache and 'last_modified' in self._file_meta_cache
+
     def save(self, name, content, save=True):
-        super().save(name, content, save=False)
-        # get `last_modified` value from storage backend after saving the file
-        if hasattr(self, '_file_meta_cache') and 'last_modified' in self._file_meta_cache:
-            del self._file_meta_cache['last_modified']
+        # `FieldFile.save()` assigns the name of the stored file to the model instance which replaces this field
+        # file; hand the checksum & mime type of the content over to the new field file (see `IonFileDescriptor`)
+        # instead of reading the stored file again. `size` & `last_modified` are read from the storage backend.
+        if content is getattr(self, '_file', None) and hasattr(self, '_file_meta_cache'):
+            file_meta = self._file_meta_cache
+        else:
+            uploaded_file_metadata = get_uploaded_file_metadata(content)
+            file_meta = dict(zip(('checksum', 'mime_type'), uploaded_file_metadata or ()))
+        self._saved_file_meta = {
+            key: value for key, value in file_meta.items() if key in ('checksum', 'mime_type') and value
+        }
+        try:
+            super().save(name, content, save=False)
+        finally:
+            del self._saved_file_meta
         if save:
             self.instance.save()
 
@@ -120,16 +183,38 @@ class IonFieldFile(FieldFile):
         super().delete(save)
 
 
+def prefetch_file_stats(files: Iterable[FieldFile]) -> None:
+    """
+    Fetch the size & last modification time of all `files` (without known values) with a batch stat per storage.
+    """
+    files_by_storage = defaultdict(list)
+    for file in files:
+        if isinstance(file, IonFieldFile) and file and file._committed and not file.has_file_stat:
+            files_by_storage[file.storage].append(file)
+    for storage, storage_files in files_by_storage.items():
+        stats = stat_files(storage, {file.name for file in storage_files})
+        for file in storage_files:
+            if file.name in stats:
+                file.set_file_stat(stats[file.name])
+
+
 class IonFileDescriptor(FileDescriptor):
     def __set__(self, instance: Model, value):
         previous_file = instance.__dict__.get(self.field.attname)
         super().__set__(instance, value)
 
         if previous_file is not None:
-            self.field.update_file_meta_fields(instance, force=True)
+            saved_file_meta = getattr(previous_file, '_saved_file_meta', None)
+            if saved_file_meta is not None:
+                # `IonFieldFile.save()` assigned the name of the stored file: keep the metadata of the content
+                file = getattr(instance, self.field.attname)
+                file._file_meta_cache = dict(saved_file_meta)
+                self.field.set_file_meta_fields(instance, file)
+            else:
+                self.field.update_file_meta_fields(instance, force=True)
             # add field name to instance._ion_uploaded_file_fields set() if the file was added or changed
             if previous_file != getattr(instance, self.field.attname):
-                instance.__dict__['_ion_uploaded_file_fields'].add(self.field.attname)
+                instance.__dict__.setdefault('_ion_uploaded_file_fields', set()).add(self.field.attname)
 
 
 class IonFileField(FileField):
@@ -153,11 +238,19 @@ class IonFileField(FileField):
         self.last_modified_field = last_modified_field
         super().__init__(**kwargs)
 
+    def update_new_file_meta_fields(self, instance, **kwargs):
+        # only instances initialized with a file object need the file meta fields set; instances loaded from
+        # the database (file name only) read missing metadata lazily on access
+        if isinstance(instance.__dict__.get(self.attname), File):
+            self.update_file_meta_fields(instance)
+
     def update_file_meta_fields(self, instance, force=False, *args, **kwargs):
-        # initialize attribute to store field names of new/changed files on the model instance
-        if '_ion_uploaded_file_fields' not in instance.__dict__:
-            instance.__dict__['_ion_uploaded_file_fields'] = set()
+        """
+        Set the file meta fields of `instance` from the file.
 
+        Called when a file is assigned to the field (`force=True`) or a model instance is initialized with
+        a file object. Without `force` only missing values are set.
+        """
         # implementation based on `ImageField.update_dimension_fields()`
         has_file_meta_fields = any([
             self.checksum_field,
@@ -181,40 +274,23 @@ class IonFileField(FileField):
         ])
 
         if file_meta_fields_filled and not force:
-            # all fields are filled and force is not set; we are loading data from the database
-            # (see original comments in django.db.models.fields.files.ImageField.update_dimension_fields)
-            #
-            # prefill the file metadata cache to support access of metadata properties without any network calls
-            if file:
-                if not hasattr(file, '_file_meta_cache'):
-                    file._file_meta_cache = {}
-                if self.checksum_field:
-                    file._file_meta_cache['checksum'] = getattr(instance, self.checksum_field)
-                if self.mime_type_field:
-                    file._file_meta_cache['mime_type'] = getattr(instance, self.mime_type_field)
-                if self.file_size_field:
-                    file._file_meta_cache['size'] = getattr(instance, self.file_size_field)
-                if self.last_modified_field:
-                    file._file_meta_cache['last_modified'] = getattr(instance, self.last_modified_field)
             return
 
         if file:
-            checksum = file.checksum
-            mime_type = file.mime_type
-            file_size = file.size
-            last_modified = file.last_modified
-        else:
-            # No file, so clear file meta fields.
-            checksum, mime_type, file_size, last_modified = None, None, None, None
+            # read the metadata from the file, not from the (outdated) file meta fields
+            file._file_meta_cache = {}
+        self.set_file_meta_fields(instance, file)
 
+    def set_file_meta_fields(self, instance, file):
+        """Set the file meta fields of `instance` from the metadata of `file` (cleared if there is no file)."""
         if self.checksum_field:
-            setattr(instance, self.checksum_field, checksum)
+            setattr(instance, self.checksum_field, file.checksum if file else None)
         if self.mime_type_field:
-            setattr(instance, self.mime_type_field, mime_type)
+            setattr(instance, self.mime_type_field, file.mime_type if file else None)
         if self.file_size_field:
-            setattr(instance, self.file_size_field, file_size)
+            setattr(instance, self.file_size_field, file.size if file else None)
         if self.last_modified_field:
-            setattr(instance, self.last_modified_field, last_modified)
+            setattr(instance, self.last_modified_field, file.last_modified if file else None)
 
     def deconstruct(self):
         name, path, args, kwargs = super().deconstruct()
@@ -226,7 +302,7 @@ class IonFileField(FileField):
     def contribute_to_class(self, cls, name, **kwargs):
         super().contribute_to_class(cls, name, **kwargs)
         if not cls._meta.abstract:
-            signals.post_init.connect(self.update_file_meta_fields, sender=cls)
+            signals.post_init.connect(self.update_new_file_meta_fields, sender=cls)
 
 
 class IonImageFieldFile(IonFieldFile, ImageFieldFile):
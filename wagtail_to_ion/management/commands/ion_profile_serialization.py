@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import ResolverMatch
+from wagtail.core.models import Page
+
+from wagtail_to_ion.models import get_ion_collection_model, get_ion_language_model
+from wagtail_to_ion.serializers import CollectionDetailSerializer, DynamicPageDetailSerializer
+from wagtail_to_ion.serializers.ion import IonSerializationProfiler
+from wagtail_to_ion.serializers.pages import load_pages_for_serialization
+
+
+def make_request(locale, user, host, variation):
+    request = RequestFactory().get('/', {'variation': variation}, HTTP_HOST=host)
+    request.user = user
+    request.resolver_match = ResolverMatch(None, (), {'locale': locale})
+    return request
+
+
+class Command(BaseCommand):
+    help = 'Profile the ION serialization of pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page',
+            action='append',
+            type=int,
+            dest='page_ids',
+            default=[],
+            help='Page id to profile (may be given multiple times)',
+        )
+        parser.add_argument('--collection', help='Profile all pages of the collection with this slug')
+        parser.add_argument(
+            '--locale',
+            default='',
+            help='Locale code of the collection (defaults to the default locale)',
+        )
+        parser.add_argument('--user', help='Username of the user to serialize the pages for')
+        parser.add_argument('--host', default='localhost', help='Host name used for absolute URLs')
+        parser.add_argument('--variation', default='default', help='Variation to serialize')
+        parser.add_argument('--limit', type=int, default=20, help='Number of entries to show')
+        parser.add_argument('--by-outlet', action='store_true', help='Show stats per outlet path instead of class')
+
+    def get_user(self, username):
+        if username is None:
+            return AnonymousUser()
+        try:
+            return get_user_model().objects.get_by_natural_key(username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User "{username}" does not exist')
+
+    def get_pages(self, options, user):
+        if options['collection']:
+            collection = get_ion_collection_model().objects.filter(slug=options['collection']).first()
+            if collection is None:
+                raise CommandError(f'Collection "{options["collection"]}" does not exist')
+            request = make_request(options['locale'], user, options['host'], options['variation'])
+            serializer = CollectionDetailSerializer(instance=collection, context={'request': request})
+            return list(serializer.get_pages_queryset(collection))
+        if options['page_ids']:
+            return list(Page.objects.filter(pk__in=options['page_ids']).order_by('path'))
+        raise CommandError('Either --page or --collection is required')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        pages = self.get_pages(options, user)
+        if not pages:
+            raise CommandError('No pages found')
+
+        languages = get_ion_language_model().objects.all()
+        with IonSerializationProfiler() as profiler:
+            for page in load_pages_for_serialization(pages):
+                locale = options['locale']
+                if not locale:
+                    language = languages.ancestor_of(page).first()
+                    locale = language.code if language is not None else 'default'
+                request = make_request(locale, user, options['host'], options['variation'])
+                DynamicPageDetailSerializer(instance=page, context={'request': request}, user=user).data
+
+        self.stdout.write(
+            f'Serialized {len(pages)} page(s) in {profiler.total_time * 1000:.1f} ms ({profiler.queries} queries)\n'
+        )
+        self.stdout.write(f'{"calls":>8} {"time (ms)":>10} {"queries":>8}  name')
+        for key, entry in profiler.summary(limit=options['limit'], by_outlet=options['by_outlet']):
+            self.stdout.write(f'{entry.calls:>8} {entry.time * 1000:>10.1f} {entry.queries:>8}  {key}')
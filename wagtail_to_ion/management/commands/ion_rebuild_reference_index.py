@@ -0,0 +1,28 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail_to_ion.models import get_ion_object_reference_model
+from wagtail_to_ion.utils import get_page_models_using_blocks, get_reference_block_types, update_object_references
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the index of images, documents and media referenced in stream field blocks of pages'
+
+    def handle(self, *args, **options):
+        ObjectReference = get_ion_object_reference_model()
+        if ObjectReference is None:
+            raise CommandError('ION_OBJECT_REFERENCE_MODEL is not configured')
+
+        # usage lookups inspect the pages not indexed (again) yet
+        ObjectReference.objects.all().delete()
+
+        for page_model in get_page_models_using_blocks(block_types=get_reference_block_types()):
+            # index every page once as its specific model (pages of sub classes are part of their own model)
+            pages = page_model.objects.filter(content_type=ContentType.objects.get_for_model(page_model))
+            total = 0
+            for page in pages.iterator():
+                update_object_references(page)
+                total += 1
+            self.stdout.write(f'{page_model.__name__}: indexed {total} pages')
+
+        self.stdout.write(f'{ObjectReference.objects.exclude(content_type=None).count()} references indexed')
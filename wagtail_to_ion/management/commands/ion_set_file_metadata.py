@@ -1,15 +1,54 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
 from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.db.models import Model, Q
 
 from wagtail_to_ion.fields.files import IonFieldFile
 from wagtail_to_ion.models import get_ion_document_model, get_ion_image_model, get_ion_media_model, \
     get_ion_media_rendition_model
+from wagtail_to_ion.utils import invalidate_page_cache
 
 
 # PR #25 adds new fields to file based models; run this command to set the fields on existing records.
 
 
-def set_file_metadata():
+def load_checkpoint(path: Optional[str]) -> Dict[str, int]:
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: Optional[str], checkpoint: Dict[str, int]) -> None:
+    if path is None:
+        return
+    # write atomically, an interrupted run must not leave a broken checkpoint behind
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def read_file_metadata(obj: Model, file_fields) -> bool:
+    """
+    Set the missing file meta fields of `obj` from its files; returns `False` if a file is not available.
+    """
+    for file_field in file_fields:
+        file: IonFieldFile = getattr(obj, file_field)
+        try:
+            # set the missing file meta fields & check if the value of any field is still missing
+            # (the file is not available)
+            obj._meta.get_field(file_field).update_file_meta_fields(obj)
+            if not all([file.checksum, file.mime_type, file.size, file.last_modified]):
+                return False
+        except ValueError:
+            return False
+    return True
+
+
+def set_file_metadata(workers=4, batch_size=500, checkpoint_path=None, log=print):
     IonDocument = get_ion_document_model()
     IonImage = get_ion_image_model()
     IonRendition = get_ion_image_model().get_rendition_model()
@@ -24,56 +63,94 @@ def set_file_metadata():
         IonMedia: ('file', 'thumbnail'),
         IonMediaRendition: ('file', 'thumbnail'),
     }
-    qs_file_field_map = {
-        'file': ('file_size', 'file_last_modified'),
-        'thumbnail': ('thumbnail_file_size', 'thumbnail_file_last_modified'),
-    }
 
-    for model, file_fields in model_file_field_map.items():
-        qs_filter = Q()
-        for file_field in file_fields:
-            for file_meta_field in qs_file_field_map[file_field]:
-                qs_filter |= Q(**{f'{file_meta_field}__isnull': True})
-        qs = model.objects.filter(qs_filter)
+    checkpoint = load_checkpoint(checkpoint_path)
 
-        total = 0
-        total_failed = 0
-
-        for obj in qs.iterator():
-            failed = False
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for model, file_fields in model_file_field_map.items():
+            meta_fields = []
             for file_field in file_fields:
-                file: IonFieldFile = getattr(obj, file_field)
-                try:
-                    # check if the value of any file meta field is missing (the value is automatically set by
-                    # IonFileField/IonImageField on model instance init if the file is available)
-                    failed = not all([
-                        file.checksum,
-                        file.mime_type,
-                        file.size,
-                        file.last_modified,
-                    ])
-                except ValueError:
-                    failed = True
-                if failed:
+                field = model._meta.get_field(file_field)
+                meta_fields += [
+                    name
+                    for name in (
+                        field.checksum_field,
+                        field.mime_type_field,
+                        field.file_size_field,
+                        field.last_modified_field,
+                    )
+                    if name
+                ]
+            qs_filter = Q()
+            for meta_field in meta_fields:
+                qs_filter |= Q(**{f'{meta_field}__isnull': True})
+            qs = model.objects.filter(qs_filter).order_by('pk')
+
+            label = model._meta.label
+            last_pk = checkpoint.get(label)
+            if last_pk is not None:
+                log(f'{model.__name__}: resuming after pk {last_pk}')
+
+            total = 0
+            total_failed = 0
+
+            while True:
+                # paginate by primary key: updated records drop out of the filter, failed records do not
+                objs = list(qs.filter(pk__gt=last_pk)[:batch_size] if last_pk is not None else qs[:batch_size])
+                if not objs:
                     break
-            if not failed:
-                updated_at = getattr(obj, 'updated_at', None)
-                obj.save()
-                # restore `updated_at` field
-                if hasattr(obj, 'updated_at'):
-                    model.objects.filter(pk=obj.pk).update(updated_at=updated_at)
-            else:
-                total_failed += 1
-            total += 1
 
-        print(f'{model.__name__}: fixed {total - total_failed} records ({total_failed} had missing files)')
+                # reading the files is bound by storage I/O (hashing releases the GIL), so threads suffice
+                results = executor.map(lambda obj: read_file_metadata(obj, file_fields), objs)
+                updated = [obj for obj, success in zip(objs, results) if success]
+
+                # write only the metadata columns (no save signals, `updated_at` stays untouched)
+                model.objects.bulk_update(updated, meta_fields)
+
+                total += len(objs)
+                total_failed += len(objs) - len(updated)
+                last_pk = objs[-1].pk
+                checkpoint[label] = last_pk
+                save_checkpoint(checkpoint_path, checkpoint)
+                log(f'{model.__name__}: processed {total} records (up to pk {last_pk})')
+
+            log(f'{model.__name__}: fixed {total - total_failed} records ({total_failed} had missing files)')
+
+            # `bulk_update()` sends no `post_save` signals: invalidate the cached page details (containing the
+            # file metadata) like the receiver of the file models does
+            if total > total_failed:
+                invalidate_page_cache()
 
 
 class Command(BaseCommand):
-    help = 'Set file size & last modification time on file based models'
+    help = (
+        'Set file size & last modification time on file based models (invalidates the page cache once per model '
+        'with updated records)'
+    )
 
     def add_arguments(self, parser):
-        pass
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of threads reading the files (default: 4)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of records updated at once (default: 500)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=None,
+            help='Path of a file storing the progress; an interrupted run continues where it stopped',
+        )
 
     def handle(self, *args, **options):
-        set_file_metadata()
+        set_file_metadata(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            checkpoint_path=options['checkpoint'],
+            log=self.stdout.write,
+        )
@@ -26,3 +26,21 @@ get_ion_image_rendition_model = partial(_get_model_from_settings, 'ION_IMAGE_REN
 get_ion_media_model = partial(_get_model_from_settings, 'WAGTAILMEDIA_MEDIA_MODEL')
 get_ion_media_rendition_model = partial(_get_model_from_settings, 'ION_MEDIA_RENDITION_MODEL')
 get_ion_content_type_description_model = partial(_get_model_from_settings, 'ION_CONTENT_TYPE_DESCRIPTION_MODEL')
+
+
+def get_ion_object_reference_model():
+    """
+    Returns the model of the object reference index or `None` if the index is not configured.
+    """
+    if not getattr(settings, 'ION_OBJECT_REFERENCE_MODEL', None):
+        return None
+    return _get_model_from_settings('ION_OBJECT_REFERENCE_MODEL')
+
+
+def get_ion_page_change_model():
+    """
+    Returns the model of the page change log or `None` if the change log is not configured.
+    """
+    if not getattr(settings, 'ION_PAGE_CHANGE_MODEL', None):
+        return None
+    return _get_model_from_settings('ION_PAGE_CHANGE_MODEL')
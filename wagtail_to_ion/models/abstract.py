@@ -41,6 +41,20 @@ class AbstractIonPage(Page):
         """
         return ()
 
+    @classmethod
+    def ion_select_related(cls):
+        """
+        Relations to load together with the page when it is serialized for ION.
+
+        Forward relations of `content_panels` fields and `ion_extra_fields()` are added automatically.
+
+        Example: to load `self.some_related_model.some_other_model` in the same query use:
+            return (
+                'some_related_model__some_other_model',
+            )
+        """
+        return ()
+
     @classmethod
     def get_layout_name(cls, api_version: Optional[int] = None):  # TODO: rename to `get_ion_layout_name`?
         return cls.__name__.lower()  # TODO: use `cls._meta.model_name`?
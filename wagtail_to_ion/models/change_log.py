@@ -0,0 +1,97 @@
+from typing import Iterable
+
+from django.db import models
+from django.db.models.signals import post_delete
+
+from wagtail.core.models import Page
+from wagtail.core.signals import page_published, page_slug_changed, page_unpublished, post_page_move, pre_page_move
+
+
+class AbstractIonPageChange(models.Model):
+    """
+    Log of the changes of pages (publish, unpublish, move & delete)
+
+    Used by the collection changes view to send clients the pages changed or removed since a
+    cursor (the ID of the last change a client has seen).
+    """
+
+    PUBLISH = 'publish'
+    UNPUBLISH = 'unpublish'
+    MOVE = 'move'
+    DELETE = 'delete'
+    ACTION_CHOICES = (
+        (PUBLISH, 'publish'),
+        (UNPUBLISH, 'unpublish'),
+        (MOVE, 'move'),
+        (DELETE, 'delete'),
+    )
+
+    page_id = models.PositiveIntegerField(db_index=True)  # no foreign key: entries outlive deleted pages
+    slug = models.CharField(max_length=255)
+    path = models.CharField(max_length=255, db_index=True)  # tree path of the page at the time of the change
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.action} {self.slug} (page {self.page_id})'
+
+
+def log_page_changes(pages: Iterable[Page], action: str) -> None:
+    """
+    Add an entry to the page change log for every page.
+    """
+    from wagtail_to_ion.models import get_ion_page_change_model
+
+    PageChange = get_ion_page_change_model()
+    if PageChange is None:
+        return
+    PageChange.objects.bulk_create([
+        PageChange(page_id=page.pk, slug=page.slug, path=page.path, action=action)
+        for page in pages
+    ])
+
+
+def log_page_published(sender, instance, **kwargs):
+    log_page_changes([instance], AbstractIonPageChange.PUBLISH)
+
+
+def log_page_unpublished(sender, instance, **kwargs):
+    log_page_changes([instance], AbstractIonPageChange.UNPUBLISH)
+
+
+def log_page_slug_changed(sender, instance, instance_before, **kwargs):
+    # the old slug is gone & the `parent` of all children changed
+    log_page_changes([instance_before], AbstractIonPageChange.DELETE)
+    log_page_changes(instance.get_children(), AbstractIonPageChange.MOVE)
+
+
+def log_page_moved_away(sender, instance, **kwargs):
+    log_page_changes(Page.objects.descendant_of(instance, inclusive=True), AbstractIonPageChange.DELETE)
+
+
+def log_page_moved(sender, instance, **kwargs):
+    log_page_changes(Page.objects.descendant_of(instance, inclusive=True), AbstractIonPageChange.MOVE)
+
+
+def log_page_deleted(sender, instance, **kwargs):
+    log_page_changes([instance], AbstractIonPageChange.DELETE)
+
+
+def connect_change_log_receivers():
+    """
+    Connect the receivers feeding the page change log (if a page change model is configured).
+    """
+    from wagtail_to_ion.models import get_ion_page_change_model
+
+    if get_ion_page_change_model() is None:
+        return
+    page_published.connect(log_page_published)
+    page_unpublished.connect(log_page_unpublished)
+    page_slug_changed.connect(log_page_slug_changed)
+    pre_page_move.connect(log_page_moved_away)
+    post_page_move.connect(log_page_moved)
+    post_delete.connect(log_page_deleted, sender=Page)  # pages are always deleted as `Page` instances
@@ -1,13 +1,16 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
 from __future__ import annotations
 
-from typing import Optional
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Generator, Iterable, List, Optional, Set, Tuple, Type
 
 from django.db import models, transaction
 from django.db.models import ProtectedError
-from django.db.models.signals import post_delete, pre_delete
-from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.utils.translation import gettext_lazy as _
+from modelcluster.fields import ParentalKey
 
 from wagtail.core.models import Page
 from wagtail.documents.blocks import DocumentChooserBlock
@@ -21,7 +24,8 @@ from wagtail_to_ion.blocks import IonMediaBlock
 from wagtail_to_ion.conf import settings
 from wagtail_to_ion.fields.files import IonFileField, IonImageField
 from wagtail_to_ion.models import get_ion_media_rendition_model
-from wagtail_to_ion.tasks import generate_media_rendition, get_audio_metadata, generate_media_thumbnail
+from wagtail_to_ion.tasks import generate_media_rendition, generate_media_renditions, get_audio_metadata, \
+    generate_media_thumbnail
 
 
 FILE_META_FIELDS = {
@@ -195,7 +199,8 @@ class AbstractIonMedia(IonFileContainerInterface, AbstractMedia):
             if self.type == 'audio':
                 self.set_audio_metadata()
             elif self.type == 'video':
-                self.create_thumbnail()
+                if not self.transcode_single_pass:
+                    self.create_thumbnail()  # else generated with the renditions
                 self.create_renditions()
 
     @property
@@ -207,6 +212,15 @@ class AbstractIonMedia(IonFileContainerInterface, AbstractMedia):
         pages = super().get_usage().union(get_object_block_usage(self, block_types=self.check_usage_block_types))
         return Page.objects.filter(pk__in=pages.values('pk'))
 
+    @property
+    def is_video_file(self) -> bool:
+        # the mime type is `None` if the file is not available
+        return (self.file.mime_type or '').startswith('video/')
+
+    @property
+    def transcode_single_pass(self) -> bool:
+        return settings.ION_TRANSCODE_SINGLE_PASS and self.is_video_file
+
     def set_audio_metadata(self):
         transaction.on_commit(lambda: get_audio_metadata.delay(self.pk))
 
@@ -214,9 +228,18 @@ class AbstractIonMedia(IonFileContainerInterface, AbstractMedia):
         transaction.on_commit(lambda: generate_media_thumbnail.delay(self.pk))
 
     def create_renditions(self):
-        is_video_file = self.mime_type.startswith('video/')
+        is_video_file = self.is_video_file
         for rendition in self.renditions.all():
             rendition.delete()
+        if self.transcode_single_pass:
+            # created without `save()` (which starts a transcoding task per rendition); the renditions & the
+            # thumbnail are generated by one task
+            IonMediaRendition = get_ion_media_rendition_model()
+            IonMediaRendition.objects.bulk_create([
+                IonMediaRendition(name=key, media_item=self) for key in settings.ION_VIDEO_RENDITIONS
+            ])
+            transaction.on_commit(lambda: generate_media_renditions.delay(self.pk))
+            return
         for key, config in settings.ION_VIDEO_RENDITIONS.items():
             get_ion_media_rendition_model().objects.create(
                 name=key,
@@ -287,26 +310,130 @@ class AbstractIonMediaRendition(IonFileContainerInterface, models.Model):
             return settings.ION_VIDEO_RENDITIONS[self.name]
 
 
-@receiver(pre_delete)
+_prefetched_usage: ContextVar[Optional[Dict[models.Model, List[Page]]]] = ContextVar(
+    'ion_prefetched_usage', default=None
+)
+
+
+def _get_relation_usage(model: Type[models.Model], pks: List[Any]) -> Iterable[Tuple[Any, int]]:
+    """
+    Generates tuples of object primary key & page ID for all pages linking to one of the objects.
+
+    Same as `wagtail.admin.models.get_object_usage` but for multiple objects (one query per relation).
+    """
+    for relation in model._meta.get_fields(include_hidden=True):
+        if not ((relation.one_to_many or relation.one_to_one) and relation.auto_created):
+            continue
+        related_model = relation.related_model
+        related_objects = related_model._base_manager.filter(**{f'{relation.field.name}__in': pks})
+
+        # if the relation is between obj and a page, get the page
+        if issubclass(related_model, Page):
+            yield from related_objects.values_list(relation.field.attname, 'id')
+        else:
+            # if the relation is between obj and an object that has a page as a property, return the page
+            for field in related_model._meta.fields:
+                if isinstance(field, ParentalKey) and issubclass(field.remote_field.model, Page):
+                    yield from related_objects.values_list(relation.field.attname, field.attname)
+
+
+def get_usage_for_objects(objs: Iterable[models.Model]) -> Dict[models.Model, List[Page]]:
+    """
+    Returns the pages using each of the objects (same as `obj.get_usage()` for a batch of objects).
+
+    Runs one query per relation & page model (or one query if the object reference index is configured) for
+    all objects of a model. Objects of models with a custom `get_usage()` are checked one by one.
+
+    :returns: mapping of every object to the list of pages using it (empty if the object is not in use)
+    """
+    from wagtail_to_ion.utils import get_objects_block_usage
+
+    objs_by_model = defaultdict(list)
+    for obj in objs:
+        objs_by_model[type(obj)].append(obj)
+
+    page_ids: Dict[models.Model, Set[int]] = {}
+    custom_usage: Dict[models.Model, List[Page]] = {}
+    for model, model_objs in objs_by_model.items():
+        default_get_usage = (AbstractIonDocument.get_usage, AbstractIonImage.get_usage, AbstractIonMedia.get_usage)
+        if model.get_usage not in default_get_usage:
+            custom_usage.update((obj, list(obj.get_usage())) for obj in model_objs)
+            continue
+
+        objs_by_pk = {obj.pk: obj for obj in model_objs}
+        page_ids.update((obj, set()) for obj in model_objs)
+        for pk, page_id in _get_relation_usage(model, list(objs_by_pk)):
+            page_ids[objs_by_pk[pk]].add(page_id)
+        block_usage = get_objects_block_usage(model_objs, block_types=model.check_usage_block_types)
+        for pk, block_page_ids in block_usage.items():
+            page_ids[objs_by_pk[pk]].update(block_page_ids)
+
+    pages = Page.objects.in_bulk(set().union(*page_ids.values()))
+    usage = {
+        obj: [pages[page_id] for page_id in sorted(obj_page_ids) if page_id in pages]
+        for obj, obj_page_ids in page_ids.items()
+    }
+    usage.update(custom_usage)
+    return usage
+
+
+@contextmanager
+def prefetch_usage(objs: Iterable[models.Model]) -> Generator[Dict[models.Model, List[Page]], None, None]:
+    """
+    Resolve the usage of the objects in bulk before deleting them.
+
+    Within the context `prevent_deletion_if_in_use` uses the prefetched usage instead of
+    calling `get_usage()` for every deleted object.
+    """
+    usage = get_usage_for_objects(objs)
+    token = _prefetched_usage.set({**(_prefetched_usage.get() or {}), **usage})
+    try:
+        yield usage
+    finally:
+        _prefetched_usage.reset(token)
+
+
 def prevent_deletion_if_in_use(sender, instance, **kwargs):
-    if isinstance(instance, (AbstractIonDocument, AbstractIonImage, AbstractIonMedia)):
+    prefetched_usage = _prefetched_usage.get()
+    if prefetched_usage is not None and instance in prefetched_usage:
+        usage = prefetched_usage[instance]
+    else:
         usage = instance.get_usage()
-        if usage:
-            model_name = instance.__class__.__name__
-            raise ProtectedError(
-                f"Cannot delete instance of model '{model_name}' because it is referenced in stream field blocks",
-                usage,
-            )
+    if usage:
+        model_name = instance.__class__.__name__
+        raise ProtectedError(
+            f"Cannot delete instance of model '{model_name}' because it is referenced in stream field blocks",
+            usage,
+        )
 
 
-@receiver(post_delete)
 def remove_media_files(sender, instance, **kwargs):
-    if isinstance(instance, (AbstractIonMedia, AbstractIonMediaRendition)):
-        try:
-            instance.file.delete(save=False)
-        except ValueError:
-            pass
-        try:
-            instance.thumbnail.delete(save=False)
-        except ValueError:
-            pass
+    try:
+        instance.file.delete(save=False)
+    except ValueError:
+        pass
+    try:
+        instance.thumbnail.delete(save=False)
+    except ValueError:
+        pass
+
+
+def invalidate_page_cache_for_file(sender, instance, raw=False, **kwargs):
+    # the serialized pages contain the URLs & metadata of referenced files
+    if raw:
+        return
+    from wagtail_to_ion.utils import invalidate_page_cache
+    invalidate_page_cache()
+
+
+def connect_file_model_receivers(model):
+    """
+    Connect the receivers of the file based models to `model` if it is a document, image or media (rendition) model.
+    """
+    if issubclass(model, (AbstractIonDocument, AbstractIonImage, AbstractIonMedia)):
+        pre_delete.connect(prevent_deletion_if_in_use, sender=model)
+    if issubclass(model, (AbstractIonMedia, AbstractIonMediaRendition)):
+        post_delete.connect(remove_media_files, sender=model)
+    if issubclass(model, (AbstractIonDocument, AbstractIonImage, AbstractIonMedia, AbstractIonMediaRendition)):
+        post_save.connect(invalidate_page_cache_for_file, sender=model)
+        post_delete.connect(invalidate_page_cache_for_file, sender=model)
@@ -4,10 +4,11 @@ import json
 from django.conf import settings
 from django.utils.text import slugify
 from django.db import models
-from django.db.models.signals import pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from wagtail.core.models import Page, PageRevision
+from wagtail.core.models import Page, PageRevision, PageViewRestriction
+from wagtail.core.signals import page_published, page_unpublished, post_page_move
 from wagtail.admin.edit_handlers import FieldPanel, MultiFieldPanel
 
 from .abstract import AbstractIonPage
@@ -36,18 +37,76 @@ class AbstractIonLanguage(AbstractIonPage):
     ]
 
 
-@receiver(pre_save)
-def sanitize_slug(sender, **kwargs):
+def sanitize_slug(sender, instance, **kwargs):
     """
     Make sure all slug fields are actually slugified as wagtail does not enforce that
     """
-    if not issubclass(sender, (Page, PageRevision)):
-        return
-    instance = kwargs.get('instance', None)
-    if hasattr(instance, 'slug'):
-        instance.slug = slugify(instance.slug)
-    if hasattr(instance, 'content_json'):
+    if isinstance(instance, PageRevision):
         data = json.loads(instance.content_json)
         if 'slug' in data:
-            data['slug'] = slugify(data['slug'])
-        instance.content_json = json.dumps(data)
+            slug = slugify(data['slug'])
+            if slug != data['slug']:
+                # only re-serialize the revision content if the slug changed
+                data['slug'] = slug
+                instance.content_json = json.dumps(data)
+    elif hasattr(instance, 'slug'):
+        instance.slug = slugify(instance.slug)
+
+
+def invalidate_collection_languages(sender, instance, **kwargs):
+    from wagtail_to_ion.utils import invalidate_language_cache
+    parent_path = instance.path[:-Page.steplen]
+    for collection_id in Page.objects.filter(path=parent_path).values_list('pk', flat=True):
+        invalidate_language_cache(collection_id)
+
+
+def invalidate_moved_collection_languages(sender, instance, parent_page_before, parent_page_after, **kwargs):
+    from wagtail_to_ion.utils import invalidate_language_cache
+    invalidate_language_cache(parent_page_before.pk)
+    invalidate_language_cache(parent_page_after.pk)
+
+
+def connect_page_receivers(model):
+    """
+    Connect the page related receivers to `model` if it is a page or page revision model.
+    """
+    if issubclass(model, (Page, PageRevision)):
+        pre_save.connect(sanitize_slug, sender=model)
+    if issubclass(model, AbstractIonLanguage):
+        # publishing & unpublishing saves the language page
+        post_save.connect(invalidate_collection_languages, sender=model)
+        post_delete.connect(invalidate_collection_languages, sender=model)
+        post_page_move.connect(invalidate_moved_collection_languages, sender=model)
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def invalidate_restricted_page_visibility(sender, instance, **kwargs):
+    from wagtail_to_ion.utils import invalidate_page_cache, invalidate_visibility_cache
+    invalidate_visibility_cache(instance.page)
+    invalidate_page_cache(instance.page)
+
+
+@receiver(m2m_changed, sender=PageViewRestriction.groups.through)
+def invalidate_restriction_groups_visibility(sender, instance, **kwargs):
+    from wagtail_to_ion.utils import invalidate_page_cache, invalidate_visibility_cache
+    if isinstance(instance, PageViewRestriction):
+        invalidate_visibility_cache(instance.page)
+        invalidate_page_cache(instance.page)
+
+
+@receiver(post_page_move)
+def invalidate_moved_page_visibility(sender, instance, parent_page_before, **kwargs):
+    from wagtail_to_ion.utils import invalidate_page_cache, invalidate_visibility_cache
+    invalidate_visibility_cache(parent_page_before)
+    invalidate_visibility_cache(instance)
+    invalidate_page_cache(parent_page_before)
+    invalidate_page_cache(instance)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_delete, sender=Page)
+def invalidate_changed_page_cache(sender, instance, **kwargs):
+    from wagtail_to_ion.utils import invalidate_page_cache
+    invalidate_page_cache(instance)
@@ -0,0 +1,64 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models.signals import post_save
+
+from wagtail.core.models import Page
+
+
+class AbstractIonObjectReference(models.Model):
+    """
+    Reverse index of the objects (images, documents, media) referenced in stream field blocks of pages
+
+    The index is updated whenever a page is saved (see ``./manage.py ion_rebuild_reference_index``). Every
+    indexed page has an entry without content type; pages without it (e.g. pages created before the index)
+    are inspected by the usage lookups instead.
+    """
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    object_id = models.CharField(max_length=255, blank=True)
+    page = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        abstract = True
+        index_together = (
+            ('content_type', 'object_id'),
+        )
+
+    def __str__(self):
+        if self.content_type_id is None:
+            return f'page {self.page_id} indexed'
+        return f'{self.content_type} {self.object_id} used by page {self.page_id}'
+
+
+def update_object_reference_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Update the object reference index for saved pages
+    """
+    if raw:
+        return
+
+    from wagtail_to_ion.utils import get_reference_stream_field_names, update_object_references
+
+    if update_fields is not None and not get_reference_stream_field_names(sender).intersection(update_fields):
+        return
+    update_object_references(instance)
+
+
+def connect_reference_index_receivers(model):
+    """
+    Connect the receivers maintaining the object reference index to `model` if it is a page model with
+    stream fields containing references.
+    """
+    from wagtail_to_ion.models import get_ion_object_reference_model
+    from wagtail_to_ion.utils import get_reference_stream_field_names
+
+    if get_ion_object_reference_model() is None:
+        return
+    if issubclass(model, Page) and get_reference_stream_field_names(model):
+        post_save.connect(update_object_reference_index, sender=model)
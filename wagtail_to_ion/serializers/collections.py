@@ -1,15 +1,24 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
+from itertools import islice
+from typing import Generator
+
 from django.urls import reverse
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from wagtail.core.models import Page
 
-from wagtail_to_ion.utils import visible_tree_by_user
+from wagtail_to_ion.utils import get_default_language, resolve_language, visible_tree_by_user
 from wagtail_to_ion.models import get_ion_collection_model
 from wagtail_to_ion.conf import settings
 
 from .pages import DynamicPageSerializer, DataObject
 
 
+STREAMED_PAGES_PLACEHOLDER = '__ion_streamed_pages__'
+
+
 class CollectionSerializer(DataObject):
     identifier = serializers.SerializerMethodField()
     name = serializers.SerializerMethodField()
@@ -24,11 +33,9 @@ class CollectionSerializer(DataObject):
         return obj.title
 
     def get_default_locale(self, obj):
-        locales = obj.get_children().filter(live=True)
-        for locale in locales:
-            spec = locale.specific
-            if spec.is_default:
-                return spec.code
+        default_language = get_default_language(obj)
+        if default_language is not None:
+            return default_language.code
 
     def get_fts_db(self, obj):
         return 'NULL'
@@ -52,31 +59,57 @@ class CollectionDetailSerializer(CollectionSerializer):
 
     content_serializer_class = DynamicPageSerializer
 
-    def get_pages(self, obj):
+    stream_pages = False  # set by `stream_json()` to render a placeholder instead of the page list
+
+    def get_pages_queryset(self, obj):
         locale = self.context['request'].resolver_match.kwargs['locale']
         user = self.context['request'].user
         try:
-            localized_tree = obj.get_children().filter(live=True)
-            # find locale
-            locale_item = None
-            default_locale = None
-            for item in localized_tree:
-                spec = item.specific
-                if spec.code == locale:
-                    locale_item = spec
-                if spec.is_default:
-                    default_locale = spec
-            if locale_item is None:
-                locale_item = default_locale
+            locale_item = resolve_language(obj, locale)
             if settings.GET_PAGES_BY_USER:
-                pages = visible_tree_by_user(locale_item, user)
-            else:
-                pages = locale_item.get_descendants().filter(live=True)
+                return visible_tree_by_user(locale_item, user)
+            return locale_item.get_descendants().filter(live=True)
         except ObjectDoesNotExist:
-            pages = {}
+            return Page.objects.none()
 
-        serializer = self.content_serializer_class(instance=pages, many=True, user=user)
+    def get_pages(self, obj):
+        if self.stream_pages:
+            return STREAMED_PAGES_PLACEHOLDER
+
+        # load specific page instances with one query per page type
+        pages = self.get_pages_queryset(obj).specific()
+        serializer = self.content_serializer_class(instance=pages, many=True, user=self.context['request'].user)
         return serializer.data
 
+    def stream_json(self, chunk_size: int = 1000) -> Generator[bytes, None, None]:
+        """
+        Render the collection as JSON and serialize the page list incrementally in chunks of ``chunk_size`` pages.
+
+        The output is identical to rendering ``self.data`` with the ``JSONRenderer``.
+        """
+        renderer = JSONRenderer()
+        user = self.context['request'].user
+
+        self.stream_pages = True
+        try:
+            envelope = renderer.render(self.to_representation(self.instance))
+        finally:
+            self.stream_pages = False
+        head, tail = envelope.split(renderer.render(STREAMED_PAGES_PLACEHOLDER), 1)
+
+        yield head + b'['
+        separator = b''
+        page_ids = self.get_pages_queryset(self.instance).values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(page_ids, chunk_size))
+            if not chunk:
+                break
+            pages = Page.objects.filter(pk__in=chunk).order_by('path').specific()
+            serializer = self.content_serializer_class(instance=pages, many=True, user=user)
+            for page_data in serializer.data:
+                yield separator + renderer.render(page_data)
+                separator = b','
+        yield b']' + tail
+
     class Meta(CollectionSerializer.Meta):
         fields = CollectionSerializer.Meta.fields + ('pages',)
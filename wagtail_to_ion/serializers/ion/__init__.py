@@ -1,5 +1,5 @@
 from .base import IonSerializer
-from .container import IonContainerSerializer, IonListSerializer
+from .container import IonContainerSerializer, IonListSerializer, IonSerializedTree, serialize_tree
 from .bool import IonBoolSerializer
 from .datetime import IonDateTimeSerializer
 from .document import IonDocumentSerializer
@@ -11,12 +11,14 @@ from .stream import IonStreamValueSerializer, IonStructValueSerializer
 from .table import IonTableSerializer
 from .text import IonTextSerializer
 from .null import IonNoneSerializer
+from .profiling import IonSerializationProfiler
 
 __all__ = (
     'IonSerializer',
     'IonBoolSerializer',
     'IonContainerSerializer',
     'IonListSerializer',
+    'IonSerializedTree',
     'IonDateTimeSerializer',
     'IonDocumentSerializer',
     'IonImageSerializer',
@@ -28,4 +30,6 @@ __all__ = (
     'IonTableSerializer',
     'IonTextSerializer',
     'IonNoneSerializer',
+    'IonSerializationProfiler',
+    'serialize_tree',
 )
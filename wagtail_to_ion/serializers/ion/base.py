@@ -19,15 +19,20 @@ class IonSerializationError(Exception):
 class IonSerializerAttachedFileInterface:
     """
     Interface for serializers with attached files.
+
+    Implementations with ``__slots__`` have to provide an ``_attached_files`` slot.
     """
 
-    _attached_files: Set[IonFileContainerInterface] = None  # Set of attached files; attached on successful serialization
+    __slots__ = ()
+
+    _attached_files: Set[IonFileContainerInterface]  # Set of attached files; attached on successful serialization
 
     @property
     def attached_files(self):
-        if self._attached_files is None:
+        attached_files = getattr(self, '_attached_files', None)
+        if attached_files is None:
             raise RuntimeError('Attached files are available after successful serialization')
-        return self._attached_files
+        return attached_files
 
     def get_files(self) -> Iterable[IonFileContainerInterface]:
         raise NotImplementedError
@@ -43,17 +48,28 @@ class IonSerializer:
     """
     This is the base serializer class, you will need to use this class directly
     to register new serializers for new types.
+
+    Serializers are instantiated for every node of the ION tree, so all serializers shipped
+    with this package define ``__slots__`` to keep their memory footprint small. Subclasses
+    without ``__slots__`` work as usual (their instances get a ``__dict__``).
     """
 
+    __slots__ = ('name', 'index', '_context', '_parent', '__weakref__')
+
     registry: ClassVar[Deque[Type[IonSerializer]]] = deque()  # This is the serializer registry
 
     index_children: ClassVar[bool] = False  # flag to indicate if children of this serializer get an index field
 
+    # flag to indicate that the output depends on the serialized data only (no database objects or files)
+    # and may be cached by the stream block cache (see ``IonCachedBlockSerializer``), serializers deciding
+    # per instance override it with a property
+    cacheable: ClassVar[bool] = False
+
     name: str
     index: Optional[int]
 
-    _context: Optional[Mapping] = None
-    _parent = None  # type: weakref.ReferenceType[IonSerializer]
+    _context: Optional[Mapping]
+    _parent: Optional[weakref.ReferenceType]  # weak reference to the parent serializer
 
     def __init__(
         self,
@@ -69,6 +85,8 @@ class IonSerializer:
         """
         self.name = name  # Outlet name
         self.index = None  # Set to a value to serialize an ``index`` attribute into the output
+        self._context = None
+        self._parent = None
         if context is not None:
             self.context = context
         if parent is not None:
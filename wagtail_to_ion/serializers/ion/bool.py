@@ -9,6 +9,10 @@ class IonBoolSerializer(IonSerializer):
     Serializes bool values as ``flagcontent``
     """
 
+    __slots__ = ('data',)
+
+    cacheable = True
+
     def __init__(self, name: str, data: bool, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import BaseCache, caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from wagtail.core.blocks import StreamValue
+
+from wagtail_to_ion.conf import settings
+
+from .base import IonSerializer, IonSerializationError
+
+
+def get_block_cache() -> Optional[BaseCache]:
+    """
+    Returns the cache for serialized stream blocks or ``None`` if block caching is disabled.
+    """
+    if not settings.ION_STREAM_BLOCK_CACHE:
+        return None
+    return caches[settings.ION_STREAM_BLOCK_CACHE]
+
+
+class IonCachedBlockSerializer(IonSerializer):
+    """
+    This serializer wraps the serializer of a stream block and caches its output by the ID of the block.
+
+    The cache key contains a hash of the raw block value and the request variation, so changed blocks
+    get a new cache entry. The output is only cached if all serializers of the sub-tree are marked
+    as ``cacheable`` (i.e. the output depends on the block value only).
+    """
+
+    __slots__ = ('cache', 'cache_key', 'data', 'children')
+
+    cacheable = True
+
+    def __init__(self, name: str, data: StreamValue.StreamChild, cache: BaseCache, **kwargs) -> None:
+        super().__init__(name, **kwargs)
+        self.cache = cache
+        self.cache_key = self.get_cache_key(data)
+        self.data = cache.get(self.cache_key)
+        self.children: List[IonSerializer] = []
+
+        if self.data is None:
+            value = data.value
+            serializer = IonSerializer.find_serializer(value.__class__, data=value)
+            if serializer is None:
+                raise IonSerializationError('No serializer found for type "{}"'.format(value.__class__.__name__))
+            self.children.append(serializer(name, value, parent=self))
+
+    def get_cache_key(self, block: StreamValue.StreamChild) -> str:
+        request = self.context.get('request')
+        variation = request.GET.get('variation', 'default') if request is not None else 'default'
+        host = request.build_absolute_uri('/') if request is not None else ''
+        raw_value = json.dumps(block.get_prep_value(), sort_keys=True, cls=DjangoJSONEncoder)
+        value_hash = hashlib.sha1(f'{variation}:{host}:{raw_value}'.encode('utf-8')).hexdigest()
+        return f'wagtail_to_ion:block:{block.id}:{value_hash}'
+
+    def is_cacheable(self) -> bool:
+        """
+        Check if all serializers of the sub-tree can be cached.
+        """
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            if not node.cacheable:
+                return False
+            stack.extend(getattr(node, 'children', ()))
+        return True
+
+    def serialize(self) -> Optional[Dict[str, Any]]:
+        if self.data is not None:
+            # outlet names of the result may be remapped in place
+            return copy.deepcopy(self.data)
+
+        result = self.children[0].serialize()
+        if result is not None and self.is_cacheable():
+            self.cache.set(self.cache_key, result, timeout=settings.ION_STREAM_BLOCK_CACHE_TIMEOUT)
+        return result
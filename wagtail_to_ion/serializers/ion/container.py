@@ -1,8 +1,11 @@
 from __future__ import annotations
-from typing import List, Any, Optional, Dict, Type, Mapping
+import functools
+from typing import List, Any, Optional, Dict, Type, Mapping, Callable, Generator, NamedTuple
 from collections.abc import Iterable
 
-from .base import IonSerializer, IonSerializationError
+from wagtail_to_ion.models.file_based_models import IonFileContainerInterface
+
+from .base import IonSerializer, IonSerializationError, IonSerializerAttachedFileInterface
 
 
 class IonContainerSerializer(IonSerializer):
@@ -13,6 +16,8 @@ class IonContainerSerializer(IonSerializer):
     See the ``add_child`` function to run the automatic type detection on a child item.
     """
 
+    __slots__ = ('subtype', 'children')
+
     def __init__(
         self,
         name: str,
@@ -37,30 +42,11 @@ class IonContainerSerializer(IonSerializer):
 
     def serialize(self) -> Optional[Dict[str, Any]]:
         """
-        Serialize the container recursively into a simple ``dict``
+        Serialize the container and all of its children into a simple ``dict``
+
+        Nested containers are traversed with an explicit stack (see ``serialize_tree``).
         """
-        result = super().serialize()
-        if result is None:
-            return None
-        resulting_children = []
-        child_index = 0
-        for child in self.children:
-            resulting_child = child.serialize()
-            if resulting_child is not None:
-                if self.index_children:
-                    resulting_child = {
-                        'index': child_index,
-                        **resulting_child,
-                    }
-                    child_index += 1
-                resulting_children.append(resulting_child)
-
-        result.update({
-            "type": "containercontent",
-            "subtype": self.subtype if self.subtype is not None else 'generic',
-            "children": resulting_children,
-        })
-        return result
+        return _serialize_tree(self, expand_root=True).data
 
     def add_child(self, name: str, item: Any, context: Optional[Mapping] = None) -> IonSerializer:
         """
@@ -84,7 +70,10 @@ class IonListSerializer(IonContainerSerializer):
     from the list of registered serializers
     """
 
+    __slots__ = ()
+
     index_children = True
+    cacheable = True
 
     def __init__(self, name: str, data: List[Any], **kwargs) -> None:
         super().__init__(name, subtype='list', **kwargs)
@@ -106,6 +95,10 @@ class IonMappingSerializer(IonContainerSerializer):
     a mapping is always named uniquely
     """
 
+    __slots__ = ()
+
+    cacheable = True
+
     def __init__(self, name: str, data: Mapping, **kwargs) -> None:
         super().__init__(name, subtype='structblock', **kwargs)
         for item_name, sub_data in data.items():
@@ -117,3 +110,165 @@ class IonMappingSerializer(IonContainerSerializer):
 
 
 IonSerializer.register(IonMappingSerializer)
+
+
+#
+# Tree traversal
+#
+
+OutletNameRemapper = Callable[[List[str]], str]
+OutletNamesRemapper = Callable[[Dict[str, Any], List[str]], None]
+
+
+class IonSerializedTree(NamedTuple):
+    data: Optional[Dict[str, Any]]
+    files: List[IonFileContainerInterface]
+
+
+class _ContainerFrame:
+    """
+    Serialization state of a container whose children are being processed by ``serialize_tree``.
+    """
+
+    __slots__ = ('container', 'result', 'children', 'child_path', 'resulting_children', 'child_index')
+
+    def __init__(self, container: IonContainerSerializer, result: Dict[str, Any], child_path: Optional[List[str]]):
+        self.container = container
+        self.result = result
+        self.children = iter(container.children)
+        self.child_path = child_path
+        self.resulting_children = []
+        self.child_index = 0
+
+    def append_child(self, resulting_child: Optional[Dict[str, Any]]) -> None:
+        if resulting_child is None:
+            return
+        if self.container.index_children:
+            resulting_child = {
+                'index': self.child_index,
+                **resulting_child,
+            }
+            self.child_index += 1
+        self.resulting_children.append(resulting_child)
+
+    def finish(self) -> Dict[str, Any]:
+        self.result.update({
+            "type": "containercontent",
+            "subtype": self.container.subtype if self.container.subtype is not None else 'generic',
+            "children": self.resulting_children,
+        })
+        return self.result
+
+
+_PENDING = object()  # marker for containers whose result is completed after their children
+
+
+def _is_expandable(ion_serializer: IonSerializer) -> bool:
+    # containers with a custom `serialize()` implementation are serialized as a whole
+    return (
+        isinstance(ion_serializer, IonContainerSerializer)
+        and type(ion_serializer).serialize is IonContainerSerializer.serialize
+    )
+
+
+def _serialize_tree(
+    root: IonSerializer,
+    remap_outlet_names_recursive: Optional[OutletNamesRemapper] = None,
+    collect_files: bool = False,
+    expand_root: bool = False,
+) -> IonSerializedTree:
+    files = []
+    stack: List[_ContainerFrame] = []
+
+    node, path, expand = root, [], expand_root
+    while True:
+        if expand or _is_expandable(node):
+            data = super(IonContainerSerializer, node).serialize()
+            if data is not None:
+                if collect_files and isinstance(node, IonSerializerAttachedFileInterface):
+                    files.extend(node.attached_files)
+                child_path = None
+                if remap_outlet_names_recursive is not None and path is not None:
+                    # the children are added when the container is finished, so only its own outlet is remapped
+                    remap_outlet_names_recursive(data, path)
+                    if 'outlet' in data:
+                        child_path = path + [data['outlet']]
+                stack.append(_ContainerFrame(node, data, child_path))
+                data = _PENDING
+        else:
+            data = node.serialize()
+            if data is not None:
+                if collect_files:
+                    files.extend(iter_attached_files(node))
+                if remap_outlet_names_recursive is not None and path is not None:
+                    remap_outlet_names_recursive(data, path)
+        expand = False
+
+        # hand finished results to their parents until a container with unprocessed children is found
+        while True:
+            if data is not _PENDING:
+                if not stack:
+                    return IonSerializedTree(data, files)
+                stack[-1].append_child(data)
+            child = next(stack[-1].children, None)
+            if child is not None:
+                node, path = child, stack[-1].child_path
+                break
+            data = stack.pop().finish()
+
+
+def serialize_tree(
+    root: IonSerializer,
+    remap_outlet_name: Optional[OutletNameRemapper] = None,
+    remap_outlet_names_recursive: Optional[OutletNamesRemapper] = None,
+) -> IonSerializedTree:
+    """
+    Serialize a serializer tree, collect the attached files and optionally remap the outlet names in a single pass.
+
+    Containers are traversed with an explicit stack instead of recursive ``serialize()`` calls, so deeply nested
+    trees do not hit the recursion limit. Serializers overriding ``serialize()`` are serialized as a whole.
+
+    :param root: the root of the serializer tree
+    :param remap_outlet_name: optional, called with the outlet path of every item; returns the new outlet name
+    :param remap_outlet_names_recursive: optional, called with every serialized item and its parent outlet path
+        to remap the outlet names of the item and its children in place (like ``remap_outlet_names()``);
+        containers traversed by ``serialize_tree`` are passed before their children are added
+    :returns: the serialized ``dict`` and the list of attached files
+    """
+    if remap_outlet_names_recursive is None and remap_outlet_name is not None:
+        remap_outlet_names_recursive = functools.partial(remap_outlet_names, remap_outlet_name=remap_outlet_name)
+
+    return _serialize_tree(root, remap_outlet_names_recursive=remap_outlet_names_recursive, collect_files=True)
+
+
+def iter_attached_files(ion_serializer: IonSerializer) -> Generator[IonFileContainerInterface, None, None]:
+    """
+    Generates the attached files of all serializers of a (serialized) serializer tree.
+    """
+    stack = [iter((ion_serializer,))]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        if isinstance(node, IonSerializerAttachedFileInterface):
+            yield from node.attached_files
+        if hasattr(node, 'children'):
+            stack.append(iter(node.children))
+
+
+def remap_outlet_names(struct: Dict[str, Any], path: List[str], remap_outlet_name: OutletNameRemapper) -> None:
+    """
+    Remap the outlet names of an already serialized tree in place.
+    """
+    stack = [(struct, path)]
+    while stack:
+        struct, path = stack.pop()
+        if 'outlet' not in struct:
+            continue
+        struct['outlet'] = remap_outlet_name(path + [struct['outlet']])
+
+        if 'children' not in struct:
+            continue
+        child_path = path + [struct['outlet']]
+        stack.extend((child, child_path) for child in reversed(struct['children']))
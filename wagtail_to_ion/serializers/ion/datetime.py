@@ -11,6 +11,10 @@ class IonDateTimeSerializer(IonSerializer):
     This serializer handles ``date`` and ``datetime`` objects
     """
 
+    __slots__ = ('data',)
+
+    cacheable = True
+
     def __init__(self, name: str, data: Union[date, datetime], **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -18,6 +18,8 @@ class IonDocumentSerializer(IonSerializerAttachedFileInterface, IonSerializer):
     this serializer if you use a ``IonDocument`` class that has additional properties
     """
 
+    __slots__ = ('data', '_attached_files')
+
     def __init__(self, name: str, data: AbstractIonDocument, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -34,9 +36,9 @@ class IonDocumentSerializer(IonSerializerAttachedFileInterface, IonSerializer):
 
         try:
             result['file'] = self.context['request'].build_absolute_uri(self.data.file.url)
-            result['file_size'] = self.data.file_size
-            result['checksum'] = self.data.checksum
-            result['mime_type'] = self.data.mime_type
+            result['file_size'] = self.data.file.size
+            result['checksum'] = self.data.file.checksum
+            result['mime_type'] = self.data.file.mime_type
         except Exception as e:
             if settings.ION_ALLOW_MISSING_FILES is True:
                 log_extra = {'document_filename': self.data.file.name}
@@ -18,6 +18,8 @@ class IonImageSerializer(IonSerializerAttachedFileInterface, IonSerializer):
     this serializer if you use a ``IonImage`` class that has additional properties
     """
 
+    __slots__ = ('data', 'archive', '_attached_files')
+
     def __init__(self, name: str, data: AbstractIonImage, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -33,18 +35,18 @@ class IonImageSerializer(IonSerializerAttachedFileInterface, IonSerializer):
         result['type'] = 'imagecontent'
 
         try:
-            result['mime_type'] = self.archive.mime_type
+            result['mime_type'] = self.archive.file.mime_type
             result['image'] = self.context['request'].build_absolute_uri(self.archive.file.url)
-            result['file_size'] = self.archive.file_size
+            result['file_size'] = self.archive.file.size
             result['original_image'] = self.context['request'].build_absolute_uri(self.data.file.url)
-            result['checksum'] = self.archive.checksum
+            result['checksum'] = self.archive.file.checksum
             result['width'] = self.archive.width
             result['height'] = self.archive.height
-            result['original_mime_type'] = self.data.mime_type
-            result['original_checksum'] = self.data.checksum
+            result['original_mime_type'] = self.data.file.mime_type
+            result['original_checksum'] = self.data.file.checksum
             result['original_width'] = self.data.width
             result['original_height'] = self.data.height
-            result['original_file_size'] = self.data.file_size
+            result['original_file_size'] = self.data.file.size
             self.attach_files()
         except Exception as e:
             if settings.ION_ALLOW_MISSING_FILES is True:
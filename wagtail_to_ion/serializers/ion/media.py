@@ -18,6 +18,8 @@ class IonAudioSerializer(IonSerializerAttachedFileInterface, IonSerializer):
     with the registry as it handles only a part of a media object
     """
 
+    __slots__ = ('data', '_attached_files')
+
     def __init__(self, name: str, data: AbstractIonMedia, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -31,17 +33,17 @@ class IonAudioSerializer(IonSerializerAttachedFileInterface, IonSerializer):
             return None
         result.update({
             'type': 'mediacontent',
-            'mime_type': self.data.mime_type,
+            'mime_type': self.data.file.mime_type,
             'file': self.context['request'].build_absolute_uri(self.data.file.url),
-            'checksum': self.data.checksum,
+            'checksum': self.data.file.checksum,
             'length': self.data.duration,
-            'file_size': self.data.file_size,
+            'file_size': self.data.file.size,
             'name': self.data.title,
-            'original_mime_type': self.data.mime_type,
+            'original_mime_type': self.data.file.mime_type,
             'original_file': self.context['request'].build_absolute_uri(self.data.file.url),
-            'original_checksum': self.data.checksum,
+            'original_checksum': self.data.file.checksum,
             'original_length': self.data.duration,
-            'original_file_size': self.data.file_size,
+            'original_file_size': self.data.file.size,
         })
         self.attach_files()
         return result
@@ -53,6 +55,8 @@ class IonVideoSerializer(IonSerializerAttachedFileInterface, IonSerializer):
     with the registry as it handles only a part of a media object
     """
 
+    __slots__ = ('data', 'rendition', '_attached_files')
+
     def __init__(self, name: str, data: AbstractIonMedia, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -67,21 +71,21 @@ class IonVideoSerializer(IonSerializerAttachedFileInterface, IonSerializer):
             return None
         result.update({
             'type': 'mediacontent',
-            'mime_type': self.data.mime_type,
+            'mime_type': self.data.file.mime_type,
             'file': self.context['request'].build_absolute_uri(self.rendition.file.url),
-            'checksum': self.rendition.checksum,
+            'checksum': self.rendition.file.checksum,
             'width': self.rendition.width if self.rendition.width else 0,
             'height': self.rendition.height if self.rendition.height else 0,
             'length': self.data.duration,
-            'file_size': self.rendition.file_size,
+            'file_size': self.rendition.file.size,
             'name': self.data.title,
-            'original_mime_type': self.data.mime_type,
+            'original_mime_type': self.data.file.mime_type,
             'original_file': self.context['request'].build_absolute_uri(self.data.file.url),
-            'original_checksum': self.data.checksum,
+            'original_checksum': self.data.file.checksum,
             'original_width': self.data.width if self.data.width else 0,
             'original_height': self.data.height if self.data.height else 0,
             'original_length': self.data.duration,
-            'original_file_size': self.data.file_size,
+            'original_file_size': self.data.file.size,
         })
         self.attach_files()
         return result
@@ -93,6 +97,8 @@ class IonVideoThumbnailSerializer(IonSerializerAttachedFileInterface, IonSeriali
     is not registered with the registry as it handles only a part of a media object
     """
 
+    __slots__ = ('data', 'rendition', '_attached_files')
+
     def __init__(self, name: str, data: AbstractIonMedia, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -107,15 +113,15 @@ class IonVideoThumbnailSerializer(IonSerializerAttachedFileInterface, IonSeriali
             return None
         result.update({
             'type': 'imagecontent',
-            'mime_type': self.data.thumbnail_mime_type,
+            'mime_type': self.data.thumbnail.mime_type,
             'image': self.context['request'].build_absolute_uri(self.rendition.thumbnail.url),
-            'checksum': self.rendition.thumbnail_checksum,
+            'checksum': self.rendition.thumbnail.checksum,
             'width': self.rendition.width,
             'height': self.rendition.height,
             'file_size': self.rendition.thumbnail.size,
-            'original_mime_type': self.data.thumbnail_mime_type,
+            'original_mime_type': self.data.thumbnail.mime_type,
             'original_image': self.context['request'].build_absolute_uri(self.data.thumbnail.url),
-            'original_checksum': self.data.thumbnail_checksum,
+            'original_checksum': self.data.thumbnail.checksum,
             'original_width': self.data.width,
             'original_height': self.data.height,
             'original_file_size': self.data.thumbnail.size,
@@ -133,6 +139,8 @@ class IonMediaSerializer(IonSerializer):
     this serializer if you use a ``IonMedia`` class that has additional properties
     """
 
+    __slots__ = ('data',)
+
     def __init__(self, name: str, data: AbstractIonMedia, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -12,6 +12,10 @@ class IonNoneSerializer(IonSerializer):
     datatype and returns something other in ``serialize``
     """
 
+    __slots__ = ()
+
+    cacheable = True
+
     def __init__(self, name: str, data: None, **kwargs) -> None:
         super().__init__(name, **kwargs)
 
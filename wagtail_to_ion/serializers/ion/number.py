@@ -13,6 +13,10 @@ class IonNumberSerializer(IonSerializer):
     want to use is about 2^53 - 1 and the safe minimum is -(2^53 - 1)
     """
 
+    __slots__ = ('data',)
+
+    cacheable = True
+
     def __init__(self, name: str, data: Union[int, float, Decimal], **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -16,6 +16,8 @@ class IonPageSerializer(IonSerializer):
     and collection only.
     """
 
+    __slots__ = ('data',)
+
     def __init__(self, name: str, data: Union[AbstractIonPage, Page], **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
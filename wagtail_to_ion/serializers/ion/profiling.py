@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from django.db import connection
+
+from .base import IonSerializer
+from .container import IonContainerSerializer
+
+
+logger = logging.getLogger(__name__)
+
+
+_active_profiler: ContextVar[Optional[IonSerializationProfiler]] = ContextVar('ion_profiler', default=None)
+
+_install_lock = threading.Lock()
+_install_count = 0
+_originals: List[Tuple[type, str, Any]] = []  # (class, attribute name, original attribute) of patched methods
+
+
+class IonProfileStats:
+    __slots__ = ('calls', 'time', 'queries')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.time = 0.0
+        self.queries = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'time': self.time, 'queries': self.queries}
+
+
+def get_outlet_path(ion_serializer: IonSerializer) -> str:
+    path = []
+    node = ion_serializer
+    while node is not None:
+        path.append(node.name)
+        node = node.parent
+    return '/'.join(reversed(path))
+
+
+class IonSerializationProfiler:
+    """
+    Records call count, cumulative time and number of database queries of the ION serializers.
+
+    The serializer methods are only instrumented while a profiler is active, so profiling costs
+    nothing when it is not used. Profilers are bound to the current thread/context::
+
+        with IonSerializationProfiler() as profiler:
+            serializer.data
+        profiler.log()
+
+    Recorded methods:
+      - ``<SerializerClass>.serialize``: ``serialize()`` calls of a serializer (containers traversed by
+        ``serialize_tree`` are recorded without their children)
+      - ``<SerializerClass>.build``: creation of a serializer (and its sub-tree) by ``add_child()``
+      - ``<SerializerClass>.find_serializer``: serializer lookups returning the class
+    """
+
+    def __init__(self) -> None:
+        self.by_class: Dict[str, IonProfileStats] = defaultdict(IonProfileStats)
+        self.by_outlet: Dict[str, IonProfileStats] = defaultdict(IonProfileStats)
+        self.queries = 0
+        self.total_time = 0.0
+        self._measured = set()  # ids of serializers with a running measurement (skips `super()` calls)
+        self._start = None
+        self._token = None
+        self._query_wrapper = None
+
+    def __enter__(self) -> IonSerializationProfiler:
+        _install()
+        self._token = _active_profiler.set(self)
+        self._query_wrapper = connection.execute_wrapper(self._count_query)
+        self._query_wrapper.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.total_time += time.perf_counter() - self._start
+        self._query_wrapper.__exit__(exc_type, exc_val, exc_tb)
+        _active_profiler.reset(self._token)
+        _uninstall()
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def record(
+        self,
+        method: str,
+        serializer_class: Optional[Type[IonSerializer]],
+        outlet_path: Optional[str],
+        elapsed: float,
+        queries: int,
+    ) -> None:
+        keys = [(self.by_class, f'{serializer_class.__name__ if serializer_class else None}.{method}')]
+        if outlet_path is not None:
+            keys.append((self.by_outlet, f'{outlet_path}.{method}'))
+        for stats, key in keys:
+            entry = stats[key]
+            entry.calls += 1
+            entry.time += elapsed
+            entry.queries += queries
+
+    def summary(self, limit: Optional[int] = None, by_outlet: bool = False) -> List[Tuple[str, IonProfileStats]]:
+        """
+        Returns the recorded stats sorted by cumulative time.
+        """
+        stats = self.by_outlet if by_outlet else self.by_class
+        return sorted(stats.items(), key=lambda item: item[1].time, reverse=True)[:limit]
+
+    def server_timing(self, limit: int = 10) -> str:
+        """
+        Returns the recorded stats per serializer class as value for a ``Server-Timing`` header.
+        """
+        metrics = [f'ion;desc="ION serialization ({self.queries} queries)";dur={self.total_time * 1000:.1f}']
+        for index, (key, entry) in enumerate(self.summary(limit=limit)):
+            metrics.append(
+                f'ion{index};desc="{key} ({entry.calls} calls, {entry.queries} queries)";dur={entry.time * 1000:.1f}'
+            )
+        return ', '.join(metrics)
+
+    def log(self, limit: Optional[int] = None, level: int = logging.INFO) -> None:
+        """
+        Logs the recorded stats, the stats are available as ``ion_profile`` attribute of the log record.
+        """
+        logger.log(
+            level,
+            'ION serialization took %.1f ms (%d queries)',
+            self.total_time * 1000,
+            self.queries,
+            extra={
+                'ion_profile': {
+                    'by_class': {key: entry.as_dict() for key, entry in self.summary(limit=limit)},
+                    'by_outlet': {key: entry.as_dict() for key, entry in self.summary(limit=limit, by_outlet=True)},
+                },
+            },
+        )
+
+
+#
+# Instrumentation
+#
+
+
+def _measure(profiler: IonSerializationProfiler, method: str, func: Callable, get_target: Callable, *args, **kwargs):
+    start_queries = profiler.queries
+    start = time.perf_counter()
+    result = None
+    try:
+        result = func(*args, **kwargs)
+        return result
+    finally:
+        serializer_class, outlet_path = get_target(result)
+        profiler.record(
+            method, serializer_class, outlet_path, time.perf_counter() - start, profiler.queries - start_queries
+        )
+
+
+def _instrument_serialize(func):
+    @functools.wraps(func)
+    def serialize(self):
+        profiler = _active_profiler.get()
+        if profiler is None or id(self) in profiler._measured:
+            return func(self)
+        profiler._measured.add(id(self))
+        try:
+            return _measure(profiler, 'serialize', func, lambda result: (type(self), get_outlet_path(self)), self)
+        finally:
+            profiler._measured.discard(id(self))
+    return serialize
+
+
+def _instrument_add_child(func):
+    @functools.wraps(func)
+    def add_child(self, name, item, context=None):
+        profiler = _active_profiler.get()
+        if profiler is None:
+            return func(self, name, item, context=context)
+
+        def get_target(child):
+            if child is None:
+                return None, f'{get_outlet_path(self)}/{name}'
+            return type(child), get_outlet_path(child)
+
+        return _measure(profiler, 'build', func, get_target, self, name, item, context=context)
+    return add_child
+
+
+def _instrument_find_serializer(func):
+    @functools.wraps(func)
+    def find_serializer(cls, target, data=None):
+        profiler = _active_profiler.get()
+        if profiler is None:
+            return func(cls, target, data=data)
+        return _measure(profiler, 'find_serializer', func, lambda result: (result, None), cls, target, data=data)
+    return classmethod(find_serializer)
+
+
+def _iter_serializer_classes():
+    stack = [IonSerializer]
+    while stack:
+        cls = stack.pop()
+        yield cls
+        stack.extend(cls.__subclasses__())
+
+
+def _patch(cls: type, attribute: str, instrumented: Any) -> None:
+    _originals.append((cls, attribute, cls.__dict__[attribute]))
+    setattr(cls, attribute, instrumented)
+
+
+def _install() -> None:
+    global _install_count
+    with _install_lock:
+        _install_count += 1
+        if _install_count > 1:
+            return
+        for cls in set(_iter_serializer_classes()):
+            if 'serialize' in cls.__dict__:
+                _patch(cls, 'serialize', _instrument_serialize(cls.__dict__['serialize']))
+        _patch(IonContainerSerializer, 'add_child', _instrument_add_child(IonContainerSerializer.__dict__['add_child']))
+        _patch(
+            IonSerializer,
+            'find_serializer',
+            _instrument_find_serializer(IonSerializer.__dict__['find_serializer'].__func__),
+        )
+
+
+def _uninstall() -> None:
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count > 0:
+            return
+        while _originals:
+            cls, attribute, original = _originals.pop()
+            setattr(cls, attribute, original)
@@ -3,6 +3,7 @@ from typing import List, Type
 
 from wagtail.core.blocks import StreamValue, StructValue
 from .base import IonSerializer
+from .cache import IonCachedBlockSerializer, get_block_cache
 from .container import IonContainerSerializer
 
 
@@ -14,13 +15,21 @@ class IonStreamValueSerializer(IonContainerSerializer):
     same block type in the stream field.
     """
 
+    __slots__ = ()
+
     index_children = True
+    cacheable = True
 
     def __init__(self, name:str, data: StreamValue, **kwargs) -> None:
         super().__init__(name, subtype='streamblock', **kwargs)
+        block_cache = get_block_cache()
         for idx, item in enumerate(data):
             item_name = str(item.block_type)
-            self.add_child(item_name, item.value)
+            if block_cache is not None and item.id:
+                # re-use the serialized block if it did not change (see ``ION_STREAM_BLOCK_CACHE``)
+                self.children.append(IonCachedBlockSerializer(item_name, item, block_cache, parent=self))
+            else:
+                self.add_child(item_name, item.value)
 
     @classmethod
     def supported_types(cls) -> List[Type]:
@@ -37,6 +46,10 @@ class IonStructValueSerializer(IonContainerSerializer):
     a struct is always named uniquely
     """
 
+    __slots__ = ()
+
+    cacheable = True
+
     def __init__(self, name: str, data: StructValue, **kwargs) -> None:
         super().__init__(name, subtype='structblock', **kwargs)
         for item_name, sub_data in data.bound_blocks.items():
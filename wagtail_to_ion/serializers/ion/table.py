@@ -21,6 +21,10 @@ class IonTableSerializer(IonSerializer):
 
     """
 
+    __slots__ = ('data',)
+
+    cacheable = True
+
     def __init__(self, name: str, data: dict, **kwargs) -> None:
         super().__init__(name, **kwargs)
         self.data = data
@@ -30,8 +30,11 @@ class IonTextSerializer(IonSerializer):
     a sanity check in there to fall back to this one just in case.
     """
 
+    __slots__ = ('is_html', 'is_rich_text', 'text')
+
     def __init__(self, name: str, data: Union[str, RichText], **kwargs) -> None:
         super().__init__(name, **kwargs)
+        self.is_rich_text = isinstance(data, RichText)
 
         try:
             # check if text is html
@@ -43,6 +46,11 @@ class IonTextSerializer(IonSerializer):
         else:
             self.text = data.strip()
 
+    @property
+    def cacheable(self) -> bool:
+        # rich text expands page links & images from the database, so only plain strings may be cached
+        return not self.is_rich_text
+
     def serialize(self) -> Optional[Dict[str, Any]]:
         result = super().serialize()
         if result is None:
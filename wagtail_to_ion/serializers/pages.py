@@ -1,13 +1,20 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
+import functools
 import logging
 import re
 from datetime import datetime, date
-from typing import Iterable, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
 
 from django.utils.functional import cached_property
 
-from wagtail_to_ion.serializers.ion.container import IonContainerSerializer
+from wagtail_to_ion.serializers.ion.container import (
+    IonContainerSerializer,
+    IonSerializedTree,
+    remap_outlet_names,
+    serialize_tree,
+)
 
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
 from django.urls import reverse
 
@@ -33,14 +40,39 @@ replacements = [
 http_regex = re.compile(r"https?://.*")
 
 
-def get_wagtail_panels_and_extra_fields(obj) -> Iterable[Tuple[str, str, models.Model]]:
+class IonFieldPlanItem(NamedTuple):
+    outlet_name: str
+    field_name: str
+    relation: Optional[str]  # name of the relation holding the field or ``None`` for fields of the page itself
+
+
+class IonSerializationPlan(NamedTuple):
+    fields: Tuple[IonFieldPlanItem, ...]
+    select_related: Tuple[str, ...]
+
+
+def _is_select_related_field(model: Type[models.Model], field_name: str) -> bool:
+    try:
+        field = model._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and field.is_relation and (field.many_to_one or field.one_to_one)
+
+
+@functools.lru_cache(maxsize=None)
+def get_serialization_plan(page_class: Type[Page]) -> IonSerializationPlan:
     """
-    Get all page panels and other fields from `page.ion_extra_fields` to include.
+    Compile the list of fields to serialize for a page class (computed once per class).
 
-    :returns: tuple of ``outlet_name``, ``attribute_name``, ``object``
+    Contains all fields from ``page_class.ion_extra_fields()`` followed by all fields of the ``content_panels``
+    and the relations to load with ``select_related()`` (forward relations used by these fields and the
+    relations declared by ``page_class.ion_select_related()``).
     """
-    if hasattr(obj.specific_class, "ion_extra_fields"):
-        for item in obj.specific_class.ion_extra_fields():
+    fields = []
+    select_related = list(page_class.ion_select_related()) if hasattr(page_class, "ion_select_related") else []
+
+    if hasattr(page_class, "ion_extra_fields"):
+        for item in page_class.ion_extra_fields():
             if isinstance(item, str):
                 field_path = item
                 outlet_name = item
@@ -50,17 +82,93 @@ def get_wagtail_panels_and_extra_fields(obj) -> Iterable[Tuple[str, str, models.
                 raise NotImplementedError()
 
             if "." not in field_path:
-                yield outlet_name, field_path, obj.specific
+                fields.append(IonFieldPlanItem(outlet_name, field_path, None))
             else:
                 if len(field_path.split(".")) > 2:
                     raise NotImplementedError()
                 relation, field_name = field_path.split(".")
-                related_obj = getattr(obj.specific, relation)
-                yield outlet_name, field_name, related_obj
+                fields.append(IonFieldPlanItem(outlet_name, field_name, relation))
+                if _is_select_related_field(page_class, relation):
+                    select_related.append(relation)
 
-    for field in obj.specific.content_panels:
+    for field in page_class.content_panels:
         if hasattr(field, "field_name"):
-            yield field.field_name, field.field_name, obj.specific
+            fields.append(IonFieldPlanItem(field.field_name, field.field_name, None))
+
+    for item in fields:
+        if item.relation is None and _is_select_related_field(page_class, item.field_name):
+            select_related.append(item.field_name)
+
+    return IonSerializationPlan(
+        fields=tuple(fields),
+        select_related=tuple(dict.fromkeys(select_related)),  # de-duplicate, keep order
+    )
+
+
+def get_wagtail_panels_and_extra_fields(obj) -> Iterable[Tuple[str, str, models.Model]]:
+    """
+    Get all page panels and other fields from `page.ion_extra_fields` to include.
+
+    :returns: tuple of ``outlet_name``, ``attribute_name``, ``object``
+    """
+    specific = obj.specific
+    for item in get_serialization_plan(obj.specific_class or type(specific)).fields:
+        if item.relation is None:
+            yield item.outlet_name, item.field_name, specific
+        else:
+            yield item.outlet_name, item.field_name, getattr(specific, item.relation)
+
+
+def load_pages_for_serialization(pages: Iterable[Page]) -> List[Page]:
+    """
+    Load the specific instances of the given pages including all relations of their serialization plan.
+
+    Runs a single query per page type and keeps the order of the given pages.
+    """
+    pages = list(pages)
+    pks_by_class = {}
+    for page in pages:
+        pks_by_class.setdefault(page.specific_class or type(page), []).append(page.pk)
+
+    specific_pages = {}
+    for page_class, pks in pks_by_class.items():
+        plan = get_serialization_plan(page_class)
+        specific_pages.update(
+            (specific_page.pk, specific_page)
+            for specific_page in page_class.objects.filter(pk__in=pks).select_related(*plan.select_related)
+        )
+
+    return [specific_pages.get(page.pk, page) for page in pages]
+
+
+def get_parent_slugs(pages: Iterable[Page]) -> Dict[str, str]:
+    """
+    Resolve the slugs of the parent pages of all given pages with a single query.
+
+    The parent path is derived from the treebeard ``path`` of each page.
+
+    :returns: mapping of parent page ``path`` to parent page ``slug``
+    """
+    parent_paths = {page.path[:-Page.steplen] for page in pages if page.depth > 1}
+    if not parent_paths:
+        return {}
+    return dict(Page.objects.filter(path__in=parent_paths).values_list("path", "slug"))
+
+
+class DynamicPageListSerializer(serializers.ListSerializer):
+    """
+    List serializer for `DynamicPageSerializer` instances.
+
+    Pre-fetches the parent slugs of all pages in one go to avoid a query per page.
+    """
+
+    def to_representation(self, data):
+        pages = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.parent_slugs = get_parent_slugs(pages)
+        try:
+            return super().to_representation(pages)
+        finally:
+            self.child.parent_slugs = None
 
 
 class DynamicPageSerializer(serializers.ModelSerializer):
@@ -70,6 +178,8 @@ class DynamicPageSerializer(serializers.ModelSerializer):
     parent = serializers.SerializerMethodField()
     meta = serializers.SerializerMethodField()
 
+    parent_slugs = None  # mapping of parent path -> parent slug; set by `DynamicPageListSerializer`
+
     def __init__(self, instance=None, data=empty, **kwargs):
         self.user = kwargs.pop("user", None)
         super().__init__(instance, data, **kwargs)
@@ -95,6 +205,10 @@ class DynamicPageSerializer(serializers.ModelSerializer):
     def get_parent(self, obj):
         if obj.depth <= 4:
             return None
+        if self.parent_slugs is not None:
+            parent_path = obj.path[:-Page.steplen]
+            if parent_path in self.parent_slugs:
+                return self.parent_slugs[parent_path]
         return obj.get_parent().slug
 
     def get_meta(self, obj):
@@ -133,6 +247,7 @@ class DynamicPageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Page
         fields = ("identifier", "parent", "last_changed", "layout", "meta")
+        list_serializer_class = DynamicPageListSerializer
 
 
 class DynamicPageDetailSerializer(DynamicPageSerializer, DataObject):
@@ -146,7 +261,15 @@ class DynamicPageDetailSerializer(DynamicPageSerializer, DataObject):
     def ion_serializer_tree(self):
         return self.build_tree(self.instance, self.context["request"])
 
+    @cached_property
+    def ion_serialized_tree(self) -> IonSerializedTree:
+        # serializes the tree, collects attached files & remaps outlet names in one pass
+        return serialize_tree(self.ion_serializer_tree, remap_outlet_names_recursive=self.remap_outlet_names_recursive)
+
     def get_collection(self, obj):
+        # views serializing multiple pages of a collection pass its slug in the context
+        if 'collection' in self.context:
+            return self.context['collection']
         return get_collection_for_page(obj)
 
     def get_archive(self, obj):
@@ -175,14 +298,8 @@ class DynamicPageDetailSerializer(DynamicPageSerializer, DataObject):
         return outlet_path[-1]
 
     def remap_outlet_names_recursive(self, struct, path):
-        if "outlet" not in struct:
-            return
-        struct["outlet"] = self.remap_outlet_name(path + [struct["outlet"]])
-
-        if "children" not in struct:
-            return
-        for item in struct["children"]:
-            self.remap_outlet_names_recursive(item, path + [struct["outlet"]])
+        # called while serializing for every item (containers are passed before their children are added)
+        remap_outlet_names(struct, path, self.remap_outlet_name)
 
     def build_tree(self, obj, request):
         # Create a top-level container
@@ -207,12 +324,9 @@ class DynamicPageDetailSerializer(DynamicPageSerializer, DataObject):
         if self.ion_serializer_tree is None:
             return []
 
-        data = self.ion_serializer_tree.serialize()
-
-        # optionally remap outlet names if needed (e.g. outlet should be called like a reserved word in python)
-        self.remap_outlet_names_recursive(data, [])
-
-        return [data]
+        # outlet names are optionally remapped while serializing
+        # (e.g. outlet should be called like a reserved word in python)
+        return [self.ion_serialized_tree.data]
 
     def get_children(self, obj):
         if settings.GET_PAGES_BY_USER:
@@ -1,6 +1,7 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
 import json
 import os
+from typing import AbstractSet, Optional
 
 from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse
@@ -10,9 +11,10 @@ from rest_framework.renderers import JSONRenderer
 
 from wagtail_to_ion.tar import TarWriter, TarData, TarDir, TarStorageFile
 from wagtail_to_ion.conf import settings
+from wagtail_to_ion.fields.files import prefetch_file_stats
 from wagtail_to_ion.serializers import DynamicPageDetailSerializer
-from wagtail_to_ion.serializers.ion.base import IonSerializerAttachedFileInterface
-from wagtail_to_ion.serializers.pages import get_wagtail_panels_and_extra_fields
+from wagtail_to_ion.serializers.ion.container import iter_attached_files
+from wagtail_to_ion.serializers.pages import get_wagtail_panels_and_extra_fields, load_pages_for_serialization
 from wagtail_to_ion.utils import get_collection_for_page
 
 
@@ -36,19 +38,19 @@ else:
 
 
 def _collect_files_from_serializer_tree(ion_serializer):
-    if isinstance(ion_serializer, IonSerializerAttachedFileInterface):
-        yield from ion_serializer.attached_files
-    if hasattr(ion_serializer, "children"):
-        for child_serializer in ion_serializer.children:
-            yield from _collect_files_from_serializer_tree(child_serializer)
+    return iter_attached_files(ion_serializer)
 
 
 def collect_files_from_tree(page, request, ion_serializer_tree):
-    for file_container in _collect_files_from_serializer_tree(ion_serializer_tree):
+    return collect_attached_files(page, request, _collect_files_from_serializer_tree(ion_serializer_tree))
+
+
+def collect_attached_files(page, request, file_containers):
+    for file_container in file_containers:
         yield {
             "url": request.build_absolute_uri(file_container.url),
             "page": page.slug,
-            "checksum": file_container.checksum,
+            "checksum": file_container.file.checksum,
             "file": file_container.file,
         }
 
@@ -86,7 +88,7 @@ def collect_files(request, page, collected_files, user):
                 item = {}
                 item["url"] = key
                 item["page"] = page.slug
-                item["checksum"] = file.checksum
+                item["checksum"] = file.file.checksum
                 try:
                     item["path"] = file.file.path
                 except NotImplementedError:
@@ -109,6 +111,18 @@ def dedup_files(collected_files):
     return dedup_file_list
 
 
+def skip_known_files(collected_files, known_checksums: Optional[AbstractSet[str]]):
+    """
+    Remove the files with a checksum in `known_checksums` (files the client already has).
+    """
+    if not known_checksums:
+        return collected_files
+    return [
+        f for f in collected_files
+        if not f["checksum"] or f["checksum"] == "null:" or f["checksum"] not in known_checksums
+    ]
+
+
 def dedup_index(index_file):
     # dedup index file
     dedup_index_file = []
@@ -146,7 +160,16 @@ def collect_children(page, user=None):
     return result
 
 
-def make_page_tar(page, locale, request, content_serializer=DynamicPageDetailSerializer) -> TarWriter:
+def make_page_tar(
+    page,
+    locale,
+    request,
+    content_serializer=DynamicPageDetailSerializer,
+    known_checksums: Optional[AbstractSet[str]] = None,
+) -> TarWriter:
+    """
+    Files with a checksum in `known_checksums` are listed in the index but not added to the archive.
+    """
     # build content json
     content = content_serializer(instance=page, context={"request": request})
     content_json = JSONRenderer().render(content.data)
@@ -160,7 +183,7 @@ def make_page_tar(page, locale, request, content_serializer=DynamicPageDetailSer
 
     # collect all files
     collected_files = []
-    collected_files.extend(collect_files_from_tree(page, request, content.ion_serializer_tree))
+    collected_files.extend(collect_attached_files(page, request, content.ion_serialized_tree.files))
     i = {}
     for f in collected_files:
         if f["page"] not in i:
@@ -172,10 +195,13 @@ def make_page_tar(page, locale, request, content_serializer=DynamicPageDetailSer
             url += "?variation=" + request.GET["variation"]
         index_file.append({"url": url, "name": f["tar_name"], "checksum": f["checksum"]})
 
-    # de-duplicate
-    collected_files = dedup_files(collected_files)
+    # de-duplicate & leave out the files the client already has
+    collected_files = skip_known_files(dedup_files(collected_files), known_checksums)
     index_file = dedup_index(index_file)
 
+    # size & modification time of all files are needed for the tar headers
+    prefetch_file_stats(f["file"] for f in collected_files)
+
     # create tar writer instance
     tar = TarWriter()
 
@@ -197,17 +223,35 @@ def make_page_tar(page, locale, request, content_serializer=DynamicPageDetailSer
 #
 # Collection TAR
 #
-def make_tar(pages, updated_pages, locale_code, request, content_serializer=DynamicPageDetailSerializer) -> TarWriter:
+def make_tar(
+    pages,
+    updated_pages,
+    locale_code,
+    request,
+    content_serializer=DynamicPageDetailSerializer,
+    known_checksums: Optional[AbstractSet[str]] = None,
+) -> TarWriter:
+    """
+    Files with a checksum in `known_checksums` are listed in the index but not added to the archive.
+    """
     # fetch all pages
     index_file = []
     content = []
     collected_files = []
 
+    # load the specific instances of all updated pages with one query per page type
+    specific_pages = {
+        specific_page.pk: specific_page
+        for specific_page in load_pages_for_serialization(page for page in pages if page in updated_pages)
+    }
+
     for page in pages:
         index = make_pagemeta(page, locale_code, request)
         index_file.extend(index)
         if page in updated_pages:
-            page_content, files = make_pagecontent(page, request, content_serializer=content_serializer)
+            page_content, files = make_pagecontent(
+                specific_pages[page.pk], request, content_serializer=content_serializer
+            )
             content.extend(page_content)
             collected_files.extend(files)
 
@@ -225,10 +269,13 @@ def make_tar(pages, updated_pages, locale_code, request, content_serializer=Dyna
             }
         )
 
-    # de-duplicate
-    collected_files = dedup_files(collected_files)
+    # de-duplicate & leave out the files the client already has
+    collected_files = skip_known_files(dedup_files(collected_files), known_checksums)
     index_file = dedup_index(index_file)
 
+    # size & modification time of all files are needed for the tar headers
+    prefetch_file_stats(f["file"] for f in collected_files)
+
     # create tar writer instance
     tar = TarWriter()
 
@@ -277,4 +324,4 @@ def make_pagecontent(page, request, content_serializer=DynamicPageDetailSerializ
         }
     ]
 
-    return content_dict, collect_files_from_tree(page, request, content.ion_serializer_tree)
+    return content_dict, collect_attached_files(page, request, content.ion_serialized_tree.files)
@@ -0,0 +1,155 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+from django.db.models.fields.files import FieldFile
+
+from wagtail_to_ion.conf import settings
+from wagtail_to_ion.storage import READ_BUFFER_SIZE, iter_readinto
+
+
+INDEX_FILENAME = 'index.json'
+LOCK_FILENAME = '.lock'
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive `flock()` on `path` (shared by all processes of the host)."""
+    with open(path, 'a') as fp:
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+def get_source_key(file: FieldFile) -> str:
+    """
+    Returns the cache key of a stored file: its checksum (no matter under which name the file is stored) or a
+    hash of the storage name if no checksum is known.
+    """
+    checksum_field = getattr(file.field, 'checksum_field', None)
+    checksum = getattr(file.instance, checksum_field, None) if checksum_field else None
+    if checksum and checksum.startswith('sha256:'):
+        return checksum[len('sha256:'):]
+    return 'name-' + hashlib.sha256(file.name.encode('utf-8')).hexdigest()
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SourceCache:
+    """
+    Local copies of remote media files shared by the media processing tasks running on one host.
+
+    Entries are keyed by the checksum of the file & reference counted: every task acquiring a file holds a
+    reference (its process id) until it releases the file, so concurrent tasks use a single download. Files
+    not referenced by any (living) process are evicted least recently used first as soon as the cache exceeds
+    `max_size` bytes.
+
+    The index (`index.json`) is guarded by a lock file of the cache directory, each download by a lock file
+    of its entry.
+    """
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.directory / INDEX_FILENAME) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_index(self, index: Dict[str, dict]) -> None:
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, delete=False) as f:
+            json.dump(index, f)
+        os.replace(f.name, self.directory / INDEX_FILENAME)
+
+    @contextmanager
+    def _index(self) -> Iterator[Dict[str, dict]]:
+        with file_lock(self.directory / LOCK_FILENAME):
+            index = self._read_index()
+            yield index
+            self._write_index(index)
+
+    def acquire(self, file: FieldFile) -> Path:
+        """Returns the path of the local copy of `file` (downloaded if not cached yet) & reference it."""
+        key = get_source_key(file)
+        with self._index() as index:
+            entry = index.setdefault(key, {'refs': [], 'last_used': 0})
+            entry['refs'].append(os.getpid())
+            entry['last_used'] = time.time()
+
+        path = self._path(key)
+        try:
+            # concurrent tasks wait for the first one to finish the download
+            with file_lock(self.directory / f'{key}.lock'):
+                if not path.exists():
+                    self._download(file, path)
+        except BaseException:
+            self.release(file)
+            raise
+        return path
+
+    def _download(self, file: FieldFile, path: Path) -> None:
+        with file.open('rb'), tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as fp:
+            try:
+                for chunk in iter_readinto(file, bytearray(READ_BUFFER_SIZE)):
+                    fp.write(chunk)
+            except BaseException:
+                os.unlink(fp.name)
+                raise
+        os.replace(fp.name, path)
+
+    def release(self, file: FieldFile) -> None:
+        """Drop a reference to the local copy of `file` & evict unused files if the cache is too large."""
+        key = get_source_key(file)
+        with self._index() as index:
+            entry = index.get(key)
+            if entry is not None and os.getpid() in entry['refs']:
+                entry['refs'].remove(os.getpid())
+                entry['last_used'] = time.time()
+            self._evict(index)
+
+    def _evict(self, index: Dict[str, dict]) -> None:
+        sizes = {}
+        for key, entry in index.items():
+            # drop references of processes which died without releasing their files (e.g. killed workers)
+            entry['refs'] = [pid for pid in entry['refs'] if is_process_alive(pid)]
+            path = self._path(key)
+            sizes[key] = path.stat().st_size if path.exists() else 0
+
+        total_size = sum(sizes.values())
+        for key in sorted(index, key=lambda key: index[key]['last_used']):
+            if index[key]['refs'] or (total_size <= self.max_size and sizes[key]):
+                continue
+            for path in (self._path(key), self.directory / f'{key}.lock'):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total_size -= sizes[key]
+            del index[key]
+
+
+def get_source_cache() -> SourceCache:
+    return SourceCache(Path(settings.ION_TRANSCODE_DIR) / 'sources', settings.ION_TRANSCODE_CACHE_SIZE)
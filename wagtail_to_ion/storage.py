@@ -0,0 +1,190 @@
+import datetime
+import hashlib
+import mmap
+import os
+import posixpath
+from collections import defaultdict
+from typing import BinaryIO, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db.models.fields.files import FieldFile
+
+import magic
+
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class FileStat(NamedTuple):
+    size: Optional[int]
+    last_modified: Optional[datetime.datetime]
+
+
+def stat_file(storage: Storage, name: str) -> FileStat:
+    """
+    Returns the size & last modification time of a file with as few requests to the storage as possible.
+
+    Storages may implement `ion_stat(name)` to return both values with one request (see `IonS3StatMixin`),
+    `FileSystemStorage` uses a single `os.stat()`. Other storages fall back to `size()` & `get_modified_time()`.
+    Raises the exception of the storage if the file is not available.
+    """
+    if hasattr(storage, 'ion_stat'):
+        return storage.ion_stat(name)
+    if isinstance(storage, FileSystemStorage):
+        stat = os.stat(storage.path(name))
+        # aware in UTC if `USE_TZ` is set, naive local time otherwise (like `FileSystemStorage.get_modified_time()`)
+        tz = datetime.timezone.utc if settings.USE_TZ else None
+        return FileStat(stat.st_size, datetime.datetime.fromtimestamp(stat.st_mtime, tz=tz))
+    return FileStat(storage.size(name), storage.get_modified_time(name))
+
+
+def stat_files(storage: Storage, names: Iterable[str]) -> Dict[str, FileStat]:
+    """
+    Returns the size & last modification time of multiple files (missing files are not returned).
+
+    Storages may implement `ion_stat_many(names)` to stat the files with fewer requests (e.g. by listing
+    their directories), otherwise the files are stat'ed one by one.
+    """
+    if hasattr(storage, 'ion_stat_many'):
+        return storage.ion_stat_many(names)
+    stats = {}
+    for name in names:
+        try:
+            stats[name] = stat_file(storage, name)
+        except Exception:  # noqa
+            pass
+    return stats
+
+
+def get_local_path(file: FieldFile) -> Optional[str]:
+    """
+    Returns the local path of a stored file or `None` if the storage has no local paths (or the file is not saved).
+    """
+    if not file or not file._committed:
+        return None
+    try:
+        return file.path
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def iter_readinto(fp: BinaryIO, buffer: bytearray) -> Iterator[memoryview]:
+    """
+    Read `fp` from its current position into one reusable `buffer`.
+
+    Yields views of the filled part of the buffer; a view is only valid until the next one is requested.
+    File objects without `readinto()` are read in chunks of the buffer size.
+    """
+    readinto = getattr(fp, 'readinto', None)
+    if readinto is None:
+        yield from iter(lambda: fp.read(len(buffer)), b'')
+        return
+    view = memoryview(buffer)
+    while True:
+        size = readinto(buffer)
+        if not size:
+            break
+        yield view[:size]
+
+
+def hash_local_file(path: str, detect_mime_type: bool = True) -> Tuple[str, Optional[str]]:
+    """
+    Calculate the checksum and detect the mime type of a local file (like `get_file_metadata()`).
+
+    The file is hashed through a memory mapped view (one `update()` call without copying the data to python);
+    empty files or files which can't be mapped are read into one reusable buffer instead.
+    """
+    sha256 = hashlib.sha256()
+    head = b''  # start of the file used to detect the mime type (the first chunk like `File.chunks()`)
+
+    with open(path, 'rb', buffering=0) as fp:
+        try:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mapped = None
+
+        if mapped is not None:
+            with mapped:
+                sha256.update(mapped)
+                head = mapped[:File.DEFAULT_CHUNK_SIZE]
+        else:
+            for chunk in iter_readinto(fp, bytearray(READ_BUFFER_SIZE)):
+                sha256.update(chunk)
+                if len(head) < File.DEFAULT_CHUNK_SIZE:
+                    head += chunk[:File.DEFAULT_CHUNK_SIZE - len(head)]
+
+    mime_type = magic.from_buffer(head, mime=True) if detect_mime_type and head else None
+    return f'sha256:{sha256.hexdigest()}', mime_type
+
+
+class IonS3StatMixin:
+    """
+    Storage mixin for `storages.backends.s3boto3.S3Boto3Storage` (django-storages) implementing the stat capability.
+
+    A single file is stat'ed with one HEAD request. Directories (prefixes) containing at least
+    `ion_stat_list_min_keys` of the requested files are listed instead: one request returns up to 1000 objects
+    of the directory (without its subdirectories)::
+
+        class MediaStorage(IonS3StatMixin, S3Boto3Storage):
+            pass
+    """
+
+    ion_stat_list_min_keys = 10
+
+    def _ion_key(self, name: str) -> str:
+        from storages.utils import clean_name, safe_join
+
+        return safe_join(self.location, clean_name(name))
+
+    def ion_stat(self, name: str) -> FileStat:
+        obj = self.bucket.Object(self._ion_key(name))
+        obj.load()  # HEAD request
+        return FileStat(obj.content_length, obj.last_modified)
+
+    def _ion_list_stats(self, prefix: str, keys: Set[str]) -> Tuple[Dict[str, FileStat], bool]:
+        """
+        Stat `keys` of the directory `prefix` by listing the directory from the first to the last requested key.
+
+        Listing stops as soon as all keys are found or when it would take more requests than a HEAD request
+        for every key not found yet. Returns the stats & whether the listing is complete (keys not found
+        do not exist).
+        """
+        stats = {}
+        last_key = max(keys)
+        objects = self.bucket.objects.filter(Prefix=prefix, Delimiter='/', Marker=min(keys)[:-1])
+        for requests, page in enumerate(objects.pages(), start=1):
+            for obj in page:
+                if obj.key in keys:
+                    stats[obj.key] = FileStat(obj.size, obj.last_modified)
+            if len(stats) == len(keys) or not page or page[-1].key >= last_key:
+                return stats, True
+            if requests >= len(keys) - len(stats):
+                return stats, False
+        return stats, True
+
+    def ion_stat_many(self, names: Iterable[str]) -> Dict[str, FileStat]:
+        names_by_key = {self._ion_key(name): name for name in names}
+        keys_by_prefix = defaultdict(set)
+        for key in names_by_key:
+            prefix = posixpath.dirname(key)
+            keys_by_prefix[f'{prefix}/' if prefix else ''].add(key)
+
+        stats = {}
+        for prefix, keys in keys_by_prefix.items():
+            listed_stats, complete = {}, False
+            if len(keys) >= self.ion_stat_list_min_keys:
+                listed_stats, complete = self._ion_list_stats(prefix, keys)
+            for key in keys:
+                name = names_by_key[key]
+                if key in listed_stats:
+                    stats[name] = listed_stats[key]
+                    continue
+                if complete:
+                    continue  # not listed, so the file does not exist
+                try:
+                    stats[name] = self.ion_stat(name)
+                except Exception:  # noqa
+                    pass
+        return stats
@@ -1,9 +1,11 @@
 # Copyright © 2019 anfema GmbH. All rights reserved.
 from __future__ import annotations
 
+import shutil
 from pathlib import Path
+from tempfile import mkdtemp
 from .conf import settings
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from django.core.files import File
 from django.core.files.base import ContentFile
@@ -12,6 +14,7 @@ from django.db.models.fields.files import FieldFile
 from celery import shared_task
 
 from wagtail_to_ion import ffmpeg_jobs
+from wagtail_to_ion.source_cache import get_source_cache
 
 if TYPE_CHECKING:
     from wagtail_to_ion.models.file_based_models import AbstractIonMedia, AbstractIonMediaRendition
@@ -31,33 +34,31 @@ def new_empty_thumbnail(suffix) -> ContentFile:
 
 
 def setup_work_dir(file: FieldFile) -> Tuple[Path, Path]:
-    """Make the source file locally available."""
-    temp_dir = Path(settings.ION_TRANSCODE_DIR)
+    """Create a work dir for a task & make the source file locally available."""
+    work_dir = Path(mkdtemp(dir=settings.ION_TRANSCODE_DIR))
 
     try:
         source_file_path = Path(file.path)
     except (AttributeError, NotImplementedError):
-        source_file_path = temp_dir / Path(file.name).name
+        # remote file: link the local copy shared by all tasks into the work dir (keeping the file name)
+        source_file_path = work_dir / Path(file.name).name
+        try:
+            source_file_path.symlink_to(get_source_cache().acquire(file))
+        except BaseException:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
 
-        with source_file_path.open('wb') as fp:
-            if file.multiple_chunks():
-                for chunk in file.chunks():
-                    fp.write(chunk)
-            else:
-                fp.write(file.read())
+    return work_dir, source_file_path
 
-    return temp_dir, source_file_path
 
-
-def cleanup_work_dir(file: FieldFile) -> None:
+def cleanup_work_dir(file: FieldFile, work_dir: Optional[Path] = None) -> None:
     try:
         _ = file.path
     except (AttributeError, NotImplementedError):
-        # This is a remote file, so we want to delete the source file
-        temp_dir = Path(settings.ION_TRANSCODE_DIR)
-        source_file_path = temp_dir / Path(file.name).name
-        if source_file_path.exists():
-            source_file_path.unlink()        
+        # This is a remote file, so release the local copy of the source file
+        get_source_cache().release(file)
+    if work_dir is not None:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 
 @shared_task
@@ -87,7 +88,7 @@ def generate_media_thumbnail(media_id: int):
     finally:
         if thumbnail_path.exists():
             thumbnail_path.unlink()
-        cleanup_work_dir(media.file)
+        cleanup_work_dir(media.file, work_dir)
 
 
 @shared_task
@@ -124,7 +125,62 @@ def generate_media_rendition(rendition_id: int):
             rendition_path.unlink()
         if thumbnail_path.exists():
             thumbnail_path.unlink()
-        cleanup_work_dir(rendition.media_item.file)
+        cleanup_work_dir(rendition.media_item.file, work_dir)
+
+
+@shared_task
+def generate_media_renditions(media_id: int):
+    """Generate all renditions & thumbnails of a video media with one transcoding run (decoding the video once)."""
+    from wagtail_to_ion.models import get_ion_media_model
+
+    media: AbstractIonMedia = get_ion_media_model().objects.get(pk=media_id)
+    renditions = list(media.renditions.all())
+    work_dir, source_file_path = setup_work_dir(media.file)
+
+    thumbnail_filename = f'{source_file_path.stem}-thumb.jpg'
+    thumbnail_path = work_dir / thumbnail_filename
+
+    outputs = [
+        ffmpeg_jobs.RenditionOutput(
+            path=work_dir / f'{source_file_path.stem}-{rendition.name}.{rendition.transcode_settings["container"]}',
+            config=rendition.transcode_settings,
+            thumbnail_path=work_dir / f'{source_file_path.stem}-{rendition.name}.jpg',
+        )
+        for rendition in renditions
+    ]
+
+    try:
+        metadata = ffmpeg_jobs.extract_video_metadata(source_file_path)
+        ffmpeg_jobs.transcode_video_renditions(source_file_path, metadata, outputs, thumbnail_path)
+
+        media.thumbnail.save(name=thumbnail_filename, content=File(thumbnail_path.open('rb')), save=False)
+        media.width = metadata.width
+        media.height = metadata.height
+        media.duration = metadata.duration
+        media.save()
+
+        for rendition, output in zip(renditions, outputs):
+            rendition_metadata = ffmpeg_jobs.extract_video_metadata(output.path)
+            rendition.file.save(output.path.name, File(output.path.open('rb')), save=False)
+            rendition.width = rendition_metadata.width
+            rendition.height = rendition_metadata.height
+            rendition.thumbnail.save(output.thumbnail_path.name, File(output.thumbnail_path.open('rb')), save=False)
+            rendition.transcode_finished = True
+            rendition.save()
+    except ffmpeg_jobs.CodecProcessError as e:
+        if not media.thumbnail:
+            empty_thumbnail = new_empty_thumbnail(media.pk)
+            media.thumbnail.save(name=empty_thumbnail.name, content=empty_thumbnail, save=False)
+            media.save()
+        for rendition in renditions:
+            if not rendition.transcode_finished:
+                rendition.transcode_errors = str(e)
+                rendition.save()
+    finally:
+        for path in [thumbnail_path] + [p for output in outputs for p in (output.path, output.thumbnail_path)]:
+            if path.exists():
+                path.unlink()
+        cleanup_work_dir(media.file, work_dir)
 
 
 @shared_task
@@ -145,7 +201,7 @@ def regenerate_rendition_thumbnail(rendition: AbstractIonMediaRendition):
     finally:
         if thumbnail_path.exists():
             thumbnail_path.unlink()
-        cleanup_work_dir(rendition.file)
+        cleanup_work_dir(rendition.file, work_dir)
 
 
 @shared_task
@@ -162,4 +218,4 @@ def get_audio_metadata(media_id: int):
     except ffmpeg_jobs.CodecProcessError:
         pass
     finally:
-        cleanup_work_dir(media.file)
+        cleanup_work_dir(media.file, work_dir)
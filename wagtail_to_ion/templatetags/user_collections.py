@@ -8,5 +8,5 @@ register = template.Library()
 # Get a user's collections based on their groups
 @register.simple_tag(takes_context=True)
 def get_user_collections(context):
-    user = context['request'].user
-    return util_get_user_collections(user)
+    request = context['request']
+    return util_get_user_collections(request.user, request=request)
@@ -0,0 +1,52 @@
+import hashlib
+
+from django.core.files import File
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+import magic
+
+
+class IonFileMetadataMixin:
+    """
+    Calculates the checksum & detects the mime type of uploaded files while they are received.
+
+    The result is stored as `ion_file_metadata` (a `(checksum, mime_type)` tuple like the return value of
+    `get_file_metadata()`) on the uploaded file, so the file is not read again to fill the file metadata
+    fields of `IonFileField`.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # initialize before calling `new_file()` as it raises `StopFutureHandlers` if the handler stores the file
+        self.ion_sha256 = hashlib.sha256()
+        self.ion_head = b''  # start of the file used to detect the mime type
+        self.ion_complete = True
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        result = super().receive_data_chunk(raw_data, start)
+        if result is None:  # the chunk is stored by this handler
+            self.ion_sha256.update(raw_data)
+            if len(self.ion_head) < File.DEFAULT_CHUNK_SIZE:
+                self.ion_head += raw_data[:File.DEFAULT_CHUNK_SIZE - len(self.ion_head)]
+        else:
+            self.ion_complete = False
+        return result
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None and self.ion_complete:
+            mime_type = magic.from_buffer(self.ion_head, mime=True)
+            file.ion_file_metadata = (f'sha256:{self.ion_sha256.hexdigest()}', mime_type)
+        return file
+
+
+class IonMemoryFileUploadHandler(IonFileMetadataMixin, MemoryFileUploadHandler):
+    """
+    `MemoryFileUploadHandler` calculating the file metadata of the uploaded files.
+    """
+
+
+class IonTemporaryFileUploadHandler(IonFileMetadataMixin, TemporaryFileUploadHandler):
+    """
+    `TemporaryFileUploadHandler` calculating the file metadata of the uploaded files.
+    """
@@ -1,16 +1,26 @@
 import functools
+import hashlib
+import re
+import uuid
 import warnings
-from typing import Any, Dict, Generator, List, NamedTuple, Tuple, Type, Union
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Generator, Iterable, List, NamedTuple, Optional, Set, Tuple, Type, Union
 
-from django.db.models import Q, Model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import BaseCache, caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Model
+from django.db.models.functions import Length, Substr
 
 from wagtail.core.blocks import Block, BoundBlock, ListBlock, StreamValue, StructBlock, StructValue
 from wagtail.core.fields import StreamField
-from wagtail.core.models import Collection, Page, PageViewRestriction, get_page_models
+from wagtail.core.models import Collection, GroupCollectionPermission, Page, PageViewRestriction, get_page_models
 from wagtail.images import get_image_model
 from wagtail.documents import get_document_model
 
-from wagtail_to_ion.models import get_ion_collection_model
+from wagtail_to_ion.conf import settings
+from wagtail_to_ion.models import get_ion_collection_model, get_ion_document_model, get_ion_image_model, \
+    get_ion_language_model, get_ion_media_model, get_ion_object_reference_model
 from wagtail_to_ion.models.abstract import AbstractIonCollection
 
 try:
@@ -19,40 +29,71 @@ except ImportError:
     ListValue = list  # the value of `ListBlock` was a simple `list` before wagtail 2.16
 
 
-def get_user_collections(user):
+def memoize_for_request(func):
     """
-    Return collections for the user
+    Memoize the result of ``func(user)`` for the duration of a request.
+
+    The result is stored on ``request`` (passed as keyword argument) per user, without a request the result
+    is computed on every call. Memoized functions have to return evaluated values (not lazy querysets),
+    otherwise every clone of the result would query the database again.
+    """
+    @functools.wraps(func)
+    def wrapper(user, request=None):
+        if request is None:
+            return func(user)
+        memo = request.__dict__.setdefault('_ion_memo', {})
+        key = (func.__name__, user.pk)
+        try:
+            return memo[key]
+        except KeyError:
+            result = memo[key] = func(user)
+            return result
+
+    return wrapper
+
+
+@memoize_for_request
+def get_user_collection_ids(user) -> FrozenSet[int]:
+    """
+    Return the IDs of the collections the groups of the user have permissions for
     """
     # TODO: doesn't support permission inheritance of nested collections
+    return frozenset(
+        GroupCollectionPermission.objects.filter(group__in=user.groups.all()).values_list('collection_id', flat=True)
+    )
+
+
+def get_user_collections(user, request=None):
+    """
+    Return collections for the user
+    """
     # TODO: remove (should be obsolete once 'choose' permission is available; permission handling is project specific)
     collections = Collection.objects.all()
     if not user.is_superuser:
-        collections = collections.filter(group_permissions__group__user=user).distinct()
+        collections = collections.filter(pk__in=get_user_collection_ids(user, request=request))
 
     return collections
 
 
-def get_user_images(user, images=None):
+def get_user_images(user, images=None, request=None):
     """
     Return collections and images for the user
     """
-    collections = get_user_collections(user)
     if not images:
         images = get_image_model().objects.all()
     if not user.is_superuser:
-        images = images.filter(collection__in=collections)
+        images = images.filter(collection__in=get_user_collection_ids(user, request=request))
     return images
 
 
-def get_user_documents(user, documents=None):
+def get_user_documents(user, documents=None, request=None):
     """
     Return collections and documents for the user
     """
-    collections = get_user_collections(user)
     if not documents:
         documents = get_document_model().objects.all()
     if not user.is_superuser:
-        documents = documents.filter(collection__in=collections)
+        documents = documents.filter(collection__in=get_user_collection_ids(user, request=request))
 
     return documents
 
@@ -66,58 +107,270 @@ def get_collection_for_page(page):
         return ion_collection.slug
 
 
+def get_language_cache() -> Optional[BaseCache]:
+    """
+    Returns the cache for the languages of collections or ``None`` if caching is disabled.
+    """
+    if not settings.ION_LANGUAGE_CACHE:
+        return None
+    return caches[settings.ION_LANGUAGE_CACHE]
+
+
+def _get_language_cache_key(collection_id: int) -> str:
+    return f'wagtail_to_ion:languages:{collection_id}'
+
+
+def get_collection_languages(collection: Page) -> Dict[str, Page]:
+    """
+    Returns the live languages of `collection` by code (in tree order).
+
+    The languages are loaded with one query on the language model and cached per collection (if the
+    language cache is enabled).
+    """
+    def load_languages():
+        languages = {}
+        for language in get_ion_language_model().objects.child_of(collection).filter(live=True).order_by('path'):
+            languages.setdefault(language.code, language)
+        return languages
+
+    cache = get_language_cache()
+    if cache is None:
+        return load_languages()
+    return cache.get_or_set(_get_language_cache_key(collection.pk), load_languages, timeout=None)
+
+
+def get_default_language(collection: Page) -> Optional[Page]:
+    """
+    Returns the default language of `collection` or ``None`` if it has no (live) default language.
+    """
+    return next((language for language in get_collection_languages(collection).values() if language.is_default), None)
+
+
+def resolve_language(collection: Page, code: str) -> Optional[Page]:
+    """
+    Returns the language of `collection` with the locale `code`, falls back to the default language.
+    """
+    language = get_collection_languages(collection).get(code)
+    if language is None:
+        language = get_default_language(collection)
+    return language
+
+
+def invalidate_language_cache(collection_id: int) -> None:
+    """
+    Invalidate the cached languages of the collection with the ID `collection_id`.
+    """
+    cache = get_language_cache()
+    if cache is not None:
+        cache.delete(_get_language_cache_key(collection_id))
+
+
+@memoize_for_request
+def get_visibility_key(user) -> str:
+    """
+    Returns a key for the visibility context of `user`, all users with the same key see the same pages.
+    """
+    if not settings.GET_PAGES_BY_USER:
+        return 'all'
+    group_ids = sorted(user.groups.values_list('pk', flat=True))
+    groups_hash = hashlib.sha1(','.join(map(str, group_ids)).encode('ascii')).hexdigest()
+    return f'{"active" if user.is_active else "inactive"}:{groups_hash}'
+
+
+def get_visibility_cache() -> Optional[BaseCache]:
+    """
+    Returns the cache for the page visibility of user groups or ``None`` if caching is disabled.
+    """
+    if not settings.ION_VISIBILITY_CACHE:
+        return None
+    return caches[settings.ION_VISIBILITY_CACHE]
+
+
+def get_page_visibility_q(groups) -> Q:
+    """
+    Returns a filter for pages that are visible for members of `groups`.
+
+    A page is visible if it has no view restriction of its own or if one of its restrictions is
+    a group restriction for one of the `groups` (inherited restrictions are not checked).
+    """
+    own_restrictions = PageViewRestriction.objects.filter(page=OuterRef('pk'))
+    return ~Exists(own_restrictions) | Exists(
+        own_restrictions.filter(restriction_type=PageViewRestriction.GROUPS, groups__in=groups)
+    )
+
+
+def _get_visibility_version_key(collection_id: int) -> str:
+    return f'wagtail_to_ion:visibility:{collection_id}:version'
+
+
+def get_hidden_page_ids(collection: Page, user) -> FrozenSet[int]:
+    """
+    Returns the IDs of all pages of a collection (including the collection) that are hidden for `user`.
+
+    The result is cached per collection and set of user groups (if the visibility cache is enabled),
+    so all users with the same groups share one entry.
+    """
+    group_ids = sorted(user.groups.values_list('pk', flat=True))
+    hidden_pages = Page.objects.descendant_of(collection, inclusive=True).exclude(
+        get_page_visibility_q(group_ids)
+    )
+
+    cache = get_visibility_cache()
+    if cache is None:
+        return frozenset(hidden_pages.values_list('pk', flat=True))
+
+    version = cache.get_or_set(_get_visibility_version_key(collection.pk), lambda: uuid.uuid4().hex, timeout=None)
+    groups_hash = hashlib.sha1(','.join(map(str, group_ids)).encode('ascii')).hexdigest()
+    return cache.get_or_set(
+        f'wagtail_to_ion:visibility:{collection.pk}:{version}:{groups_hash}',
+        lambda: frozenset(hidden_pages.values_list('pk', flat=True)),
+        timeout=settings.ION_VISIBILITY_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_visibility_cache(page: Page) -> None:
+    """
+    Invalidate the cached page visibility of the collection containing `page`.
+    """
+    cache = get_visibility_cache()
+    if cache is None:
+        return
+    IonCollection = get_ion_collection_model()
+    for collection_id in IonCollection.objects.ancestor_of(page, inclusive=True).values_list('pk', flat=True):
+        cache.delete(_get_visibility_version_key(collection_id))
+
+
+def get_page_cache() -> Optional[BaseCache]:
+    """
+    Returns the cache for the serialized page details or ``None`` if caching is disabled.
+    """
+    if not settings.ION_PAGE_CACHE:
+        return None
+    return caches[settings.ION_PAGE_CACHE]
+
+
+_PAGE_CACHE_VERSION_KEY = 'wagtail_to_ion:page:version'
+
+
+def _get_page_cache_collection_version_key(collection_slug: str) -> str:
+    return f'wagtail_to_ion:page:{collection_slug}:version'
+
+
+def get_page_cache_key(cache: BaseCache, page: Page, collection_slug: str, request) -> str:
+    """
+    Returns the cache key for the serialized details of `page` as requested by `request`.
+
+    The key contains the version of all pages (changed by saving images, documents or media) and the version
+    of the collection (changed by publishing, unpublishing, moving or deleting one of its pages), so entries
+    are invalidated by changing a version.
+    """
+    version_keys = [_PAGE_CACHE_VERSION_KEY, _get_page_cache_collection_version_key(collection_slug)]
+    versions = cache.get_many(version_keys)
+    for version_key in version_keys:
+        if version_key not in versions:
+            versions[version_key] = cache.get_or_set(version_key, lambda: uuid.uuid4().hex, timeout=None)
+
+    variant = (
+        request.scheme,
+        request.get_host(),
+        request.resolver_match.kwargs['locale'],
+        request.GET.get('variation', 'default'),
+        request.META.get('HTTP_API_VERSION', ''),
+        get_visibility_key(request.user, request=request),
+    )
+    variant_hash = hashlib.sha1(repr(variant).encode('utf-8')).hexdigest()
+    return ':'.join((
+        'wagtail_to_ion:page',
+        versions[_PAGE_CACHE_VERSION_KEY],
+        versions[version_keys[1]],
+        str(page.pk),
+        str(page.live_revision_id),
+        variant_hash,
+    ))
+
+
+def invalidate_page_cache(page: Optional[Page] = None) -> None:
+    """
+    Invalidate the cached page details of the collection containing `page` (or of all pages if `page` is ``None``).
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return
+    if page is None:
+        cache.delete(_PAGE_CACHE_VERSION_KEY)
+        return
+    IonCollection = get_ion_collection_model()
+    for collection_slug in IonCollection.objects.ancestor_of(page, inclusive=True).values_list('slug', flat=True):
+        cache.delete(_get_page_cache_collection_version_key(collection_slug))
+
+
 # TODO: might be obsolete once https://github.com/wagtail/wagtail/pull/6300 has been merged
 def visible_tree_by_user(root, user):
+    """
+    Returns a queryset of all live descendants of `root` visible for `user`.
+
+    Pages are hidden if the collection of `root`, `root` itself or the page is restricted to groups
+    the user is not a member of.
+    """
     IonCollection = get_ion_collection_model()
-    collection = IonCollection.objects.get(live=True, slug=get_collection_for_page(root))
+    collections = IonCollection.objects.filter(live=True).ancestor_of(root)
+    tree = root.get_descendants().filter(live=True)
 
-    if collection.view_restrictions.exists():
-        restrictions = collection.view_restrictions.filter(
-            restriction_type=PageViewRestriction.GROUPS,
-            groups__in=user.groups.all()
-        )
-        if not restrictions.exists():
+    if get_visibility_cache() is not None:
+        collection = collections.order_by('path').first()
+        if collection is None:
             return Page.objects.none()
-
-    if root.view_restrictions.exists():
-        restrictions = root.view_restrictions.filter(
-            restriction_type=PageViewRestriction.GROUPS,
-            groups__in=user.groups.all()
-        )
-        if not restrictions.exists():
+        hidden_page_ids = get_hidden_page_ids(collection, user)
+        if collection.pk in hidden_page_ids or root.pk in hidden_page_ids:
             return Page.objects.none()
-
-    tree = root.get_descendants().filter(live=True)
-    public_tree = tree.public()
-    non_public_tree = tree.not_public().filter(
-        Q(
-            view_restrictions__restriction_type=PageViewRestriction.GROUPS,
-            view_restrictions__groups__in=user.groups.all()
-        ) | \
-        Q(
-            view_restrictions__isnull=True
-        )
+        if not hidden_page_ids:
+            return tree
+        # the hidden pages are filtered with a subquery (a `NOT IN` list of their IDs would be unbounded)
+        return tree.filter(get_page_visibility_q(user.groups.all()))
+
+    groups = user.groups.all()
+    visible_q = get_page_visibility_q(groups)
+    return tree.filter(
+        visible_q,
+        Exists(collections.filter(visible_q)),
+        Exists(Page.objects.filter(pk=root.pk).filter(visible_q)),
     )
-    ids = list(public_tree.values_list('id', flat=True))
-    ids += list(non_public_tree.values_list('id', flat=True))
-    return Page.objects.filter(id__in=ids)
 
 
-def visible_collections_by_user(user):
+def get_public_page_q() -> Q:
+    """
+    Returns a filter for pages without a view restriction on the page or one of its ancestors.
+
+    Same as ``PageQuerySet.public()`` but uses a subquery instead of loading all view restrictions.
+    """
+    return ~Exists(PageViewRestriction.objects.filter(page__path=Substr(OuterRef('path'), 1, Length('page__path'))))
+
+
+@memoize_for_request
+def get_visible_collection_ids(user) -> FrozenSet[int]:
+    """
+    Returns the IDs of all live collections visible for `user`.
+    """
     IonCollection = get_ion_collection_model()
     collections = IonCollection.objects.filter(live=True)
     if not user.is_active:
-        collections = collections.public()
+        collections = collections.filter(get_public_page_q())
     else:
-        public_collections = collections.public()
-        non_public_collections = collections.not_public().filter(
-            view_restrictions__restriction_type=PageViewRestriction.GROUPS,
-            view_restrictions__groups__in=user.groups.all()
+        collections = collections.filter(
+            get_public_page_q() | Exists(
+                PageViewRestriction.objects.filter(
+                    page=OuterRef('pk'),
+                    restriction_type=PageViewRestriction.GROUPS,
+                    groups__in=user.groups.all(),
+                )
+            )
         )
-        ids = list(public_collections.values_list('id', flat=True))
-        ids += list(non_public_collections.values_list('id', flat=True))
-        collections = IonCollection.objects.filter(id__in=ids)
-    return collections
+    return frozenset(collections.values_list('pk', flat=True))
+
+
+def visible_collections_by_user(user, request=None):
+    IonCollection = get_ion_collection_model()
+    return IonCollection.objects.filter(pk__in=get_visible_collection_ids(user, request=request))
 
 
 def isoDate(d):
@@ -134,37 +387,87 @@ def get_object_block_usage(obj, block_types: Union[Type[Block], Tuple[Type[Block
     Works like `wagtail.admin.models.get_object_usage` but inspects all pages
     which might contain a block of the specified type(s).
 
-    To avoid inspecting all pages the following optimizations are applied:
+    See `get_objects_block_usage()`.
+    """
+    page_ptr_ids = get_objects_block_usage([obj], block_types=block_types).get(obj.pk, set())
+    return Page.objects.filter(pk__in=page_ptr_ids)
+
+
+def get_objects_block_usage(
+    objs: Iterable[Model],
+    block_types: Union[Type[Block], Tuple[Type[Block]]],
+) -> Dict[Any, Set[int]]:
+    """
+    Returns the IDs of the pages that contain a block linked to one of the objects (by primary key of the object).
+
+    If the object reference index is configured (`ION_OBJECT_REFERENCE_MODEL`) and covers the
+    block type(s) the indexed pages are looked up in the index with a single query.
+
+    Pages which are not indexed (all pages if there is no index) are inspected with the following optimizations:
       1. operate only on page models with a StreamField containing the specified block type(s)
-      2. filter pages by expected JSON string in StreamField column(s)
+      2. filter pages by expected JSON string in StreamField column(s) (one query per page model)
     """
+    objs = set(objs)
+    usage: Dict[Any, Set[int]] = defaultdict(set)
+    if not objs:
+        return usage
+
     block_usage = get_page_models_using_blocks(block_types=block_types)
-    page_ptr_ids = set()
+    page_querysets = {page_model: page_model.objects.all() for page_model in block_usage}
+
+    ObjectReference = get_ion_object_reference_model()
+    block_types_tuple = block_types if isinstance(block_types, tuple) else (block_types,)
+    if ObjectReference is not None and set(block_types_tuple).issubset(get_reference_block_types()):
+        pks = {str(obj.pk): obj.pk for obj in objs}
+        references = ObjectReference.objects.filter(
+            content_type__in={ContentType.objects.get_for_model(obj) for obj in objs},
+            object_id__in=pks.keys(),
+        )
+        objs_by_key = {(ContentType.objects.get_for_model(obj).pk, str(obj.pk)): obj for obj in objs}
+        reference_rows = references.values_list('content_type_id', 'object_id', 'page_id')
+        for content_type_id, object_id, page_id in reference_rows:
+            obj = objs_by_key.get((content_type_id, object_id))
+            if obj is not None:
+                usage[obj.pk].add(page_id)
+
+        # inspect the pages saved before the index was set up until `ion_rebuild_reference_index` indexed them
+        page_is_indexed = ObjectReference.objects.filter(page_id=OuterRef('pk'), content_type__isnull=True)
+        page_querysets = {page_model: qs.filter(~Exists(page_is_indexed)) for page_model, qs in page_querysets.items()}
+        page_querysets = {page_model: qs for page_model, qs in page_querysets.items() if qs.exists()}
+
+    pks_regex = '|'.join(sorted(re.escape(str(obj.pk)) for obj in objs))
 
-    for page_model in block_usage.keys():
+    for page_model, queryset in page_querysets.items():
         stream_field_filter_q = Q()
         stream_fields = set()
 
-        # create a (postgres specific) filter for every block; look for:
+        # create a filter for every block; look for:
         # - `"value": <pk>` string if block is in a StreamValue
         # - `"<field_name>": <pk>` if block is in a StructValue
         for block in block_usage[page_model]:
             filter_att = block.block_name if block.in_struct else 'value'
             stream_field_filter_q |= Q(
-                **{f'{block.stream_field_name}__regex': rf'"{filter_att}":\s*(?:[[\d ,]*?)??{obj.pk}\M'}
+                **{f'{block.stream_field_name}__regex': rf'"{filter_att}":\s*(?:[\d ,[]*?)??(?:{pks_regex})(?!\w)'}
             )
             stream_fields.add(block.stream_field_name)
 
-        for page_with_obj_pk_in_blocks in page_model.objects.filter(stream_field_filter_q):
+        for page_with_obj_pk_in_blocks in queryset.filter(stream_field_filter_q):
             for field_name in stream_fields:
                 for bound_block in get_stream_value_bound_blocks(getattr(page_with_obj_pk_in_blocks, field_name)):
-                    if isinstance(bound_block.block, block_types) and bound_block.value == obj:
-                        page_ptr_ids.add(page_with_obj_pk_in_blocks.page_ptr_id)
-                    elif isinstance(bound_block.block, ListBlock):
-                        if isinstance(bound_block.block.child_block, block_types) and obj in bound_block.value:
-                            page_ptr_ids.add(page_with_obj_pk_in_blocks.page_ptr_id)
-
-    return Page.objects.filter(pk__in=page_ptr_ids)
+                    if isinstance(bound_block.block, block_types):
+                        values = [bound_block.value]
+                    elif (
+                        isinstance(bound_block.block, ListBlock)
+                        and isinstance(bound_block.block.child_block, block_types)
+                    ):
+                        values = bound_block.value
+                    else:
+                        continue
+                    for value in values:
+                        if value in objs:
+                            usage[value.pk].add(page_with_obj_pk_in_blocks.page_ptr_id)
+
+    return usage
 
 
 class StreamFieldBlockInfo(NamedTuple):
@@ -227,19 +530,23 @@ def get_stream_value_blocks(stream_value: StreamValue) -> Generator[StreamValueB
 
 def get_stream_value_bound_blocks(stream_value: StreamValue) -> Generator[BoundBlock, None, None]:
     """Generates an un-nested list of all bound blocks of a `StreamValue`."""
-    def unnest_blocks(value: Any):
+    # depth-first traversal with an explicit stack of iterators (nested stream fields may be deeply nested)
+    stack = [iter((stream_value,))]
+    while stack:
+        try:
+            value = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+
         if isinstance(value, BoundBlock):
             yield value
             value = value.value
 
         if isinstance(value, (ListValue, StreamValue)):
-            for sub_value in value:
-                yield from unnest_blocks(sub_value)
+            stack.append(iter(value))
         elif isinstance(value, StructValue):
-            for sub_value in value.bound_blocks.values():
-                yield from unnest_blocks(sub_value)
-
-    yield from unnest_blocks(stream_value)
+            stack.append(iter(value.bound_blocks.values()))
 
 
 class ModelStreamFieldBlockInfo(NamedTuple):
@@ -267,3 +574,61 @@ def get_page_models_using_blocks(
                     )
 
     return models_with_block
+
+
+@functools.lru_cache()
+def get_reference_block_types() -> Tuple[Type[Block], ...]:
+    """Returns the block types recorded in the object reference index (`check_usage_block_types` of the ION models)."""
+    block_types = []
+    for model in (get_ion_document_model(), get_ion_image_model(), get_ion_media_model()):
+        block_types.extend(getattr(model, 'check_usage_block_types', ()))
+    return tuple(dict.fromkeys(block_types))
+
+
+def get_reference_stream_field_names(page_model: Type[Model]) -> Set[str]:
+    """Returns the names of the stream fields of a page model which contain blocks recorded in the reference index."""
+    block_usage = get_page_models_using_blocks(block_types=get_reference_block_types())
+    return {block.stream_field_name for block in block_usage.get(page_model, ())}
+
+
+def get_object_references(page: Page) -> Set[Tuple[int, str]]:
+    """
+    Returns the objects referenced in the stream field blocks of a (specific) page.
+
+    :returns: set of tuples of the content type ID and primary key of the referenced objects
+    """
+    block_types = get_reference_block_types()
+    references = set()
+    for field_name in get_reference_stream_field_names(type(page)):
+        for bound_block in get_stream_value_bound_blocks(getattr(page, field_name)):
+            if isinstance(bound_block.block, block_types):
+                values = [bound_block.value]
+            elif isinstance(bound_block.block, ListBlock) and isinstance(bound_block.block.child_block, block_types):
+                values = bound_block.value
+            else:
+                continue
+            for value in values:
+                if isinstance(value, Model):
+                    references.add((ContentType.objects.get_for_model(value).pk, str(value.pk)))
+    return references
+
+
+def update_object_references(page: Page) -> None:
+    """
+    Update the object reference index entries of a page.
+    """
+    ObjectReference = get_ion_object_reference_model()
+    if ObjectReference is None or not get_reference_stream_field_names(page.specific_class):
+        return
+
+    content = page if isinstance(page, page.specific_class) else page.specific
+    references = get_object_references(content)
+    with transaction.atomic():
+        ObjectReference.objects.filter(page_id=page.pk).delete()
+        ObjectReference.objects.bulk_create([
+            ObjectReference(page_id=page.pk),  # marks the page as indexed
+            *(
+                ObjectReference(content_type_id=content_type_id, object_id=object_id, page_id=page.pk)
+                for content_type_id, object_id in references
+            ),
+        ])
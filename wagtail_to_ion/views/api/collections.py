@@ -1,59 +1,100 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from email.utils import parsedate_to_datetime
 
-from django.http import Http404, HttpResponse
+from django.db.models import Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
 from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 
 from rest_framework import generics
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 
 from wagtail.core.models import Page
 
 from wagtail_to_ion.conf import settings
-from wagtail_to_ion.models import get_ion_collection_model
-from wagtail_to_ion.serializers import CollectionSerializer, CollectionDetailSerializer, DynamicPageDetailSerializer, make_tar
-from wagtail_to_ion.views.mixins import ListMixin
-from wagtail_to_ion.utils import visible_tree_by_user, visible_collections_by_user
+from wagtail_to_ion.models import get_ion_collection_model, get_ion_language_model, get_ion_page_change_model
+from wagtail_to_ion.serializers import CollectionSerializer, CollectionDetailSerializer, DynamicPageDetailSerializer, \
+    DynamicPageSerializer, make_tar
+from wagtail_to_ion.views.mixins import ConditionalResponseMixin, KnownChecksumsMixin, ListMixin, latest
+from wagtail_to_ion.utils import resolve_language, visible_tree_by_user, visible_collections_by_user
 
 
 Collection = get_ion_collection_model()
+Language = get_ion_language_model()
 
 
-class CollectionListView(ListMixin):
+def get_page_states(pages, *fields):
+    """
+    Returns the state of `pages` (their ID, path, last publication & `fields`) for the conditional response validators
+    and the date of the last publication.
+    """
+    states = list(pages.order_by('path').values_list('pk', 'path', 'last_published_at', *fields))
+    return states, latest(*(state[2] for state in states))
+
+
+class CollectionListView(ConditionalResponseMixin, ListMixin):
     serializer_class = CollectionSerializer
 
-    @method_decorator(never_cache)
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    def get_validators(self):
+        collections = self.filter_queryset(self.get_queryset())
+        collection_states, collections_published = get_page_states(collections, 'slug', 'title')
+        collection_paths = {state[1] for state in collection_states}
+        language_states, _ = get_page_states(Language.objects.filter(live=True), 'code', 'is_default')
+        # only the languages of the listed collections are relevant (for the default locale)
+        language_states = [state for state in language_states if state[1][:-Page.steplen] in collection_paths]
+        return (
+            (collection_states, language_states),
+            latest(collections_published, *(state[2] for state in language_states)),
+        )
 
     def get_queryset(self):
         user = self.request.user
         if settings.GET_PAGES_BY_USER:
-            return visible_collections_by_user(user)
+            return visible_collections_by_user(user, request=self.request)
         else:
             return Collection.objects.filter(live=True)
 
 
-class CollectionDetailView(generics.RetrieveAPIView):
+class CollectionDetailView(ConditionalResponseMixin, generics.RetrieveAPIView):
     serializer_class = CollectionDetailSerializer
     lookup_field = 'slug'
 
-    @method_decorator(never_cache)
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    def get_validators(self):
+        collection = self.get_object()
+        serializer = self.get_serializer(collection)
+        language_states, languages_published = get_page_states(
+            Language.objects.child_of(collection).filter(live=True), 'code', 'is_default'
+        )
+        page_states, pages_published = get_page_states(serializer.get_pages_queryset(collection), 'slug')
+        values = (collection.pk, collection.slug, collection.title, language_states, page_states)
+        return values, latest(collection.last_published_at, languages_published, pages_published)
+
+    def retrieve(self, request, *args, **kwargs):
+        # stream only plain JSON, other renderers (e.g. the browsable API) need the complete data
+        if not settings.ION_STREAM_COLLECTION_PAGES or not isinstance(request.accepted_renderer, JSONRenderer):
+            return super().retrieve(request, *args, **kwargs)
+
+        serializer = self.get_serializer(self.get_object())
+        return StreamingHttpResponse(
+            serializer.stream_json(chunk_size=settings.ION_COLLECTION_PAGES_CHUNK_SIZE),
+            content_type='application/json',
+        )
 
     def get_queryset(self):
         user = self.request.user
         if settings.GET_PAGES_BY_USER:
-            return visible_collections_by_user(user)
+            return visible_collections_by_user(user, request=self.request)
         else:
             return Collection.objects.filter(live=True)
 
 
-class CollectionArchiveView(ListMixin):
+class CollectionArchiveView(KnownChecksumsMixin, ListMixin):
     content_serializer_class = DynamicPageDetailSerializer
 
     @method_decorator(never_cache)
@@ -62,18 +103,7 @@ class CollectionArchiveView(ListMixin):
 
     def get_queryset(self):
         try:
-            languages = self.collection.get_children().filter(live=True)
-
-            collection = None
-            default_collection = None
-            for language in languages:
-                spec = language.specific
-                if spec.is_default:
-                    default_collection = spec
-                if spec.code == self.locale:
-                    collection = spec
-            if collection is None:
-                collection = default_collection
+            collection = resolve_language(self.collection, self.locale)
 
             if settings.GET_PAGES_BY_USER:
                 user = self.request.user
@@ -113,4 +143,81 @@ class CollectionArchiveView(ListMixin):
                 return HttpResponse(status=304)  # not modified
             updated_pages = list(updated_pages)
 
-        return make_tar(list(pages), updated_pages, self.locale, request, content_serializer=self.content_serializer_class)
+        return make_tar(
+            list(pages),
+            updated_pages,
+            self.locale,
+            request,
+            content_serializer=self.content_serializer_class,
+            known_checksums=self.get_known_checksums(),
+        )
+
+
+class CollectionChangesView(generics.GenericAPIView):
+    """
+    Pages of a collection changed since a cursor (see `ION_PAGE_CHANGE_MODEL`)
+
+    Responds with the pages published or moved into the collection since the change with the ID
+    `cursor` (`upserts`), the identifiers of pages unpublished, deleted or moved away since
+    (`tombstones`) and the `cursor` to send with the next request.
+
+    Changes are sent again until they are older than `ION_PAGE_CHANGE_WINDOW`: the returned cursor only
+    advances over changes all transactions with a lower ID have committed for.
+    """
+    content_serializer_class = DynamicPageSerializer
+
+    @method_decorator(never_cache)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    def get_collection(self, slug):
+        return Collection.objects.filter(live=True, slug=slug)
+
+    def get_language(self):
+        return resolve_language(self.collection, self.locale)
+
+    def get_cursor(self):
+        try:
+            cursor = int(self.request.GET.get('cursor', 0))
+        except ValueError:
+            raise ParseError('cursor must be an integer')
+        if cursor < 0:
+            raise ParseError('cursor must not be negative')
+        return cursor
+
+    def get_queryset(self):
+        if settings.GET_PAGES_BY_USER:
+            return visible_tree_by_user(self.language, self.request.user)
+        return self.language.get_descendants().filter(live=True)
+
+    def get(self, request, locale, collection, *args, **kwargs):
+        PageChange = get_ion_page_change_model()
+        if PageChange is None:
+            raise Http404
+
+        self.collection = self.get_collection(collection).first()
+        if self.collection is None:
+            raise Http404
+        self.locale = locale
+        self.language = self.get_language()
+        if self.language is None:
+            raise Http404
+
+        cursor = self.get_cursor()
+        changes = PageChange.objects.filter(id__gt=cursor)
+        # IDs are assigned when a change is logged but become visible when its transaction commits, so a change with
+        # a lower ID may still show up: advance the cursor only over the changes older than the safety window
+        settled_before = timezone.now() - timedelta(seconds=settings.ION_PAGE_CHANGE_WINDOW)
+        next_cursor = changes.filter(created_at__lte=settled_before).aggregate(cursor=Max('id'))['cursor'] or cursor
+        changes = changes.filter(path__startswith=self.language.path)
+
+        pages = self.get_queryset().filter(pk__in=changes.values('page_id')).order_by('path').specific()
+        upserts = self.content_serializer_class(instance=pages, many=True, user=request.user).data
+        upsert_slugs = {page.slug for page in pages}
+        tombstones = sorted(set(changes.values_list('slug', flat=True)) - upsert_slugs)
+
+        return Response({
+            'cursor': next_cursor,
+            'upserts': upserts,
+            'tombstones': [{'identifier': slug} for slug in tombstones],
+        })
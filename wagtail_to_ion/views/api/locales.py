@@ -1,24 +1,26 @@
 # Copyright © 2019 anfema GmbH. All rights reserved.
-from django.views.decorators.cache import never_cache
-from django.utils.decorators import method_decorator
 from rest_framework import generics
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
 from wagtail_to_ion.serializers import LocaleSerializer
 from wagtail_to_ion.models import get_ion_collection_model, get_ion_language_model
+from wagtail_to_ion.views.mixins import ConditionalResponseMixin, latest
 
 
 Collection = get_ion_collection_model()
 Language = get_ion_language_model()
 
 
-class LocaleListView(generics.ListAPIView):
+class LocaleListView(ConditionalResponseMixin, generics.ListAPIView):
     serializer_class = LocaleSerializer
 
-    @method_decorator(never_cache)
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    def get_validators(self):
+        languages = self.filter_queryset(self.get_queryset(self.kwargs['collection']))
+        values = list(languages.order_by('path').values_list(
+            'pk', 'last_published_at', 'title', 'code', 'is_default', 'is_rtl'
+        ))
+        return values, latest(*(value[1] for value in values))
 
     def get_collection(self, slug):
         return Collection.objects.filter(live=True, slug=slug)
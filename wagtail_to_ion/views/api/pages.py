@@ -1,61 +1,197 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
-from django.http import Http404
+from django.db.models import Max
+from django.http import Http404, StreamingHttpResponse
 from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
 from rest_framework import generics
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from wagtail.core.models import Page
 
 from wagtail_to_ion.conf import settings
 from wagtail_to_ion.serializers import DynamicPageDetailSerializer, make_page_tar
+from wagtail_to_ion.serializers.ion import IonSerializationProfiler
+from wagtail_to_ion.serializers.pages import load_pages_for_serialization
 from wagtail_to_ion.models import get_ion_collection_model
-from wagtail_to_ion.views.mixins import ListMixin
-from wagtail_to_ion.utils import visible_tree_by_user
+from wagtail_to_ion.views.mixins import ConditionalResponseMixin, KnownChecksumsMixin, ListMixin, latest
+from wagtail_to_ion.utils import get_collection_for_page, get_page_cache, get_page_cache_key, resolve_language, \
+    visible_tree_by_user
 
 
 Collection = get_ion_collection_model()
 
 
-class DynamicPageDetailView(generics.RetrieveAPIView):
+class CollectionPagesMixin:
+    """
+    Resolves the collection & language of the request (by the `collection` & `locale` URL kwargs) and
+    provides the pages of the language visible for the user.
+    """
+
+    def get_collection(self, slug):
+        return Collection.objects.filter(live=True, slug=slug)
+
+    def get_language(self):
+        collection = self.get_collection(self.kwargs['collection']).first()
+        if collection is None:
+            raise Http404
+        return resolve_language(collection, self.kwargs['locale'])
+
+    def get_pages_queryset(self):
+        collection = self.get_language()
+        if settings.GET_PAGES_BY_USER:
+            return visible_tree_by_user(collection, self.request.user)
+        return collection.get_descendants().filter(live=True)
+
+
+class DynamicPageDetailView(CollectionPagesMixin, ConditionalResponseMixin, generics.RetrieveAPIView):
     serializer_class = DynamicPageDetailSerializer
     lookup_field = 'slug'
 
-    @method_decorator(never_cache)
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
-
     def get_serializer(self, *args, **kwargs):
         kwargs['user'] = self.request.user
         return super().get_serializer(*args, **kwargs)
 
-    def get_collection(self, slug):
-        return Collection.objects.filter(live=True, slug=slug)
+    def get_queryset(self):
+        return self.get_pages_queryset().filter(slug=self.kwargs['slug'])
+
+    def get_page(self):
+        # the (non-specific) page, loaded once for the validators and the serialization
+        if not hasattr(self, '_page'):
+            self._page = super().get_object()
+        return self._page
+
+    def get_object(self):
+        # load the specific page and the relations of its serialization plan in one query
+        return load_pages_for_serialization([self.get_page()])[0]
+
+    def get_validators(self):
+        page = self.get_page()
+        serializer = self.get_serializer(page)
+        children_published = page.get_children().filter(live=True).aggregate(
+            last_published_at=Max('last_published_at')
+        )['last_published_at']
+        values = (
+            page.pk,
+            page.path,
+            page.live_revision_id,
+            page.last_published_at,
+            serializer.get_parent(page),
+            serializer.get_children(page),
+        )
+        return values, latest(page.last_published_at, children_published)
+
+    def retrieve(self, request, *args, **kwargs):
+        cache = get_page_cache()
+        if cache is None:
+            return self.serialize(request, *args, **kwargs)
+
+        key = get_page_cache_key(cache, self.get_page(), self.kwargs['collection'], request)
+        # profiled requests are always serialized (a cached response has no profile), the result is still cached
+        data = cache.get(key) if not settings.ION_PROFILE_SERIALIZATION else None
+        if data is not None:
+            return Response(data)
+        response = self.serialize(request, *args, **kwargs)
+        cache.set(key, response.data, timeout=settings.ION_PAGE_CACHE_TIMEOUT)
+        return response
+
+    def serialize(self, request, *args, **kwargs):
+        if not settings.ION_PROFILE_SERIALIZATION:
+            return super().retrieve(request, *args, **kwargs)
+
+        with IonSerializationProfiler() as profiler:
+            response = super().retrieve(request, *args, **kwargs)
+        response['Server-Timing'] = profiler.server_timing()
+        profiler.log()
+        return response
+
+
+class DynamicPageBatchView(CollectionPagesMixin, generics.GenericAPIView):
+    """
+    Details of multiple pages of a collection in one response.
+
+    The slugs of the pages are given as comma separated list (``?slugs=a,b,c``) or POSTed as JSON object
+    (``{"slugs": ["a", "b", "c"]}``). The response contains the details of all pages found (in tree order)
+    in the same format as the page detail view, it is streamed if `ION_STREAM_COLLECTION_PAGES` is set.
+    """
+    serializer_class = DynamicPageDetailSerializer
+    max_pages = 1000
+
+    @method_decorator(never_cache)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    def get_slugs(self):
+        if self.request.method == 'POST':
+            slugs = self.request.data.get('slugs') if isinstance(self.request.data, dict) else None
+            if not isinstance(slugs, list) or not all(isinstance(slug, str) for slug in slugs):
+                raise ParseError('expected a JSON object with a list of slugs in "slugs"')
+        else:
+            slugs = [slug for slug in self.request.GET.get('slugs', '').split(',') if slug]
+        if not slugs:
+            raise ParseError('no slugs given')
+        if len(slugs) > self.max_pages:
+            raise ParseError(f'at most {self.max_pages} pages can be requested at once')
+        return slugs
 
     def get_queryset(self):
-        tree = self.get_collection(self.kwargs['collection']).first().get_children()
-
-        collection = None
-        default_collection = None
-        for item in tree:
-            spec = item.specific
-            if spec.code == self.kwargs['locale']:
-                collection = spec
-                break
-            if spec.is_default:
-                default_collection = spec
+        return self.get_pages_queryset().filter(slug__in=self.slugs)
+
+    def get_api_object_name(self):
+        model = self.get_serializer_class().Meta.model
+        return getattr(model, 'ion_api_object_name', model.__name__.lower())
+
+    def serialize_pages(self, pages):
+        """
+        Returns the serialized details of `pages` (from the page cache if it is enabled).
+        """
+        cache = get_page_cache()
+        api_object_name = self.get_api_object_name()
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+
+        # load the specific pages and the relations of their serialization plans with one query per page type
+        for page in load_pages_for_serialization(pages):
+            key = get_page_cache_key(cache, page, self.kwargs['collection'], self.request) if cache else None
+            data = cache.get(key) if cache else None
+            if data is None:
+                if 'collection' not in context:
+                    # all pages are below the same language: resolve their collection once
+                    context['collection'] = get_collection_for_page(page)
+                data = serializer_class(instance=page, context=context, user=self.request.user).data
+                if cache:
+                    cache.set(key, data, timeout=settings.ION_PAGE_CACHE_TIMEOUT)
+            yield from data[api_object_name]
+
+    def stream_json(self, page_ids, chunk_size: int = 1000):
+        renderer = JSONRenderer()
+        yield b'{' + renderer.render(self.get_api_object_name()) + b':['
+        separator = b''
+        for index in range(0, len(page_ids), chunk_size):
+            pages = Page.objects.filter(pk__in=page_ids[index:index + chunk_size]).order_by('path')
+            for page_data in self.serialize_pages(pages):
+                yield separator + renderer.render(page_data)
+                separator = b','
+        yield b']}'
 
-        if collection is None:
-            collection = default_collection
+    def get(self, request, *args, **kwargs):
+        self.slugs = self.get_slugs()
+        pages = self.filter_queryset(self.get_queryset()).order_by('path')
 
-        if settings.GET_PAGES_BY_USER:
-            return visible_tree_by_user(collection, self.request.user).filter(slug=self.kwargs['slug'])
+        # stream only plain JSON, other renderers (e.g. the browsable API) need the complete data
+        if settings.ION_STREAM_COLLECTION_PAGES and isinstance(request.accepted_renderer, JSONRenderer):
+            page_ids = list(pages.values_list('pk', flat=True))
+            return StreamingHttpResponse(
+                self.stream_json(page_ids, chunk_size=settings.ION_COLLECTION_PAGES_CHUNK_SIZE),
+                content_type='application/json',
+            )
+        return Response({self.get_api_object_name(): list(self.serialize_pages(pages))})
 
-        return collection.get_descendants().filter(
-            live=True,
-            slug=self.kwargs['slug']
-        )
+    def post(self, request, *args, **kwargs):
+        return self.get(request, *args, **kwargs)
 
 
-class PageArchiveView(ListMixin):
+class PageArchiveView(KnownChecksumsMixin, ListMixin):
     serializer_class = DynamicPageDetailSerializer
 
     @method_decorator(never_cache)
@@ -76,6 +212,12 @@ class PageArchiveView(ListMixin):
         if pages.count() == 0:
             raise Http404
 
-        page_obj = pages.first()
+        page_obj = load_pages_for_serialization([pages.first()])[0]
 
-        return make_page_tar(page_obj, self.locale, request, content_serializer=self.serializer_class)
+        return make_page_tar(
+            page_obj,
+            self.locale,
+            request,
+            content_serializer=self.serializer_class,
+            known_checksums=self.get_known_checksums(),
+        )
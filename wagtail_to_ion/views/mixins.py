@@ -1,9 +1,18 @@
 # Copyright © 2017 anfema GmbH. All rights reserved.
+import hashlib
+from datetime import datetime
+from typing import Any, Iterable, Optional, Tuple
+
 from django.http import HttpResponse
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
+from wagtail_to_ion.conf import settings
 from wagtail_to_ion.tar import TarWriter
+from wagtail_to_ion.utils import get_visibility_key
 
 from rest_framework import generics
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
 
@@ -19,3 +28,83 @@ class ListMixin(generics.ListAPIView):
             else:
                 restructured_data['collection'] = [obj['collection'][0]]
         return Response(restructured_data)
+
+
+class KnownChecksumsMixin:
+    """
+    Lets clients POST a manifest of the checksums of the files they already have to an archive view.
+
+    The manifest is a JSON object with a list of checksums (``{"checksums": ["sha256:...", ...]}``),
+    the files with these checksums are left out of the archive but stay listed in its ``index.json``.
+    """
+
+    def get_known_checksums(self):
+        if self.request.method != 'POST':
+            return None
+        checksums = self.request.data.get('checksums') if isinstance(self.request.data, dict) else None
+        if not isinstance(checksums, list) or not all(isinstance(checksum, str) for checksum in checksums):
+            raise ParseError('expected a JSON object with a list of checksums in "checksums"')
+        return frozenset(checksums)
+
+    def post(self, request, *args, **kwargs):
+        return self.get(request, *args, **kwargs)
+
+
+def latest(*dates: Optional[datetime]) -> Optional[datetime]:
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+class ConditionalResponseMixin:
+    """
+    Adds `ETag` & `Last-Modified` headers to the responses of a view and answers conditional requests
+    (`If-None-Match` & `If-Modified-Since`) with 304 before anything is serialized.
+
+    Views implement `get_validators()` returning the values the response depends on (the ETag is a hash of
+    these values, the request path, host, API version and the visibility context of the user) and the
+    last modification date. The `Cache-Control` policy is looked up in `settings.ION_CACHE_CONTROL` by the
+    URL name of the view, views without a policy are not cacheable (like `never_cache`).
+    """
+
+    def get_validators(self) -> Tuple[Optional[Iterable[Any]], Optional[datetime]]:
+        return None, None
+
+    def get_etag(self, values: Iterable[Any]) -> str:
+        request = self.request
+        key = (
+            request.get_host(),
+            request.get_full_path(),
+            request.META.get('HTTP_API_VERSION', ''),
+            request.accepted_renderer.format,
+            get_visibility_key(request.user, request=request),
+            tuple(values),
+        )
+        return quote_etag(hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        values, last_modified = self.get_validators()
+        etag = self.get_etag(values) if values is not None else None
+        last_modified = int(last_modified.timestamp()) if last_modified is not None else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag is not None:
+                response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_cache_control(self) -> Optional[dict]:
+        url_name = self.request.resolver_match.url_name if self.request.resolver_match else None
+        return settings.ION_CACHE_CONTROL.get(url_name)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_control = self.get_cache_control()
+        if cache_control is not None and response.status_code in (200, 304):
+            patch_cache_control(response, **cache_control)
+        else:
+            add_never_cache_headers(response)
+        return response
@@ -11,4 +11,4 @@ def show_only_user_documents(documents, request):
     """
     Only show images in user collections
     """
-    return get_user_documents(request.user, documents)
+    return get_user_documents(request.user, documents, request=request)
@@ -11,4 +11,4 @@ def show_only_user_images(images, request):
     """
     Only show images in user collections
     """
-    return get_user_images(request.user, images)
+    return get_user_images(request.user, images, request=request)